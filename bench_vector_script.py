@@ -0,0 +1,607 @@
+"""Benchmarks for vector_script.py that need no running Vector.
+
+    python bench_vector_script.py subscribe --events 200000 --batch 50
+    python bench_vector_script.py --json query --repeat 50 > query.json
+
+subscribe feeds synthetic graphql-ws ``data`` messages straight into the
+frame handling of the AsyncVectorSession a VectorEventSubscriber taps over,
+so it measures what the client spends per event (decode, limit bookkeeping,
+formatting, writing) with output going to /dev/null. Each output mode is
+run in turn and reported as sustained events/sec and CPU time per event,
+relative to the baseline: the handling as first written, with its inline
+json.dumps(indent=2) and print.
+
+projection does the same for each --fields profile, with events cut down
+to what that profile's subscription would return, and also reports the
+bytes on the wire per event.
+
+codec times each installed JSON codec on graphql-ws frames, either
+synthetic or recorded ones (--frames, one frame per line): decoding whole
+frames, decoding then re-encoding the events as NDJSON does, and the
+passthrough that leaves events encoded.
+
+query times get-info/get-chain end to end, per phase (connect, ack, probe,
+topology, metrics, render), against vector_mock_server.py started in-process
+or an existing endpoint (--url), and reports median/p95/max per phase. With
+--daemon the lookups go through a daemon started in-process instead.
+
+topology measures how get-chain scales with the number of components: for
+each synthetic size it records the topology pages the mock server would send
+and then times decoding them, building the graph, computing the chain and
+rendering it.
+
+where compares subscriber throughput without a --where filter, with one
+that matches every event and with one that matches about 1%.
+
+aggregate pushes events with all-distinct messages (the worst case for the
+top-K sketches) through the aggregate summarizer, reporting events/sec and
+the memory it holds after 10% and after all of the events.
+
+With --json, each benchmark prints one JSON document (parameters,
+environment, results) instead of a table, for comparing runs.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from vector_protocol import CODECS, DEFAULT_CODEC, EVENT_FIELDS, FIELD_PROFILES
+from vector_script import (
+    COMPONENT_KINDS,
+    DEFAULT_PAGE_SIZE,
+    NdjsonEventWriter,
+    PrettyEventWriter,
+    TopologyGraph,
+    VectorClient,
+    VectorEventSubscriber,
+    build_page_query,
+    lookup_components,
+)
+from vector_async import AsyncVectorSession, _Operation
+
+
+def make_event(seq, component_id="replace_via", message_bytes=0):
+    message = f"event {seq} from {component_id}".ljust(message_bytes, "x")
+    timestamp = "2026-01-01T00:00:00.000000+00:00"
+    return {
+        "componentId": component_id,
+        "componentType": "remap",
+        "componentKind": "transform",
+        "message": message,
+        "timestamp": timestamp,
+        "string": json.dumps({"message": message, "timestamp": timestamp, "seq": seq}),
+        "json": message,
+        "__typename": "Log",
+    }
+
+
+def project(event, fields):
+    """What a Log event looks like when only fields (None: all) are selected."""
+    if fields is None:
+        return event
+    keep = set(fields) & set(EVENT_FIELDS['Log'])
+    return {k: v for k, v in event.items() if k in keep or k == '__typename'}
+
+
+def make_messages(events, batch, fields=None, message_bytes=0):
+    """graphql-ws frames carrying ``events`` events, ``batch`` per frame."""
+    messages = []
+    for start in range(0, events, batch):
+        payload = [project(make_event(seq, message_bytes=message_bytes), fields)
+                   for seq in range(start, min(start + batch, events))]
+        messages.append(json.dumps({
+            "id": "1",
+            "type": "data",
+            "payload": {"data": {"outputEventsByComponentIdPatterns": payload}}
+        }))
+    return messages
+
+
+def _run_subscriber(messages, events, writer, where=None):
+    """(wall, cpu) seconds taken to push messages through a subscriber writing to writer."""
+    subscriber = VectorEventSubscriber("ws://unused", ["replace_via"], events + 1, writer=writer, where=where)
+    # The session the subscriber would open, minus the socket, with the tap as operation "1".
+    session = AsyncVectorSession("ws://unused", codec=subscriber.codec, raw_events=subscriber.passthrough,
+                                 on_control=subscriber.on_control)
+    session.operations["1"] = _Operation("1", None, subscriber.on_data)
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    for message in messages:
+        session._receive(message)
+    writer.close()
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    assert where is not None or subscriber.event_count == events, subscriber.event_count
+    if getattr(writer, 'directory', None):
+        shutil.rmtree(writer.directory)
+    return elapsed, cpu
+
+
+class _BaselineSubscriber:
+    """The tap's message handling as first written (vector_script.py at
+    2dcf016), the reference for the subscribe benchmark: stdlib json, and a
+    print of json.dumps(indent=2) per event, counted under a lock."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.event_count = 0
+        self.lock = threading.Lock()
+
+    def on_message(self, message):
+        try:
+            data = json.loads(message)
+            msg_type = data.get('type')
+            if msg_type == 'data':
+                payload = data.get('payload', {})
+                if 'errors' in payload:
+                    print(f"GraphQL Error: {payload['errors']}")
+                    return
+                if 'data' in payload and 'outputEventsByComponentIdPatterns' in payload['data']:
+                    events = payload['data']['outputEventsByComponentIdPatterns']
+                    if isinstance(events, list):
+                        for event in events:
+                            print("{ \"event\":", json.dumps(event, indent=2), "}")  # Pretty-print the event
+                            with self.lock:
+                                self.event_count += 1
+                                if self.event_count >= self.limit:
+                                    return
+        except json.JSONDecodeError:
+            print(f"Invalid JSON message: {message}")
+        except Exception as e:
+            print(f"Error processing message: {e}")
+
+
+def _run_baseline(messages, events, out):
+    """(wall, cpu) seconds taken by _BaselineSubscriber, its prints going to out."""
+    subscriber = _BaselineSubscriber(events + 1)
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    with contextlib.redirect_stdout(out):
+        for message in messages:
+            subscriber.on_message(message)
+        out.flush()
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    assert subscriber.event_count == events, subscriber.event_count
+    return elapsed, cpu
+
+
+def bench_subscribe(events, batch, writers):
+    messages = make_messages(events, batch)
+    results = {}
+    with open(os.devnull, "w") as devnull:
+        elapsed, cpu = _run_baseline(messages, events, devnull)
+        results["baseline"] = {
+            "events": events,
+            "seconds": elapsed,
+            "events_per_sec": events / elapsed,
+            "cpu_us_per_event": cpu / events * 1e6,
+        }
+        for name, make_writer in writers.items():
+            writer = make_writer(devnull)
+            writer.status = devnull
+            elapsed, cpu = _run_subscriber(messages, events, writer)
+            results[name] = {
+                "events": events,
+                "seconds": elapsed,
+                "events_per_sec": events / elapsed,
+                "cpu_us_per_event": cpu / events * 1e6,
+            }
+    return results
+
+
+def bench_projection(events, batch, message_bytes, output_format):
+    results = {}
+    with open(os.devnull, "w") as devnull:
+        for profile, fields in FIELD_PROFILES.items():
+            messages = make_messages(events, batch, fields, message_bytes)
+            writer = SUBSCRIBE_WRITERS[output_format](devnull)
+            writer.status = devnull
+            elapsed, cpu = _run_subscriber(messages, events, writer)
+            results[profile] = {
+                "events": events,
+                "seconds": elapsed,
+                "events_per_sec": events / elapsed,
+                "cpu_us_per_event": cpu / events * 1e6,
+                "wire_bytes_per_event": sum(len(m) for m in messages) / events,
+            }
+    return results
+
+
+def bench_codecs(messages, events, repeat=3):
+    """Best-of-repeat seconds per codec and path over messages."""
+    def best(run):
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - started)
+        return min(times)
+
+    def events_of(frame):
+        return frame['payload']['data']['outputEventsByComponentIdPatterns']
+
+    wire_bytes = sum(len(m) for m in messages)
+    results = {}
+    for name, codec_class in CODECS.items():
+        try:
+            codec = codec_class()
+        except ImportError:
+            continue
+        paths = {
+            "decode": lambda: [codec.loads(m) for m in messages],
+            "decode+encode": lambda: [[codec.dumps(e) for e in events_of(codec.loads(m))] for m in messages],
+            "passthrough": lambda: [events_of(codec.loads_frame(m, raw_events=True)) for m in messages],
+        }
+        for path, run in paths.items():
+            seconds = best(run)
+            results[f"{name} {path}"] = {
+                "events": events,
+                "seconds": seconds,
+                "events_per_sec": events / seconds,
+                "mb_per_sec": wire_bytes / seconds / 1e6,
+            }
+    return results
+
+
+def read_frames(path):
+    with open(path) as f:
+        messages = [line.rstrip("\n") for line in f if line.strip()]
+    events = 0
+    for message in messages:
+        data = (json.loads(message).get('payload') or {}).get('data') or {}
+        events += len(data.get('outputEventsByComponentIdPatterns') or [])
+    return messages, events
+
+
+WHERE_FILTERS = {
+    "none": None,
+    "all": 'componentKind == "transform"',
+    "1%": '.seq =~ "00$"',
+}
+
+
+def bench_where(events, batch, output_format, filters=WHERE_FILTERS):
+    from vector_filter import compile_filter
+
+    messages = make_messages(events, batch)
+    results = {}
+    with open(os.devnull, "w") as devnull:
+        for name, expression in filters.items():
+            writer = SUBSCRIBE_WRITERS[output_format](devnull)
+            writer.status = devnull
+            where = compile_filter(expression) if expression else None
+            elapsed, cpu = _run_subscriber(messages, events, writer, where)
+            results[name] = {
+                "filter": expression,
+                "events": events,
+                "seconds": elapsed,
+                "events_per_sec": events / elapsed,
+                "cpu_us_per_event": cpu / events * 1e6,
+            }
+    return results
+
+
+def bench_aggregate(events, batch, top=('message', 'componentId')):
+    import tracemalloc
+    from vector_aggregate import EventAggregator
+    from vector_filter import compile_field
+
+    def batches():
+        for start in range(0, events, batch):
+            yield [make_event(seq, component_id=f"transform_{seq % 20}")
+                   for seq in range(start, min(start + batch, events))]
+
+    def aggregator():
+        return EventAggregator({name: compile_field(name) for name in top}, every=0, out=open(os.devnull, "w"))
+
+    # Time the aggregator alone, on pre-built events.
+    timed = list(batches()) if events <= 500000 else [next(batches())] * (events // batch)
+    summarizer = aggregator()
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    for events_batch in timed:
+        summarizer.write(events_batch)
+    summarizer.close()
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    del timed
+
+    # Then what it holds as events keep coming, excluding the events themselves.
+    memory = {}
+    tracemalloc.start()
+    summarizer = aggregator()
+    baseline = tracemalloc.get_traced_memory()[0]
+    seen = 0
+    for events_batch in batches():
+        summarizer.write(events_batch)
+        seen += len(events_batch)
+        if seen in (events // 10 // batch * batch, events):
+            del events_batch
+            memory[seen] = tracemalloc.get_traced_memory()[0] - baseline
+    summarizer.close()
+    tracemalloc.stop()
+    return {
+        "events": events,
+        "seconds": elapsed,
+        "events_per_sec": events / elapsed,
+        "cpu_us_per_event": cpu / events * 1e6,
+        "memory_bytes": memory,
+    }
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(fraction * (len(values) - 1)))]
+
+
+def summarize(samples):
+    """Per-phase median/p95/max milliseconds over dicts of phase -> seconds."""
+    phases = list(dict.fromkeys(phase for sample in samples for phase in sample))
+    summary = {}
+    for phase in phases:
+        values = [sample[phase] * 1000 for sample in samples if phase in sample]
+        summary[phase] = {
+            "samples": len(values),
+            "median_ms": _percentile(values, 0.5),
+            "p95_ms": _percentile(values, 0.95),
+            "max_ms": max(values),
+        }
+    return summary
+
+
+def start_mock_server(config=None, components=None, fanout=2):
+    """A MockVectorServer on a free port; needs graphql-core (and pyyaml for config)."""
+    from vector_mock_server import MockTopology, MockVectorServer
+
+    if components:
+        topology = MockTopology.synthetic(components, fanout=fanout)
+    else:
+        topology = MockTopology.from_vector_config(config or 'vector_config.yaml')
+    server = MockVectorServer(topology, port=0)
+    server.start()
+    return server
+
+
+def bench_query(url, mode, name, repeat, page_size=DEFAULT_PAGE_SIZE, warmup=2, daemon=None):
+    """Phase timings of get-info/get-chain over fresh connections, without the
+    topology cache, or through the daemon listening on ``daemon``."""
+    from vector_daemon import daemon_lookup
+
+    samples = []
+    for run in range(warmup + repeat):
+        client = VectorClient(url) if daemon is None else None
+        started = time.perf_counter()
+        try:
+            if daemon is None:
+                lookup = lookup_components(client, None, mode, [name], page_size=page_size)
+            else:
+                lookup = daemon_lookup(daemon, url, mode, [name], page_size=page_size)
+            if name not in lookup.ids:
+                raise Exception(f"Component '{name}' not found at {url}")
+            render_started = time.perf_counter()
+            json.dumps(lookup.info(name) if mode == 'get-info' else lookup.chain(name), indent=2)
+            phases = dict(lookup.phases)
+            phases['render'] = time.perf_counter() - render_started
+            phases['total'] = time.perf_counter() - started
+        finally:
+            if client is not None:
+                client.close()
+        if run >= warmup:
+            samples.append(phases)
+    return summarize(samples)
+
+
+def record_topology_pages(size, fanout=3, page_size=DEFAULT_PAGE_SIZE):
+    """The topology pages a mock server with ``size`` components sends, as
+    (kind, frame JSON) pairs, and the id of a component in the middle of it."""
+    import graphql
+    from vector_mock_server import MockResolvers, MockTopology, build_schema
+
+    topology = MockTopology.synthetic(size, fanout=fanout)
+    resolvers = MockResolvers(topology)
+    schema = build_schema(resolvers)
+    pages = []
+    for kind, _, topology_fields, _ in COMPONENT_KINDS:
+        document = graphql.parse(build_page_query(kind, topology_fields))
+        after = None
+        while True:
+            result = graphql.execute(schema, document, root_value=resolvers.root(),
+                                     variable_values={"first": page_size, "after": after})
+            if result.errors:
+                raise Exception(result.errors)
+            pages.append((kind, json.dumps({"id": "1", "type": "data", "payload": {"data": result.data}})))
+            page_info = result.data[kind]['pageInfo']
+            if not page_info['hasNextPage']:
+                break
+            after = page_info['endCursor']
+    transforms = topology.by_kind['transforms'] or topology.by_kind['sources']
+    return pages, transforms[len(transforms) // 2]
+
+
+def bench_topology(sizes, fanout=3, repeat=5, codec=None):
+    """Best-of-repeat seconds per get-chain stage for each topology size."""
+    codec = codec or DEFAULT_CODEC
+    results = {}
+    for size in sizes:
+        pages, target = record_topology_pages(size, fanout)
+        best = {}
+        for _ in range(repeat):
+            timings = {}
+            started = time.perf_counter()
+            decoded = [(kind, codec.loads(frame)['payload']['data'][kind]['nodes']) for kind, frame in pages]
+            timings['parse'] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            graph = TopologyGraph()
+            for kind, nodes in decoded:
+                graph.add_nodes(kind, nodes)
+            timings['graph'] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            chain = {c: graph.component_info(c) for c in sorted(graph.connected(target))}
+            timings['chain'] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            json.dumps(chain, indent=2)
+            timings['render'] = time.perf_counter() - started
+            for stage, seconds in timings.items():
+                best[stage] = min(best.get(stage, seconds), seconds)
+        best['total'] = sum(best.values())
+        results[str(size)] = {
+            "components": len(graph),
+            "chain_components": len(chain),
+            "wire_bytes": sum(len(frame) for _, frame in pages),
+            **{f"{stage}_ms": seconds * 1000 for stage, seconds in best.items()},
+        }
+    return results
+
+
+def _capture_writer(out):
+    from vector_capture import CaptureWriter
+
+    return CaptureWriter(tempfile.mkdtemp(prefix='bench-capture-'), "ws://unused", ["replace_via"], status=out)
+
+
+SUBSCRIBE_WRITERS = {
+    "pretty": lambda out: PrettyEventWriter(out),
+    "ndjson": lambda out: NdjsonEventWriter(out),
+    "record": _capture_writer,
+}
+
+
+def print_json(benchmark, args, results):
+    params = {k: v for k, v in vars(args).items() if k not in ('json', 'benchmark')}
+    json.dump({
+        "benchmark": benchmark,
+        "params": params,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "codec": DEFAULT_CODEC.name,
+            "time": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        },
+        "results": results,
+    }, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="vector_script.py benchmarks")
+    parser.add_argument('--json', action='store_true', help='Print results as one JSON document')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    subscribe_parser = subparsers.add_parser('subscribe', help='Subscriber events/sec per output format')
+    subscribe_parser.add_argument('--events', type=int, default=200000, help='Events to push through the subscriber')
+    subscribe_parser.add_argument('--batch', type=int, default=50, help='Events per graphql-ws data message')
+
+    projection_parser = subparsers.add_parser('projection', help='Wire bytes and events/sec per --fields profile')
+    projection_parser.add_argument('--events', type=int, default=100000, help='Events to push through the subscriber')
+    projection_parser.add_argument('--batch', type=int, default=50, help='Events per graphql-ws data message')
+    projection_parser.add_argument('--message-bytes', type=int, default=200, help='Size of each log message')
+    projection_parser.add_argument('--format', choices=list(SUBSCRIBE_WRITERS), default='ndjson', help='Output format to write with')
+
+    codec_parser = subparsers.add_parser('codec', help='Frame decode/encode speed per installed JSON codec')
+    codec_parser.add_argument('--frames', help='File of recorded graphql-ws frames, one per line (default: synthetic)')
+    codec_parser.add_argument('--events', type=int, default=50000, help='Synthetic events')
+    codec_parser.add_argument('--batch', type=int, default=50, help='Synthetic events per frame')
+    codec_parser.add_argument('--message-bytes', type=int, default=200, help='Size of each synthetic log message')
+
+    where_parser = subparsers.add_parser('where', help='Subscriber events/sec with and without a --where filter')
+    where_parser.add_argument('--events', type=int, default=200000, help='Events to push through the subscriber')
+    where_parser.add_argument('--batch', type=int, default=50, help='Events per graphql-ws data message')
+    where_parser.add_argument('--format', choices=list(SUBSCRIBE_WRITERS), default='ndjson', help='Output format to write with')
+
+    aggregate_parser = subparsers.add_parser('aggregate', help='aggregate summarizer events/sec and memory held')
+    aggregate_parser.add_argument('--events', type=int, default=500000, help='Events to summarize')
+    aggregate_parser.add_argument('--batch', type=int, default=50, help='Events per write')
+
+    query_parser = subparsers.add_parser('query', help='get-info/get-chain latency per phase')
+    query_parser.add_argument('--url', help='Endpoint to query (default: a mock server started in-process)')
+    query_parser.add_argument('--config', default='vector_config.yaml', help='Vector config for the mock server')
+    query_parser.add_argument('--components', type=int, help='Give the mock server a synthetic topology of this size')
+    query_parser.add_argument('--mode', choices=['get-info', 'get-chain'], nargs='+', default=['get-info', 'get-chain'])
+    query_parser.add_argument('--name', help='Component to look up (default: replace_via, or a synthetic transform)')
+    query_parser.add_argument('--repeat', type=int, default=20, help='Timed runs per mode')
+    query_parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE)
+    query_parser.add_argument('--daemon', action='store_true', help='Go through a daemon started in-process (warm connection and graph)')
+
+    topology_parser = subparsers.add_parser('topology', help='get-chain stages versus topology size')
+    topology_parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000, 50000])
+    topology_parser.add_argument('--fanout', type=int, default=3, help='Max inputs per synthetic component')
+    topology_parser.add_argument('--repeat', type=int, default=5, help='Runs per size (best is reported)')
+
+    args = parser.parse_args()
+
+    if args.benchmark == 'subscribe':
+        results = bench_subscribe(args.events, args.batch, SUBSCRIBE_WRITERS)
+        if not args.json:
+            baseline = results["baseline"]["events_per_sec"]
+            for name, result in results.items():
+                print(f"{name:<8} {result['events_per_sec']:12,.0f} events/s  {result['cpu_us_per_event']:7.2f} us CPU/event  "
+                      f"{result['seconds']:7.2f} s  x{result['events_per_sec'] / baseline:.1f}")
+    elif args.benchmark == 'projection':
+        results = bench_projection(args.events, args.batch, args.message_bytes, args.format)
+        if not args.json:
+            for profile, result in results.items():
+                print(f"{profile:<10} {result['events_per_sec']:12,.0f} events/s  "
+                      f"{result['wire_bytes_per_event']:8.0f} B/event on the wire")
+    elif args.benchmark == 'codec':
+        if args.frames:
+            messages, events = read_frames(args.frames)
+        else:
+            messages, events = make_messages(args.events, args.batch, message_bytes=args.message_bytes), args.events
+        results = bench_codecs(messages, events)
+        if not args.json:
+            for name, result in results.items():
+                print(f"{name:<24} {result['events_per_sec']:12,.0f} events/s  {result['mb_per_sec']:8.1f} MB/s")
+    elif args.benchmark == 'where':
+        results = bench_where(args.events, args.batch, args.format)
+        if not args.json:
+            for name, result in results.items():
+                print(f"{name:<6} {result['events_per_sec']:12,.0f} events/s  {result['cpu_us_per_event']:7.2f} us CPU/event  "
+                      f"{result['filter'] or ''}")
+    elif args.benchmark == 'aggregate':
+        results = bench_aggregate(args.events, args.batch)
+        if not args.json:
+            print(f"{results['events_per_sec']:12,.0f} events/s  {results['cpu_us_per_event']:7.2f} us CPU/event")
+            for seen, size in results['memory_bytes'].items():
+                print(f"{size / 1024:12,.0f} KiB held after {seen:,} events")
+    elif args.benchmark == 'query':
+        server = None if args.url else start_mock_server(args.config, args.components)
+        url = args.url or server.url
+        name = args.name or ('transform_0' if args.components else 'replace_via')
+        daemon = None
+        if args.daemon:
+            from vector_daemon import TapDaemon
+            daemon = TapDaemon(os.path.join(tempfile.mkdtemp(), 'daemon.sock'), page_size=args.page_size)
+            daemon.listen()
+            threading.Thread(target=daemon.serve_forever, daemon=True).start()
+        try:
+            results = {mode: bench_query(url, mode, name, args.repeat, args.page_size,
+                                         daemon=daemon and daemon.path) for mode in args.mode}
+        finally:
+            if daemon is not None:
+                daemon.server.shutdown()
+            if server is not None:
+                server.stop()
+        if not args.json:
+            for mode, summary in results.items():
+                print(f"{mode} {name} ({args.repeat} runs)")
+                for phase, stats in summary.items():
+                    print(f"  {phase:<18} {stats['median_ms']:9.2f} ms median  {stats['p95_ms']:9.2f} ms p95  {stats['max_ms']:9.2f} ms max")
+    elif args.benchmark == 'topology':
+        results = bench_topology(args.sizes, args.fanout, args.repeat)
+        if not args.json:
+            print(f"{'components':>10} {'chain':>7} {'parse':>9} {'graph':>9} {'chain':>9} {'render':>9} {'total':>9}  (ms)")
+            for result in results.values():
+                print(f"{result['components']:>10} {result['chain_components']:>7} {result['parse_ms']:9.2f} {result['graph_ms']:9.2f} "
+                      f"{result['chain_ms']:9.2f} {result['render_ms']:9.2f} {result['total_ms']:9.2f}")
+    if args.json:
+        print_json(args.benchmark, args, results)
@@ -0,0 +1,27 @@
+import io
+
+from vector_aggregate import EventAggregator
+
+
+def make_events(components, n=1):
+    return [{"componentId": component, "componentKind": "transform", "__typename": "Log", "message": "x"}
+            for component in components for _ in range(n)]
+
+
+class TestVectorAggregate:
+    """vector_aggregate.py summarizing events without a tap."""
+
+    def test_components_across_windows(self):
+        aggregator = EventAggregator(capacity=10, every=0, out=io.StringIO())
+        components = [f"component_{n}" for n in range(8)]
+        aggregator.write(make_events(components))
+        first = aggregator.summary()
+        aggregator.write(make_events(components))
+        aggregator.write(make_events(f"extra_{n}" for n in range(4)))
+        second = aggregator.summary()
+        assert 'other_components' not in first, f"Expected 8 components under the cap of 10, got {first}"
+        counts = {row['componentId']: row['events'] for row in second['components']}
+        assert [counts[c] for c in components] == [2] * 8, f"Expected each component counted in both windows, got {counts}"
+        assert sorted(counts) == sorted(components + ['extra_0', 'extra_1']), f"Expected 2 more components tracked, got {sorted(counts)}"
+        assert second['other_components'] == 2, f"Expected the 2 components past the cap as other, got {second.get('other_components')}"
+        assert second['events'] == 20, f"Expected all 20 events counted, got {second['events']}"
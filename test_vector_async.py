@@ -0,0 +1,40 @@
+import asyncio
+import json
+
+import websockets
+
+from vector_async import AsyncVectorSession
+
+
+class TestVectorAsync:
+    """vector_async.py against a bare websockets server."""
+
+    def test_invalid_frame(self):
+        closed = []
+
+        async def handler(ws):
+            await ws.recv()  # connection_init
+            await ws.send(json.dumps({"type": "connection_ack"}))
+            await ws.recv()  # start
+            await ws.send("{not json")
+            await ws.wait_closed()
+            closed.append(True)
+
+        async def run():
+            async with websockets.serve(handler, '127.0.0.1', 0) as server:
+                port = server.sockets[0].getsockname()[1]
+                session = AsyncVectorSession(f"ws://127.0.0.1:{port}/graphql", ack_timeout=5)
+                try:
+                    await asyncio.wait_for(session.execute("{ meta { hostname } }"), 5)
+                except Exception as e:
+                    error = str(e)
+                else:
+                    error = None
+                await asyncio.sleep(0.1)
+                connected = session.is_connected()
+                await session.close()
+                return error, connected
+
+        error, connected = asyncio.run(run())
+        assert error and error.startswith("Invalid frame"), f"Expected the query to fail on the bad frame, got {error}"
+        assert not connected and closed == [True], f"Expected the socket to be closed, connected={connected} closed={closed}"
@@ -0,0 +1,87 @@
+import io
+import json
+import os
+import tempfile
+
+from vector_capture import SEGMENT_SUFFIX, CaptureReader, CaptureWriter, event_component, event_typename
+
+
+def make_event(component, n, typename='Log'):
+    return {"componentId": component, "componentKind": "transform", "message": f"event {n}", "__typename": typename}
+
+
+def record(directory, batches, **options):
+    """Write batches of (events, node) to a capture in directory."""
+    writer = CaptureWriter(directory, 'ws://test/graphql', ['*'], compression='gzip', status=io.StringIO(), **options)
+    for events, node in batches:
+        writer.write(events, node=node)
+    writer.close()
+
+
+class TestVectorCapture:
+    """vector_capture.py writing and reading captures on disk."""
+
+    def test_node_events(self):
+        line = '{"node":"a","event":' + json.dumps(make_event('replace_via', 1, 'Metric')) + '}'
+        assert event_component(line) == 'replace_via', f"Expected componentId 'replace_via', got {event_component(line)}"
+        assert event_typename(line) == 'Metric', f"Expected __typename 'Metric', got {event_typename(line)}"
+
+    def test_node_typenames(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            record(tmp, [([make_event('replace_via', n) for n in range(3)], 'a'),
+                         ([make_event('replace_via', n, 'Metric') for n in range(2)], 'b')])
+            with CaptureReader([tmp]) as reader:
+                typenames = set().union(*(block['typenames'] for segment in reader.segments for block in segment.blocks))
+                metrics = [json.loads(line) for _, line in reader.read(typenames=['Metric'])]
+        assert typenames == {'Log', 'Metric'}, f"Expected typenames Log and Metric in the index, got {typenames}"
+        assert [(m['node'], m['event']['__typename']) for m in metrics] == [('b', 'Metric')] * 2, f"Unexpected events {metrics}"
+
+    def test_round_trip(self):
+        batches = [([make_event(f"component_{n % 3}", n)], None) for n in range(30)]
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = CaptureWriter(tmp, 'ws://test/graphql', ['*'], compression='gzip', status=io.StringIO(),
+                                   block_bytes=1, segment_bytes=1000)
+            for n, (events, node) in enumerate(batches):
+                if n == 10:
+                    writer.mark_gap({"from": "2024-01-01T00:00:00+00:00", "to": "2024-01-01T00:00:01+00:00"})
+                writer.write(events, node=node)
+            writer.close()
+            with CaptureReader([tmp]) as reader:
+                segments = len(reader.segments)
+                events = [json.loads(line) for _, line in reader.read()]
+                gaps = reader.gaps
+        assert segments > 1, f"Expected the capture rotated over several segments, got {segments}"
+        assert events == [e for events, _ in batches for e in events], f"Expected the events back in order, got {events}"
+        assert [gap['from'] for gap in gaps] == ["2024-01-01T00:00:00+00:00"], f"Expected the gap back, got {gaps}"
+
+    def test_unfinished_segment(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = CaptureWriter(tmp, 'ws://test/graphql', ['*'], compression='gzip', status=io.StringIO(), block_bytes=1)
+            for n in range(5):
+                writer.write([make_event('replace_via', n)])
+            # Not closed: the reader walks the block headers of the .part file.
+            [name] = os.listdir(tmp)
+            with CaptureReader([tmp]) as reader:
+                events = [json.loads(line) for _, line in reader.read(components=['replace_via'])]
+            writer.close()
+        assert name.endswith(SEGMENT_SUFFIX + '.part'), f"Expected an unfinished segment, got {name}"
+        assert [e['message'] for e in events] == [f"event {n}" for n in range(5)], f"Unexpected events {events}"
+
+    def test_index_skips_blocks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            record(tmp, [([make_event(component, n)], None) for n in range(4) for component in ('a', 'b', 'c')],
+                   block_bytes=1)
+            with CaptureReader([tmp]) as reader:
+                [segment] = reader.segments
+                decompressed = []
+                block_lines = segment.block_lines
+
+                def counting_block_lines(block):
+                    decompressed.append(block['components'])
+                    return block_lines(block)
+
+                segment.block_lines = counting_block_lines
+                events = [json.loads(line) for _, line in reader.read(components=['b'])]
+                blocks = len(segment.blocks)
+        assert [e['componentId'] for e in events] == ['b'] * 4, f"Unexpected events {events}"
+        assert (blocks, decompressed) == (12, [['b']] * 4), f"Expected only the 4 blocks of 12 holding 'b' decompressed, got {decompressed}"
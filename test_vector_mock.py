@@ -0,0 +1,204 @@
+import io
+import json
+import os
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+
+from vector_daemon import TapDaemon, _Relay
+from vector_mock_server import MockTopology, MockVectorServer
+from vector_protocol import DEFAULT_CODEC
+from vector_script import PROBE_QUERY, NdjsonEventWriter, VectorClient, VectorEventSubscriber, fleet_map, lookup_components
+
+
+def run_script(url, *args, timeout=30):
+    result = subprocess.run(['python', 'vector_script.py', '--url', url, *args], capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        raise Exception(f"Command failed: {result.stderr}")
+    return result.stdout
+
+
+class TestVectorMock:
+    """vector_script.py against vector_mock_server.py, no Vector needed."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockVectorServer(MockTopology.from_vector_config('vector_config.yaml', stalled={'replace_via': 0.5}), port=0)
+        cls.url = cls.server.start()
+        cls.synthetic = MockVectorServer(MockTopology.synthetic(200, fanout=3), port=0)
+        cls.synthetic_url = cls.synthetic.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        cls.synthetic.stop()
+
+    # nose2 calls setUpClass, pytest setup_class
+    setup_class = setUpClass
+    teardown_class = tearDownClass
+
+    def test_get_info(self):
+        info = json.loads(run_script(self.url, 'get-info', 'my_http_source', '--no-cache'))
+        assert info['componentId'] == 'my_http_source', f"Expected componentId 'my_http_source', got {info['componentId']}"
+        assert info['componentType'] == 'http', f"Expected componentType 'http', got {info['componentType']}"
+        assert sorted(info['outputs']) == ['add_prefix', 'transform_4'], f"Expected outputs ['add_prefix', 'transform_4'], got {sorted(info['outputs'])}"
+
+    def test_get_info_queries(self):
+        client = VectorClient(self.url)
+        try:
+            graphs = {}
+            lookup_components(client, None, 'get-info', [], metrics=False, graphs=graphs)  # the whole topology
+            for name, expected_queries in (('my_http_source', 2), ('replace_via', 3), ('my_console_sink', 2)):
+                sent = self.server.queries
+                info = lookup_components(client, None, 'get-info', [name], metrics=False).info(name)
+                queries = self.server.queries - sent
+                full = lookup_components(client, None, 'get-info', [name], metrics=False, graphs=graphs).info(name)
+                # The probe, the component, and for a transform the transforms' edges
+                assert queries == expected_queries, f"Expected {expected_queries} queries for a cold get-info {name}, got {queries}"
+                assert info == full, f"Expected the same info as from the whole topology for {name}, got {info} and {full}"
+        finally:
+            client.close()
+        sent = self.server.queries
+        run_script(self.url, 'get-info', 'my_http_source', '--no-cache')
+        assert self.server.queries - sent == 2, f"Expected the probe and the component query, got {self.server.queries - sent} queries"
+
+    def test_get_chain(self):
+        chain = json.loads(run_script(self.url, 'get-chain', 'replace_via', '--no-cache'))
+        assert sorted(chain) == ['add_prefix', 'my_console_sink', 'my_http_source', 'replace_via', 'uppercase_message'], f"Unexpected chain {sorted(chain)}"
+        assert chain['replace_via']['inputs'] == ['add_prefix'], f"Expected inputs ['add_prefix'], got {chain['replace_via']['inputs']}"
+
+    def test_subscribe_ndjson(self):
+        lines = run_script(self.url, 'subscribe', '--patterns', 'replace_via', '--limit', '5', '--format', 'ndjson').splitlines()
+        events = [json.loads(line) for line in lines]
+        assert len(events) == 5, f"Expected 5 events, got {len(events)}"
+        assert all(e['componentId'] == 'replace_via' for e in events), f"Unexpected components {[e['componentId'] for e in events]}"
+
+    def test_subscribe_where(self):
+        lines = run_script(self.url, 'subscribe', '--patterns', '*', '--limit', '3', '--format', 'ndjson',
+                           '--where', 'componentKind == "sink" or .seq < 0').splitlines()
+        events = [json.loads(line) for line in lines]
+        assert len(events) == 3, f"Expected 3 events, got {len(events)}"
+        assert all(e['componentId'] == 'my_console_sink' for e in events), f"Unexpected components {[e['componentId'] for e in events]}"
+
+    def test_aggregate(self):
+        lines = run_script(self.url, 'aggregate', '--patterns', 'replace_via', '--limit', '60', '--every', '0', '--format', 'json',
+                           '--top', 'message', '.seq').splitlines()
+        summary = json.loads(lines[-1])
+        assert summary['total'] == 60, f"Expected 60 events summarized, got {summary['total']}"
+        assert [(c['componentId'], c['events']) for c in summary['components']] == [('replace_via', 60)], f"Unexpected components {summary['components']}"
+        assert len(summary['top']['message']) == 10, f"Expected the top 10 messages, got {summary['top']['message']}"
+        assert summary['message_bytes']['count'] == 60, f"Expected 60 message sizes, got {summary['message_bytes']}"
+
+    def test_subscribe_metrics_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'tap.prom')
+            run_script(self.url, 'subscribe', '--patterns', 'replace_via', '--limit', '5', '--format', 'ndjson', '--metrics-file', path)
+            with open(path) as f:
+                metrics = f.read()
+        assert 'vector_tap_events_written_total 5\n' in metrics, f"Expected 5 events written, got {metrics}"
+        assert 'vector_tap_decode_seconds_count ' in metrics, "No decode histogram"
+
+    def test_daemon(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'daemon.sock')
+            daemon = TapDaemon(path)
+            daemon.listen()
+            thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+            thread.start()
+            try:
+                info = json.loads(run_script(self.url, '--daemon-socket', path, 'get-info', 'my_http_source', '--no-cache'))
+                cache_dir = os.path.join(tmp, 'cache')
+                run_script(self.url, '--daemon-socket', path, 'get-chain', 'replace_via', '--cache-dir', cache_dir)
+                cached = os.listdir(cache_dir)
+                lines = run_script(self.url, '--daemon-socket', path, 'subscribe', '--patterns', 'replace_via', '--limit', '3',
+                                   '--format', 'ndjson').splitlines()
+                status = daemon.status()
+            finally:
+                daemon.server.shutdown()
+                thread.join()
+        assert info['componentId'] == 'my_http_source', f"Expected componentId 'my_http_source', got {info['componentId']}"
+        assert [json.loads(line)['componentId'] for line in lines] == ['replace_via'] * 3, f"Unexpected events {lines}"
+        assert (status['requests'], status['taps']) == (2, 1), f"Expected 2 lookups and 1 tap through the daemon, got {status}"
+        assert len(cached) == 1, f"Expected the daemon to store the topology in --cache-dir, got {cached}"
+
+    def test_daemon_reports_drops(self):
+        ours, theirs = socket.socketpair()
+        relay = _Relay(ours, DEFAULT_CODEC, limit=0)  # drops every data frame
+        for n in range(3):
+            relay.send({"id": "1", "type": "data", "payload": {"data": n}}, droppable=True)
+        relay.send({"id": "1", "type": "complete"})
+        relay.close()
+        with theirs.makefile('r') as reader:
+            lines = reader.read().splitlines()
+        theirs.close()
+        ours.close()
+        frames = [json.loads(line) for line in lines]
+        subscriber = VectorEventSubscriber(self.url, ['replace_via'], None, writer=NdjsonEventWriter(out=io.StringIO()))
+        for frame in frames:
+            if frame['type'] == 'dropped':
+                subscriber.on_control(frame)
+        assert [frame['type'] for frame in frames] == ['complete', 'dropped'], f"Unexpected frames {frames}"
+        assert subscriber.stats()['daemon_dropped_frames'] == 3, f"Expected 3 dropped frames reported, got {frames}"
+
+    def test_fleet_node_timeout(self):
+        stalled = MockVectorServer(MockTopology.from_vector_config('vector_config.yaml'), port=0, latency=0.2)
+        url = stalled.start()
+
+        def work(client):
+            client.execute_query(PROBE_QUERY)
+            time.sleep(0.5)  # the node's time runs out between queries
+            return client.execute_query(PROBE_QUERY)
+
+        try:
+            [(_, result, error)] = fleet_map([url], work, timeout=0.4)
+        finally:
+            stalled.stop()
+        assert error == "timed out after 0.4s", f"Expected the node to time out, got result {result}, error {error}"
+        assert stalled.connections == 1, f"Expected no reconnect after the timeout, got {stalled.connections} connections"
+
+    def test_subscribe_reconnect(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        topology = MockTopology.from_vector_config('vector_config.yaml')
+        server = MockVectorServer(topology, port=port)
+        url = server.start()
+        with tempfile.TemporaryFile('w+') as stderr:
+            tap = subprocess.Popen(['python', 'vector_script.py', '--url', url, 'subscribe', '--patterns', 'replace_via',
+                                    '--limit', '200', '--format', 'ndjson', '--reconnect-attempts', '50',
+                                    '--reconnect-delay', '0.2', '--reconnect-max-delay', '0.5'],
+                                   stdout=subprocess.PIPE, stderr=stderr, text=True)
+            watchdog = threading.Timer(30, tap.kill)
+            watchdog.start()
+            try:
+                lines = [tap.stdout.readline() for _ in range(5)]
+                server.stop()  # drops the tap mid-stream
+                time.sleep(1.0)
+                server = MockVectorServer(topology, port=port)
+                server.start()
+                lines += tap.stdout.readlines()
+                tap.wait()
+            finally:
+                watchdog.cancel()
+                tap.kill()
+                tap.stdout.close()
+                server.stop()
+            stderr.seek(0)
+            err = stderr.read()
+        assert tap.returncode == 0, f"Expected the tap to finish after reconnecting, got {tap.returncode}: {err}"
+        events = [json.loads(line) for line in lines]
+        assert len(events) == 200, f"Expected --limit 200 events across the reconnect, got {len(events)}"
+        assert all(e['componentId'] == 'replace_via' for e in events), f"Unexpected components {[e['componentId'] for e in events]}"
+        assert 'Reconnected after a ' in err, f"Expected the gap reported, got {err}"
+        assert ', reconnects 1, gap_seconds ' in err, f"Expected 1 reconnect and its gap in the stats, got {err}"
+
+    def test_batch_pages(self):
+        lines = run_script(self.synthetic_url, '--page-size', '7', 'batch', 'get-info', 'transform_*', '--no-cache').splitlines()
+        ids = sorted(json.loads(line)['componentId'] for line in lines)
+        assert ids == sorted(f"transform_{i}" for i in range(160)), f"Expected 160 transforms, got {len(ids)}"
+
+    def test_chain_health_bottleneck(self):
+        report = json.loads(run_script(self.url, 'chain-health', 'replace_via', '--interval', '1', '--no-cache'))
+        assert report['bottleneck']['componentId'] == 'replace_via', f"Expected bottleneck replace_via, got {report['bottleneck']}"
@@ -0,0 +1,196 @@
+import os
+import random
+import tempfile
+import threading
+import time
+
+from vector_script import (ChainHealth, CounterRates, EventRing, ReservoirSampler, TopologyCache, TopologyGraph,
+                           backoff_delay)
+
+
+def make_graph(pages):
+    graph = TopologyGraph()
+    for kind, nodes in pages:
+        graph.add_nodes(kind, nodes)
+    return graph
+
+
+def ref(component_id, component_type='remap'):
+    return {"componentId": component_id, "componentType": component_type}
+
+
+# my_source -> parse -> enrich -> my_sink, and parse -> my_sink
+TOPOLOGY = [
+    ('sinks', [{**ref('my_sink', 'console'), "sources": [], "transforms": [ref('parse'), ref('enrich')]}]),
+    ('transforms', [{**ref('enrich'), "sources": [], "transforms": [], "sinks": [ref('my_sink', 'console')]},
+                    {**ref('parse'), "sources": [ref('my_source', 'http')], "transforms": [ref('enrich')],
+                     "sinks": [ref('my_sink', 'console')]}]),
+    ('sources', [{**ref('my_source', 'http'), "transforms": [ref('parse')], "sinks": []}]),
+]
+
+
+def make_probe(hostname='vector-1', sources=1, transforms=2, sinks=1):
+    return {"meta": {"versionString": "0.49.0", "hostname": hostname}, "sources": {"totalCount": sources},
+            "transforms": {"totalCount": transforms}, "sinks": {"totalCount": sinks}}
+
+
+def counters(timestamp, received=None, sent=None):
+    metrics = {}
+    if received is not None:
+        metrics['receivedEventsTotal'] = {"timestamp": timestamp, "receivedEventsTotal": received}
+    if sent is not None:
+        metrics['sentEventsTotal'] = {"timestamp": timestamp, "sentEventsTotal": sent}
+    return {"metrics": metrics}
+
+
+class _Highest:
+    """Stands in for random: uniform() returns its upper bound."""
+
+    @staticmethod
+    def uniform(low, high):
+        return high
+
+
+class TestVectorScript:
+    """The building blocks of vector_script.py, without a server."""
+
+    def test_reservoir_window(self):
+        sampler = ReservoirSampler(10, window=3600, rng=random.Random(1))
+        assert sampler.offer(list(range(1000))) == [], "Expected no sample before the window closes"
+        sample = sampler.drain()
+        assert len(sample) == 10 and len(set(sample)) == 10, f"Expected 10 distinct events, got {sample}"
+        assert set(sample) <= set(range(1000)), f"Unexpected events {sample}"
+        assert (sampler.sample, sampler.seen) == ([], 0), "Expected drain() to start a new window"
+        sampler = ReservoirSampler(10, window=0)
+        assert sampler.offer([1, 2, 3]) == [1, 2, 3], "Expected a closed window to return everything under the size"
+
+    def test_reservoir_uniform(self):
+        rng = random.Random(2)
+        picked = [0] * 20
+        for _ in range(5000):
+            sampler = ReservoirSampler(5, window=3600, rng=rng)
+            sampler.offer(range(20))
+            for event in sampler.drain():
+                picked[event] += 1
+        # Each event is kept with probability 5/20: 1250 times in 5000.
+        assert all(1100 < n < 1400 for n in picked), f"Expected every event about 1250 times, got {picked}"
+
+    def test_ring_drop_oldest(self):
+        ring = EventRing(3, 'drop-oldest')
+        ring.put([1, 2])
+        ring.put([3, 4, 5])
+        assert (ring.get(), ring.dropped) == ([3, 4, 5], 2), f"Expected the newest 3 kept and 2 dropped, got {ring.dropped}"
+
+    def test_ring_drop_newest(self):
+        ring = EventRing(3, 'drop-newest')
+        ring.put([1, 2])
+        ring.put([3, 4, 5])
+        assert (ring.get(), ring.dropped) == ([1, 2, 3], 2), f"Expected the oldest 3 kept and 2 dropped, got {ring.dropped}"
+
+    def test_ring_block(self):
+        ring = EventRing(3, 'block')
+        received = []
+
+        def read():
+            time.sleep(0.1)  # let put() fill the ring and wait
+            while True:
+                batch = ring.get(2)
+                if batch is None:
+                    return
+                received.extend(batch)
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        ring.put(list(range(10)))
+        ring.close()
+        reader.join()
+        assert (received, ring.dropped) == (list(range(10)), 0), f"Expected all 10 events in order, got {received}"
+
+    def test_ring_close(self):
+        ring = EventRing(2, 'block')
+        ring.put([1, 2])
+        threading.Timer(0.1, ring.close).start()
+        ring.put([3, 4, 5])  # blocks until closed
+        ring.put([6])
+        assert ring.dropped == 4, f"Expected the 4 events put after the ring filled to be dropped, got {ring.dropped}"
+        assert (ring.get(), ring.get()) == ([1, 2], None), "Expected get() to drain the ring, then return None"
+        try:
+            EventRing(policy='drop-random')
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Expected an unknown overflow policy to be rejected")
+
+    def test_graph(self):
+        graph = make_graph(TOPOLOGY)
+        assert len(graph) == 4, f"Expected 4 components, got {len(graph)}"
+        assert graph.inputs('my_sink') == ['enrich', 'parse'], f"Unexpected inputs {graph.inputs('my_sink')}"
+        assert graph.outputs('parse') == ['enrich', 'my_sink'], f"Unexpected outputs {graph.outputs('parse')}"
+        assert graph.upstream('enrich') == {'enrich', 'parse', 'my_source'}, f"Unexpected upstream {graph.upstream('enrich')}"
+        assert graph.downstream('enrich') == {'enrich', 'my_sink'}, f"Unexpected downstream {graph.downstream('enrich')}"
+        assert graph.connected('enrich') == {'my_source', 'parse', 'enrich', 'my_sink'}, "Expected the whole chain"
+        assert graph.ids_by_kind(['parse', 'my_sink']) == {'transforms': {'parse'}, 'sinks': {'my_sink'}}
+        info = graph.component_info('enrich', {"metrics": {}})
+        assert (info['inputs'], info['outputs']) == (['parse'], ['my_sink']), f"Unexpected edges {info}"
+        assert info['transforms'] == [ref('parse')], f"Expected the upstream transform, got {info['transforms']}"
+        assert 'metrics' in info and 'metrics' not in graph.node('enrich'), "Expected the overlay on a copy of the node"
+
+    def test_graph_page_order(self):
+        forward = make_graph(TOPOLOGY)
+        backward = make_graph(reversed(TOPOLOGY))
+        for id_ in forward.component_ids():
+            assert (forward.inputs(id_), forward.outputs(id_)) == (backward.inputs(id_), backward.outputs(id_)), \
+                f"Expected the same edges for {id_} whatever order the pages came in"
+
+    def test_graph_component(self):
+        graph = TopologyGraph()
+        graph.add_component('sinks', TOPOLOGY[0][1][0])
+        assert graph.inputs('my_sink') == ['enrich', 'parse'], f"Expected the sink's own inputs, got {graph.inputs('my_sink')}"
+        assert 'parse' not in graph, "Expected inputs to be edges only, not components"
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = TopologyCache(tmp)
+            components = dict(TOPOLOGY)
+            cache.store('ws://a/graphql', make_probe(), components)
+            cache.store('ws://b/graphql', make_probe(), components)
+            assert cache.load('ws://a/graphql', make_probe()) == components, "Expected the stored topology"
+            assert cache.load('ws://a/graphql', make_probe(transforms=3)) is None, "Expected a count change to invalidate"
+            assert cache.load('ws://a/graphql', make_probe(hostname='vector-2')) is None, "Expected a new host to invalidate"
+            assert cache.load('ws://c/graphql', make_probe()) is None, "Expected nothing for another endpoint"
+            assert cache.invalidate('ws://a/graphql') == 1, "Expected one entry removed"
+            assert cache.load('ws://a/graphql', make_probe()) is None, "Expected the entry to be gone"
+            assert cache.load('ws://b/graphql', make_probe()) == components, "Expected the other endpoint kept"
+            assert cache.invalidate() == 1 and not os.listdir(tmp), f"Expected every entry removed, left {os.listdir(tmp)}"
+
+    def test_counter_rates(self):
+        rates = CounterRates()
+        assert rates.observe('a', '2024-01-01T00:00:00+00:00', 100) is None, "Expected no rate from one sample"
+        assert rates.observe('a', '2024-01-01T00:00:10+00:00', 600) == 50.0, "Expected 500 events in 10 s"
+        assert rates.observe('a', '2024-01-01T00:00:10+00:00', 700) is None, "Expected no rate before the timestamp moves"
+        assert rates.observe('a', '2024-01-01T00:00:20+00:00', 10) is None, "Expected no rate after a restart"
+        assert rates.observe('a', '2024-01-01T00:00:30+00:00', 110) == 10.0, "Expected rates to resume after a restart"
+
+    def test_chain_health(self):
+        health = ChainHealth(make_graph(TOPOLOGY), ['my_source', 'parse', 'enrich', 'my_sink'])
+        first, second = '2024-01-01T00:00:00+00:00', '2024-01-01T00:00:10+00:00'
+        assert health.order == ['my_source', 'parse', 'enrich', 'my_sink'], f"Unexpected order {health.order}"
+        assert health.observe({id_: counters(first, 0, 0) for id_ in health.order}) is None, "Expected no report yet"
+        report = health.observe({
+            'my_source': counters(second, 1000, 1000),
+            'parse': counters(second, 1000, 1000),
+            'enrich': counters(second, 1000, 500),  # drops half
+            'my_sink': counters(second, 1200, 1200),  # behind parse + enrich
+        })
+        flags = [(f['type'], f['componentId'], f['loss_rate']) for f in report['flags']]
+        assert flags == [('drop', 'enrich', 50.0), ('backlog', 'my_sink', 30.0)], f"Unexpected flags {flags}"
+        assert report['bottleneck']['componentId'] == 'enrich', f"Unexpected bottleneck {report['bottleneck']}"
+        hops = {(h['from'], h['to']): h['rate'] for h in report['hops']}
+        assert hops == {('my_source', 'parse'): 100.0, ('parse', 'enrich'): 100.0, ('enrich', 'my_sink'): 50.0,
+                        ('parse', 'my_sink'): 100.0}, f"Unexpected hops {hops}"
+
+    def test_backoff_delay(self):
+        delays = [backoff_delay(n, base=0.5, max_delay=3.0, rng=_Highest) for n in range(5)]
+        assert delays == [0.5, 1.0, 2.0, 3.0, 3.0], f"Expected doubling delays capped at 3 s, got {delays}"
+        rng = random.Random(3)
+        assert all(0 <= backoff_delay(4, rng=rng) <= 8.0 for _ in range(100)), "Expected jitter within [0, base * 2**n]"
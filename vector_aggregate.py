@@ -0,0 +1,333 @@
+"""Rolling summaries of tapped events instead of the events (``aggregate``).
+
+    python vector_script.py aggregate --patterns 'my_*' --every 10 --top message tags.host
+
+EventAggregator is a writer for VectorEventSubscriber that prints nothing
+per event. It counts events per component, kind and type, keeps the most
+frequent values of the --top fields, a message size histogram and the range
+of each metric's values, and prints a summary every ``every`` seconds and
+once more on close. Every structure is bounded (SpaceSaving keeps
+``capacity`` values per field, at most ``capacity`` component rows are
+counted with the rest summed as other_components, the histogram has fixed
+buckets and metric names are capped), so a tap can run for hours at the
+same size.
+"""
+import bisect
+import heapq
+import json
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+DEFAULT_EVERY = 10.0
+DEFAULT_TOP = 10
+DEFAULT_CAPACITY = 1000
+MAX_KEY_LENGTH = 200
+MAX_METRICS = 1000
+SIZE_BUCKETS = tuple(2 ** n for n in range(4, 25))  # 16 B .. 16 MiB
+
+_NUMBER = re.compile(r'-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?')
+
+
+class SpaceSaving:
+    """Approximate top-k of a stream in ``capacity`` counters (Metwally et al.).
+
+    A value not being tracked replaces the least frequent one and inherits
+    its count, which is then its possible overcount (``error``). Any value
+    seen more than total / capacity times is guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        # (count, key) per tracked key; counts only grow, so an entry is a
+        # lower bound and is refreshed when it reaches the top of the heap.
+        self.heap = []
+        self.total = 0
+
+    def offer(self, key, count=1):
+        self.total += count
+        counts = self.counts
+        if key in counts:
+            counts[key] += count
+            return
+        if len(counts) < self.capacity:
+            counts[key] = count
+            self.errors[key] = 0
+            heapq.heappush(self.heap, (count, key))
+            return
+        while True:
+            smallest, victim = self.heap[0]
+            if counts[victim] == smallest:
+                break
+            heapq.heapreplace(self.heap, (counts[victim], victim))
+        del counts[victim]
+        del self.errors[victim]
+        counts[key] = smallest + count
+        self.errors[key] = smallest
+        heapq.heapreplace(self.heap, (smallest + count, key))
+
+    def top(self, k=DEFAULT_TOP):
+        """[(key, count, error)], most frequent first."""
+        keys = heapq.nlargest(k, self.counts, key=self.counts.get)
+        return [(key, self.counts[key], self.errors[key]) for key in keys]
+
+
+class Histogram:
+    """Counts per fixed bucket (upper bounds ``buckets``), plus min, max and sum."""
+
+    def __init__(self, buckets=SIZE_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the ``fraction`` quantile (at most max)."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        return {"count": self.count, "min": self.min, "p50": self.quantile(0.5), "p90": self.quantile(0.9),
+                "p99": self.quantile(0.99), "max": self.max, "mean": round(self.sum / self.count, 1)}
+
+
+class ValueRange:
+    """Min, max, mean and last of a metric's values."""
+    __slots__ = ('count', 'sum', 'min', 'max', 'last')
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self.last = None
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.last = value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def summary(self):
+        return {"count": self.count, "min": self.min, "max": self.max,
+                "mean": self.sum / self.count, "last": self.last}
+
+
+def metric_number(value):
+    """The first number in a metric value (Vector sends values as strings), or None."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        match = _NUMBER.search(value)
+        if match:
+            return float(match.group())
+    if isinstance(value, dict):
+        for item in value.values():
+            number = metric_number(item)
+            if number is not None:
+                return number
+    return None
+
+
+def _key(value):
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, default=str)
+    return value[:MAX_KEY_LENGTH]
+
+
+class EventAggregator:
+    """Summarizes decoded events; see the module docstring.
+
+    ``top`` maps names to getters over an event (vector_filter.compile_field);
+    ``reset`` makes each summary cover only its own window. Summaries go to
+    ``out`` as text or, with ``output_format='json'``, one JSON object per line.
+    """
+    passthrough = False
+
+    def __init__(self, top=None, k=DEFAULT_TOP, capacity=DEFAULT_CAPACITY, every=DEFAULT_EVERY, reset=False,
+                 output_format='text', out=None):
+        self.top_getters = list((top or {}).items())
+        self.k = k
+        self.capacity = capacity
+        self.every = every
+        self.reset = reset
+        self.output_format = output_format
+        self.out = out or sys.stdout
+        self.status = sys.stderr
+        self.lock = threading.Lock()
+        self.started = self.window_start = time.time()
+        self.total = 0
+        self._clear()
+        self.closed = threading.Event()
+        self.printer = None
+        if every:
+            self.printer = threading.Thread(target=self._print_periodically, daemon=True)
+            self.printer.start()
+
+    def _clear(self):
+        self.events = Counter()
+        self.window = Counter()
+        # Keys in window but not (yet) in events
+        self.window_new = 0
+        self.other_components = 0
+        self.sketches = {name: SpaceSaving(self.capacity) for name, _ in self.top_getters}
+        self.sizes = Histogram()
+        self.metrics = {}
+        self.other_metrics = 0
+
+    def write(self, events, node=None, encoded=False):
+        with self.lock:
+            self.total += len(events)
+            window = self.window
+            for event in events:
+                typename = event.get('__typename')
+                key = (node, event.get('componentId'), event.get('componentKind'), typename)
+                # Bounded like the sketches, for fleets of many nodes and components.
+                if key in window or key in self.events:
+                    window[key] += 1
+                elif len(self.events) + self.window_new < self.capacity:
+                    window[key] += 1
+                    self.window_new += 1
+                else:
+                    self.other_components += 1
+                message = event.get('message')
+                if isinstance(message, str):
+                    self.sizes.observe(len(message.encode()))
+                if typename == 'Metric':
+                    self._observe_metric(event)
+                for name, get in self.top_getters:
+                    value = get(event)
+                    if value is not None:
+                        self.sketches[name].offer(_key(value))
+
+    def _observe_metric(self, event):
+        value = metric_number(event.get('value'))
+        if value is None:
+            return
+        name = event.get('name')
+        if event.get('namespace'):
+            name = f"{event['namespace']}_{name}"
+        metric = self.metrics.get(name)
+        if metric is None:
+            if len(self.metrics) >= MAX_METRICS:
+                self.other_metrics += 1
+                return
+            metric = self.metrics[name] = ValueRange()
+        metric.observe(value)
+
+    def summary(self):
+        """The current summary as a dict; starts a new window."""
+        with self.lock:
+            now = time.time()
+            seconds = max(now - self.window_start, 1e-9)
+            window = self.window
+            self.events.update(window)
+            components = []
+            for key, count in self.events.most_common():
+                node, component, kind, typename = key
+                row = {"componentId": component, "componentKind": kind, "type": typename, "events": count,
+                       "per_sec": round(window.get(key, 0) / seconds, 1)}
+                if node is not None:
+                    row = {"node": node, **row}
+                components.append(row)
+            summary = {
+                "time": now,
+                "window_seconds": round(seconds, 3),
+                "window_events": sum(window.values()),
+                "events": sum(self.events.values()) + self.other_components,
+                "total": self.total,
+                "elapsed_seconds": round(now - self.started, 3),
+                "components": components,
+                "message_bytes": self.sizes.summary(),
+                "top": {name: [{"value": key, "count": count, "error": error}
+                               for key, count, error in sketch.top(self.k)]
+                        for name, sketch in self.sketches.items()},
+                "metrics": {name: metric.summary() for name, metric in sorted(self.metrics.items())},
+            }
+            if self.other_components:
+                summary["other_components"] = self.other_components
+            if self.other_metrics:
+                summary["other_metrics"] = self.other_metrics
+            if self.reset:
+                self._clear()
+            else:
+                self.window = Counter()
+                self.window_new = 0
+            self.window_start = now
+            return summary
+
+    def render(self, summary):
+        if self.output_format == 'json':
+            return json.dumps(summary) + "\n"
+        window_rate = summary['window_events'] / summary['window_seconds']
+        lines = [f"{time.strftime('%H:%M:%S', time.localtime(summary['time']))}  "
+                 f"{summary['window_events']:,} events in {summary['window_seconds']:.1f} s ({window_rate:,.1f}/s)  "
+                 f"{summary['total']:,} since start ({summary['elapsed_seconds']:.0f} s)"]
+        if summary['components']:
+            nodes = any('node' in row for row in summary['components'])
+            width = max(len(str(row['componentId'])) for row in summary['components']) + 2
+            node_width = max(len(str(row.get('node'))) for row in summary['components']) + 2 if nodes else 0
+            lines.append(("node".ljust(node_width) if nodes else "") + f"{'component':<{width}}{'kind':<11}{'type':<19}{'events':>12}{'/s':>12}")
+            for row in summary['components']:
+                node = f"{str(row.get('node')):<{node_width}}" if nodes else ""
+                lines.append(f"{node}{str(row['componentId']):<{width}}{str(row['componentKind'] or '-'):<11}"
+                             f"{str(row['type']):<19}{row['events']:>12,}{row['per_sec']:>12,.1f}")
+        sizes = summary['message_bytes']
+        if sizes['count']:
+            lines.append(f"message bytes: p50 <= {sizes['p50']:,}  p90 <= {sizes['p90']:,}  p99 <= {sizes['p99']:,}  "
+                         f"max {sizes['max']:,}  mean {sizes['mean']:,}")
+        for name, values in summary['top'].items():
+            if not values:
+                continue
+            lines.append(f"top {name}:")
+            for value in values:
+                error = f" (+{value['error']:,})" if value['error'] else ""
+                lines.append(f"  {value['count']:>12,}{error}  {value['value']}")
+        if summary['metrics']:
+            width = max(len(name) for name in summary['metrics']) + 2
+            lines.append(f"{'metric':<{width}}{'count':>10}{'min':>14}{'max':>14}{'mean':>14}{'last':>14}")
+            for name, metric in summary['metrics'].items():
+                lines.append(f"{name:<{width}}{metric['count']:>10,}{metric['min']:>14.6g}{metric['max']:>14.6g}"
+                             f"{metric['mean']:>14.6g}{metric['last']:>14.6g}")
+        return "\n".join(lines) + "\n\n"
+
+    def print_summary(self):
+        self.out.write(self.render(self.summary()))
+        self.out.flush()
+
+    def _print_periodically(self):
+        while not self.closed.wait(self.every):
+            self.print_summary()
+
+    def close(self):
+        self.closed.set()
+        if self.printer is not None:
+            self.printer.join()
+        self.print_summary()
@@ -0,0 +1,402 @@
+"""asyncio API for Vector's GraphQL endpoint.
+
+Same graphql-ws protocol and queries as vector_script.py, built on the
+``websockets`` library so that many queries and taps can share one event loop
+instead of each taking a thread:
+
+    async with AsyncVectorSession(url) as session:
+        data = await session.execute(PROBE_QUERY)
+        async for event in AsyncVectorSubscriber(session, ["replace_via"], limit=10).events():
+            ...
+
+AsyncVectorSession is also the protocol core of vector_script.py, whose
+VectorSession and VectorEventSubscriber run it on an event loop in a thread.
+"""
+import asyncio
+import itertools
+import json
+import time
+
+import websockets
+
+from vector_protocol import (
+    DEFAULT_ACK_TIMEOUT,
+    DEFAULT_CODEC,
+    SUBSCRIPTION_QUERY,
+    subscription_variables,
+)
+
+_COMPLETE = object()
+
+# Tap frames are far larger than asyncio's 64 KiB default line limit.
+DAEMON_LINE_LIMIT = 1 << 30
+
+
+def _closed_error(e):
+    code, reason = (e.rcvd.code, e.rcvd.reason) if e.rcvd is not None else (None, None)
+    return Exception(f"WebSocket connection closed (code: {code}, msg: {reason})")
+
+
+class _Operation:
+    def __init__(self, op_id, future, on_data=None):
+        self.id = op_id
+        self.future = future
+        self.on_data = on_data
+        self.data = None
+        self.errors = None
+        self.timings = {}
+
+
+class _DaemonSocket:
+    """graphql-ws over a vector_daemon socket, one message per line, with the
+    send/recv/close and async iteration of a websocket."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, path, ws_url):
+        reader, writer = await asyncio.open_unix_connection(path, limit=DAEMON_LINE_LIMIT)
+        socket = cls(reader, writer)
+        await socket.send(json.dumps({"url": ws_url}))
+        return socket
+
+    async def send(self, message):
+        try:
+            self.writer.write(message.encode() + b"\n")
+            await self.writer.drain()
+        except OSError as e:
+            raise websockets.ConnectionClosed(None, None) from e
+
+    async def recv(self):
+        try:
+            line = await self.reader.readline()
+        except OSError as e:
+            raise websockets.ConnectionClosed(None, None) from e
+        if not line:
+            raise websockets.ConnectionClosed(None, None)
+        return line.decode()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.recv()
+        except websockets.ConnectionClosed:
+            raise StopAsyncIteration from None
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except OSError:
+            pass
+
+
+class AsyncVectorSession:
+    """One graphql-ws connection multiplexing many operations on an event loop.
+
+    Connects lazily on first use and again after the socket drops. Queries
+    resolve a future; subscriptions feed an asyncio.Queue read by an async
+    iterator, and stopping the iterator (break, aclose or task cancellation)
+    sends ``stop`` for that operation only.
+
+    Frames are decoded with ``codec``; with ``raw_events`` tapped events are
+    left as JSON text (see JsonCodec.loads_frame). ``metrics`` (a
+    vector_metrics.TapMetrics) is told how long each frame took to decode,
+    and frames not addressed to an operation (ka, or vector_daemon's dropped
+    reports) go to ``on_control(frame)``. With ``daemon`` (the socket of a
+    vector_daemon.TapDaemon) the connection goes through the daemon. A frame
+    that does not decode fails every pending operation and drops the socket.
+    """
+
+    def __init__(self, ws_url, ack_timeout=DEFAULT_ACK_TIMEOUT, codec=None, raw_events=False, metrics=None,
+                 on_control=None, daemon=None):
+        self.ws_url = ws_url
+        self.ack_timeout = ack_timeout
+        self.codec = codec or DEFAULT_CODEC
+        self.raw_events = raw_events
+        self.metrics = metrics
+        self.on_control = on_control
+        self.daemon = daemon
+        self.ws = None
+        self.reader = None
+        self.operations = {}
+        self.op_ids = itertools.count(1)
+        self.connect_lock = asyncio.Lock()
+        # perf_counter stamps of the last connect, see latency_breakdown.
+        self.timings = {}
+        # Time spent decoding frames, for --timings.
+        self.decode_seconds = 0.0
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def is_connected(self):
+        return self.ws is not None and self.reader is not None and not self.reader.done()
+
+    async def connect(self):
+        """Open the socket and wait for connection_ack; returns True if a new connection was made."""
+        async with self.connect_lock:
+            if self.is_connected():
+                return False
+            self.timings = {'connect_start': time.perf_counter()}
+            try:
+                if self.daemon is not None:
+                    ws = await _DaemonSocket.connect(self.daemon, self.ws_url)
+                else:
+                    # Vector keeps the connection alive with ka frames.
+                    ws = await websockets.connect(self.ws_url, subprotocols=["graphql-ws"], max_size=None,
+                                                  open_timeout=self.ack_timeout, ping_interval=None)
+            except Exception as e:
+                raise Exception(f"Could not connect to {self.ws_url}: {e}") from e
+            self.timings['socket_open'] = time.perf_counter()
+            try:
+                await ws.send(json.dumps({"type": "connection_init", "payload": {}}))
+                while True:
+                    try:
+                        message = await asyncio.wait_for(ws.recv(), self.ack_timeout)
+                    except asyncio.TimeoutError:
+                        raise Exception(f"No connection_ack received within {self.ack_timeout}s") from None
+                    msg_type = self.codec.loads(message).get('type')
+                    if msg_type == 'connection_ack':
+                        break
+                    if msg_type == 'connection_error':
+                        raise Exception(f"Connection refused: {message}")
+            except BaseException as e:
+                await ws.close()
+                if isinstance(e, websockets.ConnectionClosed):
+                    e = _closed_error(e)
+                if isinstance(e, Exception):
+                    raise Exception(f"Could not connect to {self.ws_url}: {e}") from e
+                raise
+            self.timings['ack'] = time.perf_counter()
+            self.ws = ws
+            self.reader = asyncio.get_running_loop().create_task(self._read(ws))
+            return True
+
+    async def close(self):
+        ws, reader = self.ws, self.reader
+        self.ws = None
+        self.reader = None
+        if ws is not None:
+            await ws.close()
+        if reader is not None:
+            reader.cancel()
+            try:
+                await reader
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._fail_pending(Exception("WebSocket connection closed"))
+
+    def _fail_pending(self, error):
+        pending = list(self.operations.values())
+        self.operations.clear()
+        for op in pending:
+            if not op.future.done():
+                op.future.set_exception(error)
+
+    async def _read(self, ws):
+        error = Exception("WebSocket connection closed")
+        try:
+            async for message in ws:
+                self._receive(message)
+        except websockets.ConnectionClosed as e:
+            error = _closed_error(e)
+        except self.codec.errors as e:
+            error = Exception(f"Invalid frame from {self.ws_url}: {e}")
+        except Exception as e:
+            error = Exception(f"Error processing frame from {self.ws_url}: {e}")
+        finally:
+            if ws is self.ws:
+                self.ws = None
+            self._fail_pending(error)
+        await ws.close()
+
+    def _receive(self, message):
+        started = time.perf_counter()
+        data = self.codec.loads_frame(message, raw_events=self.raw_events)
+        seconds = time.perf_counter() - started
+        self.decode_seconds += seconds
+        if self.metrics is not None:
+            self.metrics.observe_frame(seconds)
+        self._dispatch(data)
+
+    def _dispatch(self, data):
+        msg_type = data.get('type')
+        op = self.operations.get(data.get('id'))
+        if op is None:
+            if data.get('id') is None and self.on_control is not None:
+                self.on_control(data)
+            return
+        op.timings.setdefault('first_data', time.perf_counter())
+        payload = data.get('payload') or {}
+        if msg_type == 'data':
+            if 'errors' in payload:
+                op.errors = payload['errors']
+            elif op.on_data is not None:
+                op.on_data(payload.get('data'))
+            else:
+                op.data = payload.get('data')
+        elif msg_type in ('error', 'complete'):
+            del self.operations[op.id]
+            op.timings['complete'] = time.perf_counter()
+            if op.future.done():
+                return
+            if msg_type == 'error':
+                op.future.set_exception(Exception(payload))
+            elif op.errors:
+                op.future.set_exception(Exception(op.errors))
+            else:
+                op.future.set_result(op.data)
+
+    async def start(self, query, variables=None, on_data=None):
+        """Send a query and return its operation: ``.future`` settles with its
+        data, or for subscriptions, which hand every data payload to
+        on_data(data) instead, when the server completes them or the
+        connection drops. GraphQL errors fail the future once it completes.
+        """
+        reconnected = await self.connect()
+        op = _Operation(str(next(self.op_ids)), asyncio.get_running_loop().create_future(), on_data)
+        if reconnected:
+            op.timings.update(self.timings)
+        self.operations[op.id] = op
+        op.timings['sent'] = time.perf_counter()
+        try:
+            await self.ws.send(json.dumps({
+                "id": op.id,
+                "type": "start",
+                "payload": {
+                    "query": query,
+                    "variables": variables or {}
+                }
+            }))
+        except websockets.ConnectionClosed as e:
+            # The socket went away underneath us; the next call reconnects.
+            self.operations.pop(op.id, None)
+            op.future.set_exception(_closed_error(e))
+        return op
+
+    async def stop(self, op_id):
+        """Stop an operation started with start(); its future settles with None."""
+        op = self.operations.pop(op_id, None)
+        if op is None:
+            return
+        if self.ws is not None:
+            try:
+                await self.ws.send(json.dumps({"id": op_id, "type": "stop"}))
+            except websockets.ConnectionClosed:
+                pass
+        if not op.future.done():
+            op.future.set_result(None)
+
+    async def execute(self, query, variables=None):
+        """Run a query and return its data."""
+        op = await self.start(query, variables)
+        try:
+            return await op.future
+        finally:
+            self.operations.pop(op.id, None)
+
+    async def subscribe(self, query, variables=None):
+        """Async iterator over the data payloads of a subscription."""
+        queue = asyncio.Queue()
+        op = await self.start(query, variables, on_data=queue.put_nowait)
+        op.future.add_done_callback(lambda future: queue.put_nowait(_COMPLETE))
+        try:
+            while True:
+                item = await queue.get()
+                if item is _COMPLETE:
+                    op.future.result()  # raises what ended it, if anything
+                    return
+                yield item
+        finally:
+            await self.stop(op.id)
+
+
+class AsyncVectorClient:
+    def __init__(self, ws_url, session=None, ack_timeout=DEFAULT_ACK_TIMEOUT):
+        self.ws_url = ws_url
+        self.session = session or AsyncVectorSession(ws_url, ack_timeout=ack_timeout)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def execute_query(self, query, variables=None):
+        return await self.session.execute(query, variables)
+
+    async def close(self):
+        await self.session.close()
+
+
+class AsyncVectorSubscriber:
+    """Tap output events of components matching patterns.
+
+    ``session`` may be a URL or an AsyncVectorSession shared with other taps.
+    events() yields decoded events one by one and stops after ``limit``
+    events (None for no limit). ``query`` may be narrowed with
+    build_subscription_query; ``interval`` and ``sample_limit`` are passed
+    to Vector as in VectorEventSubscriber. EventNotification payloads, e.g. patterns
+    that match nothing, are yielded like any other event, unless a ``where``
+    predicate leaves them out; only events it keeps count toward the limit.
+    ``sampler`` (a ReservoirSampler) thins what is left, as in
+    VectorEventSubscriber; its last, partial window is yielded at the end.
+    """
+
+    def __init__(self, session, patterns, limit=None, ack_timeout=DEFAULT_ACK_TIMEOUT, query=SUBSCRIPTION_QUERY,
+                 interval=None, sample_limit=None, where=None, sampler=None):
+        if isinstance(session, str):
+            session = AsyncVectorSession(session, ack_timeout=ack_timeout)
+            self.owns_session = True
+        else:
+            self.owns_session = False
+        self.session = session
+        self.patterns = patterns
+        self.limit = limit
+        self.query = query
+        self.interval = interval
+        if sample_limit is None and limit is not None and where is None:
+            sample_limit = limit
+        self.sample_limit = sample_limit
+        self.where = where
+        self.sampler = sampler
+        self.event_count = 0
+
+    def _limited(self, events):
+        if self.limit is not None:
+            events = events[:max(self.limit - self.event_count, 0)]
+        self.event_count += len(events)
+        return events
+
+    async def events(self):
+        variables = subscription_variables(self.patterns, self.interval, self.sample_limit)
+        stream = self.session.subscribe(self.query, variables)
+        try:
+            async for data in stream:
+                events = (data or {}).get('outputEventsByComponentIdPatterns')
+                if not isinstance(events, list):
+                    continue
+                if self.where is not None:
+                    events = [event for event in events if self.where(event)]
+                if self.sampler is not None:
+                    events = self.sampler.offer(events)
+                for event in self._limited(events):
+                    yield event
+                if self.limit is not None and self.event_count >= self.limit:
+                    return
+            if self.sampler is not None:
+                for event in self._limited(self.sampler.drain()):
+                    yield event
+        finally:
+            await stream.aclose()
+            if self.owns_session:
+                await self.session.close()
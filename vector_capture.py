@@ -0,0 +1,456 @@
+"""Capture files for tapped Vector events.
+
+``vector_script.py record`` writes a capture: a directory of segments, each
+holding the events of a stretch of time, rotated by size or age. A segment
+is
+
+    header   HEADER_SIZE bytes: a JSON object padded with spaces, rewritten
+             when the segment is closed
+    blocks   one after another, each a BLOCK_HEADER (magic, compressed size,
+             event count, first/last receive time) followed by that many
+             bytes of compressed NDJSON, one event per line
+    index    compressed JSON written on close, located by the header's
+             "index": one entry per block with its offset, the receive time
+             of each batch in it, and the componentIds and __typenames it
+             contains; plus the gaps where the tap was reconnecting
+
+Blocks are compressed independently so that a reader can skip to any of
+them. Segments are written as ``<name>.part`` and renamed once complete.
+CaptureReader maps segments with mmap and uses the index to decompress only
+the blocks a query can match; segments without an index (unfinished, or
+from before it existed) are indexed by walking the block headers.
+"""
+import fnmatch
+import gzip
+import json
+import lzma
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from vector_protocol import DEFAULT_CODEC
+
+FORMAT = 'vector-capture'
+VERSION = 1
+HEADER_SIZE = 4096
+BLOCK_MAGIC = b'VCB1'
+BLOCK_HEADER = struct.Struct('<4sIIdd')
+SEGMENT_SUFFIX = '.vcap'
+
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_SEGMENT_SECONDS = 300.0
+DEFAULT_BLOCK_BYTES = 256 * 1024
+DEFAULT_BLOCK_SECONDS = 1.0
+
+
+def _zstd():
+    import zstandard
+    return zstandard.ZstdCompressor(level=3).compress, zstandard.ZstdDecompressor().decompress
+
+
+# name -> () -> (compress, decompress); zstd needs the zstandard package.
+COMPRESSIONS = {
+    'zstd': _zstd,
+    'gzip': lambda: (lambda data: gzip.compress(data, compresslevel=6), gzip.decompress),
+    'lzma': lambda: (lzma.compress, lzma.decompress),
+    'none': lambda: (bytes, bytes),
+}
+
+
+def get_compression(name='auto'):
+    """(name, compress, decompress); 'auto' is zstd if installed, else gzip."""
+    if name == 'auto':
+        try:
+            return ('zstd',) + COMPRESSIONS['zstd']()
+        except ImportError:
+            name = 'gzip'
+    try:
+        return (name,) + COMPRESSIONS[name]()
+    except ImportError as e:
+        raise Exception(f"Compression '{name}' is not available: {e}") from e
+
+
+def _isoformat(seconds):
+    return None if seconds is None else datetime.fromtimestamp(seconds, timezone.utc).isoformat()
+
+
+# Vector puts componentId first and __typename last, and quotes inside string
+# values are escaped, so these find the event's own fields without decoding it.
+# Fleet captures wrap the event as {"node": ..., "event": {...}}, hence the
+# optional second brace.
+_COMPONENT_ID = re.compile(r'"componentId"\s*:\s*"((?:[^"\\]|\\.)*)"')
+_TYPENAME = re.compile(r'"__typename"\s*:\s*"(\w+)"\s*\}(?:\s*\})?\s*$')
+
+
+def event_component(line):
+    match = _COMPONENT_ID.search(line)
+    return match.group(1) if match else None
+
+
+def event_typename(line):
+    match = _TYPENAME.search(line)
+    return match.group(1) if match else None
+
+
+class _Segment:
+    def __init__(self, path, header):
+        self.path = path
+        self.header = header
+        self.file = open(path + '.part', 'wb')
+        self.opened = time.monotonic()
+        self.size = HEADER_SIZE
+        self.events = 0
+        self.blocks = []
+        self.first_time = None
+        self.last_time = None
+        self.gaps = []
+        self.index = None
+        self.write_header(closed=False)
+
+    def write_header(self, closed):
+        header = dict(self.header, events=self.events, blocks=len(self.blocks),
+                      first_time=_isoformat(self.first_time), last_time=_isoformat(self.last_time),
+                      gaps=len(self.gaps), index=self.index, closed=closed)
+        data = json.dumps(header).encode()
+        if len(data) >= HEADER_SIZE:
+            raise ValueError(f"Segment header is {len(data)} bytes, more than {HEADER_SIZE - 1}")
+        self.file.seek(0)
+        self.file.write(data.ljust(HEADER_SIZE - 1) + b"\n")
+        self.file.seek(self.size)
+
+    def write_block(self, compressed, events, first_time, last_time, times, components, typenames):
+        self.blocks.append({
+            "offset": self.size,
+            "size": len(compressed),
+            "events": events,
+            "first_time": first_time,
+            "last_time": last_time,
+            "times": times,
+            "components": sorted(components),
+            "typenames": sorted(typenames),
+        })
+        self.file.write(BLOCK_HEADER.pack(BLOCK_MAGIC, len(compressed), events, first_time, last_time))
+        self.file.write(compressed)
+        # Whole blocks on disk, for extract on a capture still being recorded.
+        self.file.flush()
+        self.size += BLOCK_HEADER.size + len(compressed)
+        self.events += events
+        if self.first_time is None:
+            self.first_time = first_time
+        self.last_time = last_time
+
+    def close(self, compress):
+        index = compress(json.dumps({"blocks": self.blocks, "gaps": self.gaps}).encode())
+        self.file.write(index)
+        self.index = {"offset": self.size, "size": len(index)}
+        self.size += len(index)
+        self.write_header(closed=True)
+        self.file.close()
+        os.replace(self.path + '.part', self.path)
+
+
+class CaptureWriter:
+    """Event writer (like NdjsonEventWriter) that records into segments.
+
+    Events are gathered into blocks of about ``block_bytes`` (or
+    ``block_seconds`` worth), which are compressed and appended to the
+    current segment; a new segment starts once it exceeds ``segment_bytes``
+    or ``segment_seconds``. Compression happens in write(), so it runs on
+    the subscriber's writer thread when the subscriber has a buffer.
+    """
+    passthrough = True
+
+    def __init__(self, directory, endpoint, patterns, prefix='capture', compression='auto',
+                 segment_bytes=DEFAULT_SEGMENT_BYTES, segment_seconds=DEFAULT_SEGMENT_SECONDS,
+                 block_bytes=DEFAULT_BLOCK_BYTES, block_seconds=DEFAULT_BLOCK_SECONDS, codec=None, status=None):
+        self.directory = directory
+        self.prefix = prefix
+        self.compression, self.compress, _ = get_compression(compression)
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.block_bytes = block_bytes
+        self.block_seconds = block_seconds
+        self.codec = codec or DEFAULT_CODEC
+        self.status = status or sys.stderr
+        self.header = {
+            "format": FORMAT,
+            "version": VERSION,
+            "endpoint": endpoint,
+            "patterns": patterns,
+            "compression": self.compression,
+        }
+        self.lock = threading.Lock()
+        self.pending = []
+        self.pending_bytes = 0
+        self.pending_first = None
+        self.pending_last = None
+        self.pending_times = []
+        self.pending_components = set()
+        self.pending_typenames = set()
+        self.pending_gaps = []
+        self.segment = None
+        self.segment_count = 0
+        self.segments = []
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, events, node=None, encoded=False):
+        if not encoded:
+            events = [self.codec.dumps(event) for event in events]
+        if node is not None:
+            prefix = '{"node":' + json.dumps(node) + ',"event":'
+            events = [prefix + event + "}" for event in events]
+        if not events:
+            return
+        now = time.time()
+        with self.lock:
+            if not self.pending:
+                self.pending_first = now
+            self.pending_times.append([len(self.pending), now])
+            for event in events:
+                self.pending_components.add(event_component(event))
+                self.pending_typenames.add(event_typename(event))
+            self.pending.extend(events)
+            self.pending_bytes += sum(len(event) + 1 for event in events)
+            self.pending_last = now
+            if self.pending_bytes >= self.block_bytes or now - self.pending_first >= self.block_seconds:
+                self._seal_block()
+
+    def mark_gap(self, gap):
+        """Note a reconnect gap; stored with the segment of the next block."""
+        with self.lock:
+            self.pending_gaps.append(gap)
+
+    def _seal_block(self):
+        if not self.pending:
+            return
+        if self.segment is not None and (self.segment.size >= self.segment_bytes
+                                         or time.monotonic() - self.segment.opened >= self.segment_seconds):
+            self._close_segment()
+        if self.segment is None:
+            self._open_segment()
+        self.segment.gaps.extend(self.pending_gaps)
+        self.pending_gaps = []
+        data = ("\n".join(self.pending) + "\n").encode()
+        self.segment.write_block(self.compress(data), len(self.pending), self.pending_first, self.pending_last,
+                                 self.pending_times, self.pending_components - {None}, self.pending_typenames - {None})
+        self.pending = []
+        self.pending_bytes = 0
+        self.pending_times = []
+        self.pending_components = set()
+        self.pending_typenames = set()
+
+    def _open_segment(self):
+        self.segment_count += 1
+        started = datetime.now(timezone.utc)
+        name = f"{self.prefix}-{started:%Y%m%dT%H%M%S}-{self.segment_count:05d}{SEGMENT_SUFFIX}"
+        header = dict(self.header, segment=self.segment_count, opened=started.isoformat())
+        self.segment = _Segment(os.path.join(self.directory, name), header)
+
+    def _close_segment(self):
+        segment, self.segment = self.segment, None
+        segment.close(self.compress)
+        self.segments.append(segment.path)
+        print(f"Wrote {segment.path} ({segment.events} events, {segment.size} bytes)", file=self.status)
+
+    def flush(self):
+        with self.lock:
+            self._seal_block()
+
+    def close(self):
+        with self.lock:
+            self._seal_block()
+            if self.segment is not None:
+                self._close_segment()
+
+
+def parse_time(value, reference=None):
+    """Seconds since the epoch for an ISO 8601 timestamp or a time of day.
+
+    A bare time such as "12:03" is taken on the date of ``reference`` (epoch
+    seconds, default now); times without a UTC offset are local time.
+    """
+    if value is None:
+        return None
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        day = datetime.fromtimestamp(reference if reference is not None else time.time()).date()
+        try:
+            moment = datetime.combine(day, datetime.strptime(value, '%H:%M:%S' if value.count(':') == 2 else '%H:%M').time())
+        except ValueError:
+            raise ValueError(f"Cannot parse time '{value}' (use ISO 8601 or HH:MM[:SS])") from None
+    return moment.timestamp()
+
+
+class CaptureSegment:
+    """One segment, memory-mapped; blocks are decompressed on demand."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.header = json.loads(self.map[:HEADER_SIZE])
+        except (ValueError, OSError) as e:
+            self.file.close()
+            raise Exception(f"{path} is not a capture segment: {e}") from e
+        if self.header.get('format') != FORMAT:
+            self.close()
+            raise Exception(f"{path} is not a capture segment")
+        _, _, self.decompress = get_compression(self.header['compression'])
+        self._index = None
+
+    @property
+    def index(self):
+        """The block index, loaded (or rebuilt) the first time it is needed."""
+        if self._index is None:
+            index = self.header.get('index')
+            if index:
+                data = self.decompress(self.map[index['offset']:index['offset'] + index['size']])
+                self._index = json.loads(data)
+            else:
+                self._index = {"blocks": self._scan(), "gaps": []}
+        return self._index
+
+    @property
+    def blocks(self):
+        return self.index['blocks']
+
+    @property
+    def gaps(self):
+        return self.index.get('gaps', [])
+
+    def _scan(self):
+        blocks = []
+        offset = HEADER_SIZE
+        end = len(self.map)
+        while offset + BLOCK_HEADER.size <= end:
+            magic, size, events, first_time, last_time = BLOCK_HEADER.unpack_from(self.map, offset)
+            if magic != BLOCK_MAGIC or offset + BLOCK_HEADER.size + size > end:
+                break  # an unfinished block at the end of a .part file
+            blocks.append({"offset": offset, "size": size, "events": events, "first_time": first_time,
+                           "last_time": last_time, "times": [[0, first_time]], "components": None, "typenames": None})
+            offset += BLOCK_HEADER.size + size
+        return blocks
+
+    @property
+    def first_time(self):
+        if self.header.get('first_time'):
+            return datetime.fromisoformat(self.header['first_time']).timestamp()
+        return self.blocks[0]['first_time'] if self.blocks else None
+
+    @property
+    def last_time(self):
+        if self.header.get('closed') and self.header.get('last_time'):
+            return datetime.fromisoformat(self.header['last_time']).timestamp()
+        return self.blocks[-1]['last_time'] if self.blocks else None
+
+    def block_lines(self, block):
+        start = block['offset'] + BLOCK_HEADER.size
+        return self.decompress(self.map[start:start + block['size']]).decode().splitlines()
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+class CaptureReader:
+    """Filtered, streaming access to the segments of a capture.
+
+    ``paths`` are segment files and/or capture directories. read() yields
+    (receive_time, event_json) in capture order, touching only segments and
+    blocks whose time range, componentIds and __typenames can match.
+    """
+
+    def __init__(self, paths):
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                files.extend(os.path.join(path, name) for name in os.listdir(path)
+                             if name.endswith(SEGMENT_SUFFIX) or name.endswith(SEGMENT_SUFFIX + '.part'))
+            else:
+                files.append(path)
+        self.segments = [CaptureSegment(path) for path in files]
+        self.segments.sort(key=lambda segment: (segment.header.get('opened') or '', segment.header.get('segment') or 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+
+    @property
+    def gaps(self):
+        """Reconnect gaps recorded across the capture, oldest first."""
+        return [gap for segment in self.segments for gap in segment.gaps]
+
+    @property
+    def first_time(self):
+        times = [segment.first_time for segment in self.segments if segment.first_time is not None]
+        return min(times) if times else None
+
+    def read(self, components=None, since=None, until=None, typenames=None):
+        """components are ids or glob patterns; since/until epoch seconds."""
+        matched = {}
+
+        def component_matches(component_id):
+            if component_id not in matched:
+                matched[component_id] = any(fnmatch.fnmatchcase(component_id or '', p) for p in components)
+            return matched[component_id]
+
+        typenames = set(typenames) if typenames else None
+        for segment in self.segments:
+            first, last = segment.first_time, segment.last_time
+            if first is None or (until is not None and first > until) or (since is not None and last < since):
+                continue
+            for block in segment.blocks:
+                if (until is not None and block['first_time'] > until) or (since is not None and block['last_time'] < since):
+                    continue
+                if components and block['components'] is not None \
+                        and not any(component_matches(c) for c in block['components']):
+                    continue
+                if typenames and block['typenames'] is not None and not typenames.intersection(block['typenames']):
+                    continue
+                times = block['times']
+                batch = 0
+                for n, line in enumerate(segment.block_lines(block)):
+                    while batch + 1 < len(times) and times[batch + 1][0] <= n:
+                        batch += 1
+                    received = times[batch][1]
+                    if (since is not None and received < since) or (until is not None and received > until):
+                        continue
+                    if components and not component_matches(event_component(line)):
+                        continue
+                    if typenames and event_typename(line) not in typenames:
+                        continue
+                    yield received, line
+
+
+def replay(events, speed=1.0, out=None):
+    """Write (receive_time, event_json) pairs as NDJSON, paced like the
+    original tap at ``speed`` times real time (0: as fast as possible)."""
+    out = out or sys.stdout
+    started = None
+    first = None
+    count = 0
+    for received, line in events:
+        if speed > 0:
+            if started is None:
+                started, first = time.monotonic(), received
+            delay = (received - first) / speed - (time.monotonic() - started)
+            if delay > 0:
+                out.flush()
+                time.sleep(delay)
+        out.write(line + "\n")
+        count += 1
+    out.flush()
+    return count
@@ -0,0 +1,350 @@
+"""A long-lived daemon that keeps Vector connections warm for vector_script.py.
+
+    python vector_script.py daemon &                # warms --url, listens on the default socket
+    python vector_script.py get-chain replace_via   # answered by the daemon
+    python vector_script.py daemon --stop
+
+Without it every call opens a new graphql-ws connection and pages in the
+whole topology before answering. The daemon keeps one VectorSession per
+endpoint, and that endpoint's TopologyGraph, which is checked against a
+probe on every call, so config reloads are picked up. get-info, get-chain,
+batch, subscribe and aggregate go through it whenever it answers, and
+connect directly otherwise (or always, with --no-daemon). Lookups pass
+their --no-cache and --cache-dir on; --ack-timeout only applies to direct
+connections, the daemon connects to Vector with its own.
+
+The socket speaks newline-delimited JSON. A client first sends
+{"url": ...}, then either {"type": "lookup", "payload": {...}}, answered
+with the ComponentLookup fields, or graphql-ws messages (connection_init,
+start, stop), which are relayed over the endpoint's shared session. That
+way a tap through the daemon behaves as it does over its own connection.
+Data frames dropped because the client fell behind are reported to it as
+{"type": "dropped", "payload": {"frames": n}}, n counting since the last
+such message.
+"""
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from vector_protocol import DEFAULT_ACK_TIMEOUT, DEFAULT_CODEC
+from vector_script import (DEFAULT_PAGE_SIZE, ComponentLookup, TopologyCache, VectorClient, default_cache_dir,
+                           lookup_components)
+
+# Frames queued for a slow client before its data frames are dropped, so
+# that it never stalls the session the other clients share.
+DEFAULT_CLIENT_QUEUE = 1000
+
+
+def default_socket_path():
+    runtime = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime:
+        return os.path.join(runtime, 'vector_script.sock')
+    return os.path.join(default_cache_dir(), 'daemon.sock')
+
+
+def daemon_available(path):
+    """True when a daemon answers on path."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+class DaemonConnection:
+    """Client end of the daemon socket for one endpoint, for lookups. Taps
+    connect with vector_async.AsyncVectorSession(daemon=path) instead."""
+
+    def __init__(self, path, url):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.connect(path)
+        except OSError:
+            self.sock.close()
+            raise
+        self.reader = self.sock.makefile('r', encoding='utf-8')
+        self.lock = threading.Lock()
+        self.send(json.dumps({"url": url}))
+
+    def send(self, message):
+        with self.lock:
+            self.sock.sendall(message.encode() + b"\n")
+
+    def request(self, message):
+        self.send(json.dumps(message))
+        line = self.reader.readline()
+        if not line:
+            raise Exception("Daemon closed the connection")
+        reply = json.loads(line)
+        if reply.get('type') == 'error':
+            raise Exception(reply.get('payload'))
+        return reply.get('payload')
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def daemon_lookup(path, url, mode, names, page_size=DEFAULT_PAGE_SIZE, refresh=False, metrics=True, cache=True,
+                  cache_dir=None):
+    """lookup_components, answered by the daemon on path.
+
+    ``cache`` False keeps the daemon off the topology cache, ``cache_dir``
+    points it at another one than its own. Its phases are the daemon's,
+    plus 'daemon': the rest of the round trip.
+    """
+    started = time.perf_counter()
+    connection = DaemonConnection(path, url)
+    try:
+        result = connection.request({"type": "lookup", "payload": {
+            "mode": mode, "names": names, "page_size": page_size, "refresh": refresh, "metrics": metrics,
+            "cache": cache, "cache_dir": cache_dir and os.path.abspath(cache_dir)}})
+    finally:
+        connection.close()
+    phases = result['phases']
+    phases['daemon'] = max(time.perf_counter() - started - sum(phases.values()), 0.0)
+    return ComponentLookup(result['probe'], result['ids'], result['unmatched'], result['infos'], result['chains'], phases)
+
+
+class _Relay:
+    """Writes messages to one client from a thread of its own, so that the
+    session's reader thread never waits on a slow client. Past ``limit``
+    queued messages, data frames are dropped, counted, and reported to the
+    client once it catches up."""
+
+    def __init__(self, sock, codec, limit=DEFAULT_CLIENT_QUEUE):
+        self.sock = sock
+        self.codec = codec
+        self.limit = limit
+        self.queue = queue.Queue()
+        # Guards dropped and reported, counted on the session's thread and
+        # reported from this one.
+        self.lock = threading.Lock()
+        self.dropped = 0
+        self.reported = 0
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def send(self, message, droppable=False):
+        if self.closed:
+            return
+        if droppable and self.queue.qsize() >= self.limit:
+            with self.lock:
+                self.dropped += 1
+            return
+        self.queue.put(message)
+
+    def _run(self):
+        while True:
+            messages = [self.queue.get()]
+            while not self.queue.empty() and messages[-1] is not None:
+                messages.append(self.queue.get_nowait())
+            done = messages[-1] is None
+            if done:
+                messages.pop()
+            with self.lock:
+                unreported = self.dropped - self.reported
+                self.reported = self.dropped
+            if unreported:
+                messages.append({"type": "dropped", "payload": {"frames": unreported}})
+            if messages and not self.closed:
+                try:
+                    self.sock.sendall("".join(self.codec.dumps(m) + "\n" for m in messages).encode())
+                except OSError:
+                    self.closed = True
+            if done:
+                return
+
+    def close(self):
+        """Send what is queued, then hang up on the client."""
+        self.queue.put(None)
+        self.thread.join()
+        self.closed = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class TapDaemon:
+    """Serves vector_script.py clients on a Unix socket; see the module docstring."""
+
+    def __init__(self, path, ack_timeout=DEFAULT_ACK_TIMEOUT, codec=None, cache=None, page_size=DEFAULT_PAGE_SIZE):
+        self.path = path
+        self.ack_timeout = ack_timeout
+        self.codec = codec or DEFAULT_CODEC
+        self.cache = cache
+        self.page_size = page_size
+        self.clients = {}
+        # Last TopologyGraph per endpoint, see lookup_components.
+        self.graphs = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.taps = 0
+        self.server = None
+
+    def client(self, url):
+        with self.lock:
+            client = self.clients.get(url)
+            if client is None:
+                client = self.clients[url] = VectorClient(url, ack_timeout=self.ack_timeout, codec=self.codec)
+            return client
+
+    def warm(self, url):
+        """Connect to url and load its topology before the first call needs it."""
+        lookup_components(self.client(url), self.cache, 'get-info', [], page_size=self.page_size,
+                          metrics=False, graphs=self.graphs)
+
+    def status(self):
+        return {
+            "pid": os.getpid(),
+            "socket": self.path,
+            "uptime_seconds": round(time.time() - self.started, 3),
+            "requests": self.requests,
+            "taps": self.taps,
+            "endpoints": {url: {"connected": client.session.is_connected(),
+                                "components": len(self.graphs[url][0]) if url in self.graphs else None}
+                          for url, client in list(self.clients.items())},
+        }
+
+    def _lookup(self, url, request):
+        if not request.get('cache', True):
+            cache = None
+        elif request.get('cache_dir'):
+            cache = TopologyCache(request['cache_dir'])
+        else:
+            cache = self.cache
+        lookup = lookup_components(self.client(url), cache, request.get('mode', 'get-info'), request.get('names', []),
+                                   page_size=request.get('page_size') or self.page_size,
+                                   refresh=request.get('refresh', False), metrics=request.get('metrics', True),
+                                   graphs=self.graphs)
+        return {"probe": lookup.probe, "ids": lookup.ids, "unmatched": lookup.unmatched, "infos": lookup.infos,
+                "chains": lookup.chains, "phases": lookup.phases}
+
+    def _start(self, url, message, relay):
+        session = self.client(url).session
+        op_id = message.get('id')
+        payload = message.get('payload') or {}
+
+        def on_data(data):
+            relay.send({"id": op_id, "type": "data", "payload": {"data": data}}, droppable=True)
+
+        def done(future):
+            error = future.exception()
+            if error is None:
+                relay.send({"id": op_id, "type": "complete"})
+            elif session.is_connected():
+                relay.send({"id": op_id, "type": "error", "payload": str(error)})
+            else:
+                # Vector went away: hang up too, so the client reconnects
+                # (through us) as it would have over its own socket.
+                threading.Thread(target=relay.close, daemon=True).start()
+
+        future = session.submit(payload.get('query'), payload.get('variables'), on_data=on_data)
+        future.add_done_callback(done)
+        with self.lock:
+            self.taps += 1
+        return session, future
+
+    def serve_client(self, rfile, sock):
+        header = rfile.readline()
+        if not header:
+            return  # daemon_available() checking on us
+        url = json.loads(header).get('url')
+        relay = _Relay(sock, self.codec)
+        operations = {}
+        try:
+            for line in rfile:
+                message = json.loads(line)
+                kind = message.get('type')
+                if kind == 'lookup':
+                    with self.lock:
+                        self.requests += 1
+                    try:
+                        relay.send({"type": "lookup", "payload": self._lookup(url, message.get('payload') or {})})
+                    except Exception as e:
+                        relay.send({"type": "error", "payload": str(e) or type(e).__name__})
+                elif kind == 'connection_init':
+                    try:
+                        self.client(url).session.connect()
+                        relay.send({"type": "connection_ack"})
+                    except Exception as e:
+                        relay.send({"type": "connection_error", "payload": str(e)})
+                elif kind == 'start':
+                    try:
+                        operations[message.get('id')] = self._start(url, message, relay)
+                    except Exception as e:
+                        relay.send({"id": message.get('id'), "type": "error", "payload": str(e)})
+                elif kind == 'stop':
+                    session, future = operations.pop(message.get('id'), (None, None))
+                    if future is not None:
+                        session.stop(future)
+                elif kind == 'status':
+                    relay.send({"type": "status", "payload": self.status()})
+                elif kind == 'shutdown':
+                    relay.send({"type": "shutdown", "payload": self.status()})
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    break
+        except (OSError, ValueError):
+            pass
+        finally:
+            for session, future in operations.values():
+                session.stop(future)
+            if relay.dropped:
+                print(f"Dropped {relay.dropped} frames for a client that fell behind.", file=sys.stderr)
+            relay.close()
+
+    def listen(self):
+        """Bind the socket; raises if another daemon already answers on it."""
+        if daemon_available(self.path):
+            raise Exception(f"A daemon is already listening on {self.path}")
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)  # left behind by one that died
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                daemon.serve_client(self.rfile, self.connection)
+
+        # Only this user may connect.
+        umask = os.umask(0o077)
+        try:
+            self.server = socketserver.ThreadingUnixStreamServer(self.path, Handler)
+        finally:
+            os.umask(umask)
+        self.server.daemon_threads = True
+
+    def serve_forever(self):
+        if self.server is None:
+            self.listen()
+        try:
+            self.server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        if self.server is not None:
+            self.server.server_close()
+            self.server = None
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+        for client in list(self.clients.values()):
+            client.close()
@@ -0,0 +1,282 @@
+"""Client-side event filters for taps (``--where``).
+
+    python vector_script.py subscribe --patterns 'my_*' --where '.level == "error" and componentKind == "source"'
+
+An expression compares fields of each tapped event:
+
+    componentKind == "transform"       tap fields: componentId, componentKind,
+    __typename != "Metric"             __typename, message, name, value, ...
+    .level == "error"                  a leading dot reads the event itself
+    .status >= 500                     (decoded from the tap's ``string``
+    .http.path =~ "^/api/"             field), like a VRL path
+    tags.host == "web-1"               metric tags are looked up by key
+    message !~ /timeout|refused/i      regexes: a string or /.../ with flags i, m, s
+
+Comparisons (== != =~ !~ < <= > >=) combine with and, or, not and
+parentheses; a path on its own is true when the field is present and
+truthy. Numbers compare numerically, also against numeric strings (metric
+values are strings); anything that does not compare is false rather than
+an error. compile_filter() turns an expression into a predicate once, so
+evaluating it is a few closure calls per event.
+"""
+import json
+import operator
+import re
+
+from vector_protocol import EVENT_FIELDS
+
+TAP_FIELDS = frozenset(name for fields in EVENT_FIELDS.values() for name in fields) | {'__typename'}
+
+_TOKEN = re.compile(r'''
+    \s*(?:
+      (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+    | (?P<regex>/(?:[^/\\]|\\.)*/[ims]*)
+    | (?P<number>-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)
+    | (?P<op>==|!=|=~|!~|<=|>=|<|>)
+    | (?P<paren>[()])
+    | (?P<path>\.?[A-Za-z_][\w-]*(?:\.[A-Za-z_][\w-]*)*)
+    )''', re.VERBOSE)
+
+_KEYWORDS = {'and', 'or', 'not', 'true', 'false', 'null'}
+_ORDERING = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+
+class _Event:
+    """An event with its body decoded on first use."""
+    __slots__ = ('fields', '_body')
+
+    def __init__(self, fields):
+        self.fields = fields
+        self._body = _Event
+
+    @property
+    def body(self):
+        if self._body is _Event:
+            encoded = self.fields.get('string') if isinstance(self.fields, dict) else None
+            try:
+                self._body = json.loads(encoded) if encoded else None
+            except ValueError:
+                self._body = None
+        return self._body
+
+
+def _lookup(value, keys):
+    for key in keys:
+        if isinstance(value, dict):
+            value = value.get(key)
+        elif isinstance(value, list):
+            # Metric tags: [{"key": ..., "value": ...}, ...]
+            value = next((t.get('value') for t in value if isinstance(t, dict) and t.get('key') == key), None)
+        else:
+            return None
+        if value is None:
+            return None
+    return value
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _tokenize(text):
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Unexpected {text[position:].strip()[:20]!r} at position {position} in filter {text!r}")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind), match.start(kind)))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.position = 0
+        self.fields = set()
+
+    def error(self, message):
+        where = self.tokens[self.position][2] if self.position < len(self.tokens) else len(self.text)
+        return ValueError(f"{message} at position {where} in filter {self.text!r}")
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None, None)
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def keyword(self, word):
+        kind, value, _ = self.peek()
+        if kind == 'path' and value == word:
+            self.position += 1
+            return True
+        return False
+
+    def parse(self):
+        predicate = self.parse_or()
+        if self.position < len(self.tokens):
+            raise self.error(f"Unexpected {self.peek()[1]!r}")
+        return predicate
+
+    def parse_or(self):
+        terms = [self.parse_and()]
+        while self.keyword('or'):
+            terms.append(self.parse_and())
+        if len(terms) == 1:
+            return terms[0]
+        return lambda event: any(term(event) for term in terms)
+
+    def parse_and(self):
+        terms = [self.parse_not()]
+        while self.keyword('and'):
+            terms.append(self.parse_not())
+        if len(terms) == 1:
+            return terms[0]
+        return lambda event: all(term(event) for term in terms)
+
+    def parse_not(self):
+        if self.keyword('not'):
+            term = self.parse_not()
+            return lambda event: not term(event)
+        kind, value, _ = self.peek()
+        if kind == 'paren' and value == '(':
+            self.take()
+            term = self.parse_or()
+            if self.take()[1] != ')':
+                self.position -= 1
+                raise self.error("Expected ')'")
+            return term
+        return self.parse_comparison()
+
+    def parse_path(self):
+        kind, value, _ = self.take()
+        if kind != 'path' or value in _KEYWORDS:
+            self.position -= 1
+            raise self.error("Expected a field")
+        if value.startswith('.'):
+            keys = value[1:].split('.')
+            self.fields.add('string')
+            return lambda event: _lookup(event.body, keys)
+        keys = value.split('.')
+        if keys[0] not in TAP_FIELDS:
+            self.position -= 1
+            raise self.error(f"Unknown field '{keys[0]}' (tap fields: {', '.join(sorted(TAP_FIELDS))}; "
+                             f"use .{value} for a field of the event itself)")
+        self.fields.add(keys[0])
+        if len(keys) == 1:
+            name = keys[0]
+            return lambda event: event.fields.get(name)
+        return lambda event: _lookup(event.fields, keys)
+
+    def parse_value(self, op):
+        kind, value, _ = self.take()
+        if kind == 'string':
+            # Only quotes and backslashes are escaped, so "\d+" stays a regex.
+            return re.sub(r'\\([\\"\'])', r'\1', value[1:-1])
+        if kind == 'number':
+            return float(value) if any(c in value for c in '.eE') else int(value)
+        if kind == 'regex' and op in ('=~', '!~'):
+            body, _, flags = value[1:].rpartition('/')
+            try:
+                return re.compile(body, sum(getattr(re, f.upper()) for f in flags))
+            except re.error as e:
+                self.position -= 1
+                raise self.error(f"Bad regex: {e}") from None
+        if kind == 'path' and value in ('true', 'false', 'null'):
+            return {'true': True, 'false': False, 'null': None}[value]
+        self.position -= 1
+        raise self.error("Expected a value")
+
+    def parse_comparison(self):
+        get = self.parse_path()
+        kind, op, _ = self.peek()
+        if kind != 'op':
+            return lambda event: bool(get(event))
+        self.take()
+        value = self.parse_value(op)
+
+        if op in ('=~', '!~'):
+            try:
+                pattern = value if isinstance(value, re.Pattern) else re.compile(str(value))
+            except re.error as e:
+                raise self.error(f"Bad regex: {e}") from None
+            search = pattern.search
+
+            def matches(event):
+                found = get(event)
+                return found is not None and search(found if isinstance(found, str) else str(found)) is not None
+            return matches if op == '=~' else (lambda event: not matches(event))
+
+        number = _number(value)
+        if op in ('==', '!='):
+            def equals(event):
+                found = get(event)
+                if found == value:
+                    return True
+                # 500 == "500": metric values and many log fields are strings.
+                return number is not None and _number(found) == number
+            return equals if op == '==' else (lambda event: not equals(event))
+
+        compare = _ORDERING[op]
+        if number is not None:
+            def ordered(event):
+                found = _number(get(event))
+                return found is not None and compare(found, number)
+        elif isinstance(value, str):
+            def ordered(event):
+                found = get(event)
+                return isinstance(found, str) and compare(found, value)
+        else:
+            raise self.error(f"Cannot order by {value!r}")
+        return ordered
+
+
+def compile_field(text):
+    """Getter for one field written as in a filter (``message``, ``tags.host``,
+    ``.status``), over decoded tap events. Its ``fields`` are the tap fields it reads."""
+    parser = _Parser(text)
+    get = parser.parse_path()
+    if parser.position < len(parser.tokens):
+        raise parser.error(f"Unexpected {parser.peek()[1]!r}")
+
+    def getter(fields):
+        return get(_Event(fields))
+
+    getter.fields = frozenset(parser.fields)
+    return getter
+
+
+def compile_filter(expressions):
+    """Predicate over decoded tap events that is true when every expression
+    holds. Its ``fields`` are the tap fields the expressions read."""
+    if isinstance(expressions, str):
+        expressions = [expressions]
+    fields = set()
+    terms = []
+    for text in expressions:
+        parser = _Parser(text)
+        terms.append(parser.parse())
+        fields |= parser.fields
+    term = terms[0] if len(terms) == 1 else (lambda event: all(t(event) for t in terms))
+
+    def predicate(fields):
+        return term(_Event(fields))
+
+    predicate.fields = frozenset(fields)
+    predicate.expressions = list(expressions)
+    return predicate
@@ -0,0 +1,165 @@
+"""Prometheus text-format self-metrics for long-running taps.
+
+    python vector_script.py record --output captures/tap --patterns 'my_*' --metrics-port 9598
+    curl -s localhost:9598/metrics
+
+VectorEventSubscriber reports each frame's decode time and each batch's
+write time to a TapMetrics; event counts and queue depth come from the
+subscriber's stats() when the metrics are rendered. MetricsServer serves
+them over HTTP, MetricsFile rewrites a file every few seconds (e.g. for
+node_exporter's textfile collector).
+"""
+import bisect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = 'vector_tap_'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+DEFAULT_FILE_INTERVAL = 10.0
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histogram:
+    """Cumulative-bucket histogram; observe() is safe from any thread."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def render(self, name, help_text):
+        with self.lock:
+            counts, total = list(self.counts), self.sum
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        cumulative = 0
+        for bound, count in zip(self.buckets + (None,), counts):
+            cumulative += count
+            le = '+Inf' if bound is None else repr(float(bound))
+            lines.append(f'{name}_bucket{{le="{le}"}} {cumulative}')
+        lines.append(f"{name}_sum {total}")
+        lines.append(f"{name}_count {cumulative}")
+        return lines
+
+
+class TapMetrics:
+    """What one tap exposes; ``labels`` end up on the vector_tap_info series."""
+
+    def __init__(self, labels=None, buckets=DEFAULT_BUCKETS):
+        self.labels = labels or {}
+        self.started = time.time()
+        self.frames = 0
+        self.reconnects = 0
+        self.gap_seconds = 0.0
+        self.decode = Histogram(buckets)
+        self.write = Histogram(buckets)
+
+    def observe_frame(self, seconds):
+        self.frames += 1
+        self.decode.observe(seconds)
+
+    def observe_write(self, seconds):
+        self.write.observe(seconds)
+
+    def observe_gap(self, seconds):
+        self.reconnects += 1
+        self.gap_seconds += seconds
+
+    def render(self, stats):
+        """Prometheus text exposition, given the subscriber's stats()."""
+        lines = []
+
+        def sample(name, kind, help_text, value):
+            lines.extend([f"# HELP {PREFIX}{name} {help_text}", f"# TYPE {PREFIX}{name} {kind}",
+                          f"{PREFIX}{name} {value}"])
+
+        labels = ",".join(f'{key}="{_escape(value)}"' for key, value in self.labels.items())
+        lines.extend([f"# HELP {PREFIX}info Tap endpoint and patterns.", f"# TYPE {PREFIX}info gauge",
+                      f"{PREFIX}info{{{labels}}} 1"])
+        sample('start_time_seconds', 'gauge', 'Unix time the tap started.', self.started)
+        sample('frames_total', 'counter', 'graphql-ws frames received.', self.frames)
+        sample('events_received_total', 'counter', 'Events received from Vector.', stats['received'])
+        sample('events_written_total', 'counter', 'Events handed to the output.', stats['written'])
+        sample('events_dropped_total', 'counter', 'Events dropped by the overflow policy.', stats.get('dropped', 0))
+        sample('daemon_frames_dropped_total', 'counter', 'Frames vector_daemon dropped for falling behind.',
+               stats.get('daemon_dropped_frames', 0))
+        sample('queue_depth', 'gauge', 'Events waiting for the writer thread.', stats.get('buffered', 0))
+        sample('reconnects_total', 'counter', 'Times the tap reconnected to Vector.', self.reconnects)
+        sample('gap_seconds_total', 'counter', 'Time spent disconnected between reconnects.', self.gap_seconds)
+        lines.extend(self.decode.render(f"{PREFIX}decode_seconds", 'Time to decode one frame.'))
+        lines.extend(self.write.render(f"{PREFIX}write_seconds", 'Time to write one batch of events.'))
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves render() at http://host:port/metrics from a daemon thread."""
+
+    def __init__(self, render, port, host='127.0.0.1'):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MetricsFile:
+    """Rewrites render() to ``path`` every ``interval`` seconds and on close."""
+
+    def __init__(self, render, path, interval=DEFAULT_FILE_INTERVAL):
+        self.render = render
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.write()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def write(self):
+        # Written aside and renamed, so a scraper never reads half a file.
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp, self.path)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.write()
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
+        self.write()
@@ -0,0 +1,821 @@
+"""Stand-in for Vector's GraphQL API, spoken over the graphql-ws subprotocol.
+
+Answers the queries and subscriptions vector_script.py sends from a topology
+loaded from a Vector config file or generated synthetically, so the CLI can be
+tested and benchmarked without a running Vector.
+
+    python vector_mock_server.py --config vector_config.yaml
+    python vector_mock_server.py --synthetic 10000 --fanout 3 --rate 5000
+
+Tests can run one in the background on a free port:
+
+    server = MockVectorServer(MockTopology.from_vector_config('vector_config.yaml'), port=0)
+    url = server.start()
+    ...
+    server.stop()
+
+Needs graphql-core and websockets (and pyyaml for --config).
+"""
+import argparse
+import asyncio
+import base64
+import fnmatch
+import inspect
+import itertools
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+import graphql
+import websockets
+
+SCHEMA_SDL = """
+scalar DateTime
+scalar Json
+
+type Query {
+  sources(after: String, before: String, first: Int, last: Int, filter: SourcesFilter): SourceConnection!
+  transforms(after: String, before: String, first: Int, last: Int, filter: TransformsFilter): TransformConnection!
+  sinks(after: String, before: String, first: Int, last: Int, filter: SinksFilter): SinkConnection!
+  hostMetrics: HostMetrics!
+  meta: Meta!
+}
+
+type Subscription {
+  outputEventsByComponentIdPatterns(outputsPatterns: [String!]!, inputsPatterns: [String!], limit: Int! = 100, interval: Int! = 500): [OutputEventsPayload!]!
+  componentReceivedEventsThroughputs(interval: Int! = 1000): [ComponentReceivedEventsThroughput!]!
+  componentSentEventsThroughputs(interval: Int! = 1000): [ComponentSentEventsThroughput!]!
+  componentReceivedBytesThroughputs(interval: Int! = 1000): [ComponentReceivedBytesThroughput!]!
+  componentSentBytesThroughputs(interval: Int! = 1000): [ComponentSentBytesThroughput!]!
+}
+
+input StringFilter {
+  equals: String
+  notEquals: String
+  contains: String
+  notContains: String
+  startsWith: String
+  endsWith: String
+}
+
+input SourcesFilter {
+  componentId: [StringFilter!]
+  componentType: [StringFilter!]
+  or: [SourcesFilter!]
+}
+
+input TransformsFilter {
+  componentId: [StringFilter!]
+  componentType: [StringFilter!]
+  or: [TransformsFilter!]
+}
+
+input SinksFilter {
+  componentId: [StringFilter!]
+  componentType: [StringFilter!]
+  or: [SinksFilter!]
+}
+
+type PageInfo {
+  hasNextPage: Boolean!
+  hasPreviousPage: Boolean!
+  startCursor: String
+  endCursor: String
+}
+
+type SourceConnection {
+  nodes: [Source!]!
+  pageInfo: PageInfo!
+  totalCount: Int!
+}
+
+type TransformConnection {
+  nodes: [Transform!]!
+  pageInfo: PageInfo!
+  totalCount: Int!
+}
+
+type SinkConnection {
+  nodes: [Sink!]!
+  pageInfo: PageInfo!
+  totalCount: Int!
+}
+
+enum SourceOutputType {
+  LOG
+  METRIC
+  TRACE
+}
+
+enum EventEncodingType {
+  JSON
+  YAML
+  LOGFMT
+}
+
+enum MetricKind {
+  INCREMENTAL
+  ABSOLUTE
+}
+
+type Source {
+  componentId: String!
+  componentType: String!
+  outputTypes: [SourceOutputType!]!
+  outputs: [Output!]!
+  transforms: [Transform!]!
+  sinks: [Sink!]!
+  metrics: SourceMetrics!
+}
+
+type Transform {
+  componentId: String!
+  componentType: String!
+  outputs: [Output!]!
+  sources: [Source!]!
+  transforms: [Transform!]!
+  sinks: [Sink!]!
+  metrics: TransformMetrics!
+}
+
+type Sink {
+  componentId: String!
+  componentType: String!
+  sources: [Source!]!
+  transforms: [Transform!]!
+  metrics: SinkMetrics!
+}
+
+type Output {
+  outputId: String!
+  sentEventsTotal: SentEventsTotal
+}
+
+type ReceivedBytesTotal {
+  timestamp: DateTime
+  receivedBytesTotal: Float!
+}
+
+type ReceivedEventsTotal {
+  timestamp: DateTime
+  receivedEventsTotal: Float!
+}
+
+type SentEventsTotal {
+  timestamp: DateTime
+  sentEventsTotal: Float!
+}
+
+type SentBytesTotal {
+  timestamp: DateTime
+  sentBytesTotal: Float!
+}
+
+interface SourceMetrics {
+  receivedBytesTotal: ReceivedBytesTotal
+  receivedEventsTotal: ReceivedEventsTotal
+  sentEventsTotal: SentEventsTotal
+}
+
+type GenericSourceMetrics implements SourceMetrics {
+  receivedBytesTotal: ReceivedBytesTotal
+  receivedEventsTotal: ReceivedEventsTotal
+  sentEventsTotal: SentEventsTotal
+}
+
+type FileSourceMetricFile {
+  name: String!
+  receivedBytesTotal: ReceivedBytesTotal
+  receivedEventsTotal: ReceivedEventsTotal
+  sentEventsTotal: SentEventsTotal
+}
+
+type FileSourceMetricFileConnection {
+  nodes: [FileSourceMetricFile!]!
+  pageInfo: PageInfo!
+  totalCount: Int!
+}
+
+type FileSourceMetrics implements SourceMetrics {
+  files(after: String, before: String, first: Int, last: Int): FileSourceMetricFileConnection!
+  receivedBytesTotal: ReceivedBytesTotal
+  receivedEventsTotal: ReceivedEventsTotal
+  sentEventsTotal: SentEventsTotal
+}
+
+interface TransformMetrics {
+  receivedEventsTotal: ReceivedEventsTotal
+  sentEventsTotal: SentEventsTotal
+}
+
+type GenericTransformMetrics implements TransformMetrics {
+  receivedEventsTotal: ReceivedEventsTotal
+  sentEventsTotal: SentEventsTotal
+}
+
+interface SinkMetrics {
+  receivedEventsTotal: ReceivedEventsTotal
+  sentBytesTotal: SentBytesTotal
+  sentEventsTotal: SentEventsTotal
+}
+
+type GenericSinkMetrics implements SinkMetrics {
+  receivedEventsTotal: ReceivedEventsTotal
+  sentBytesTotal: SentBytesTotal
+  sentEventsTotal: SentEventsTotal
+}
+
+type MemoryMetrics {
+  totalBytes: Float!
+  freeBytes: Float!
+  availableBytes: Float!
+  activeBytes: Float
+  buffersBytes: Float
+  cachedBytes: Float
+  sharedBytes: Float
+  usedBytes: Float
+  inactiveBytes: Float
+  wiredBytes: Float
+}
+
+type SwapMetrics {
+  freeBytes: Float!
+  totalBytes: Float!
+  usedBytes: Float!
+  swappedInBytesTotal: Float
+  swappedOutBytesTotal: Float
+}
+
+type CpuMetrics {
+  cpuSecondsTotal: Float!
+}
+
+type LoadAverageMetrics {
+  load1: Float!
+  load5: Float!
+  load15: Float!
+}
+
+type NetworkMetrics {
+  receiveBytesTotal: Float!
+  receiveErrsTotal: Float!
+  receivePacketsTotal: Float
+  transmitBytesTotal: Float!
+  transmitErrsTotal: Float!
+  transmitPacketsDropTotal: Float
+  transmitPacketsTotal: Float
+}
+
+type FileSystemMetrics {
+  freeBytes: Float!
+  totalBytes: Float!
+  usedBytes: Float!
+}
+
+type DiskMetrics {
+  readBytesTotal: Float!
+  readsCompletedTotal: Float!
+  writtenBytesTotal: Float!
+  writesCompletedTotal: Float!
+}
+
+type TcpMetrics {
+  tcpConnsTotal: Float!
+  tcpTxQueuedBytesTotal: Float!
+  tcpRxQueuedBytesTotal: Float!
+}
+
+type HostMetrics {
+  memory: MemoryMetrics!
+  swap: SwapMetrics!
+  cpu: CpuMetrics!
+  loadAverage: LoadAverageMetrics
+  network: NetworkMetrics!
+  filesystem: FileSystemMetrics!
+  disk: DiskMetrics!
+  tcp: TcpMetrics
+}
+
+type Meta {
+  versionString: String!
+  hostname: String
+}
+
+type Tag {
+  key: String!
+  value: String!
+}
+
+type Log {
+  componentId: String!
+  componentType: String!
+  componentKind: String!
+  message: String
+  timestamp: DateTime
+  string(encoding: EventEncodingType!): String!
+  json(field: String!): Json
+}
+
+type Metric {
+  componentId: String!
+  componentType: String!
+  componentKind: String!
+  timestamp: DateTime
+  name: String!
+  namespace: String
+  kind: MetricKind!
+  valueType: String!
+  value: String!
+  tags: [Tag!]
+  string(encoding: EventEncodingType!): String!
+}
+
+type Trace {
+  componentId: String!
+  componentType: String!
+  componentKind: String!
+  string(encoding: EventEncodingType!): String!
+  json(field: String!): Json
+}
+
+type EventNotification {
+  message: String!
+}
+
+union OutputEventsPayload = Log | Metric | EventNotification | Trace
+
+type ComponentReceivedEventsThroughput {
+  componentId: String!
+  throughput: Int!
+}
+
+type ComponentSentEventsThroughput {
+  componentId: String!
+  throughput: Int!
+}
+
+type ComponentReceivedBytesThroughput {
+  componentId: String!
+  throughput: Int!
+}
+
+type ComponentSentBytesThroughput {
+  componentId: String!
+  throughput: Int!
+}
+"""
+
+KIND_NAMES = {'sources': 'source', 'transforms': 'transform', 'sinks': 'sink'}
+
+
+class MockTopology:
+    """Components, edges and simulated counters for the stand-in server.
+
+    ``rate`` is the number of events per second entering every source. Each
+    component forwards everything it receives; components listed in
+    ``stalled`` forward only a fraction of it, which is handy for exercising
+    bottleneck detection.
+    """
+
+    def __init__(self, components, rate=100.0, stalled=None, hostname='vector-mock', version='0.49.0 (mock)'):
+        # components: id -> {'kind': 'sources'|'transforms'|'sinks', 'type': str, 'inputs': [ids]}
+        self.components = components
+        self.rate = rate
+        self.stalled = stalled or {}
+        self.hostname = hostname
+        self.version = version
+        self.started = time.time()
+        self.outgoing = {id_: [] for id_ in components}
+        for id_, comp in components.items():
+            for input_id in comp['inputs']:
+                if input_id in self.outgoing:
+                    self.outgoing[input_id].append(id_)
+        self.by_kind = {kind: sorted(id_ for id_, c in components.items() if c['kind'] == kind)
+                        for kind in KIND_NAMES}
+        self._throughputs = self._compute_throughputs()
+
+    @classmethod
+    def from_vector_config(cls, path, **kwargs):
+        import yaml  # only needed when loading a real Vector config
+
+        with open(path) as f:
+            config = yaml.safe_load(f)
+        components = {}
+        for kind in KIND_NAMES:
+            for id_, body in (config.get(kind) or {}).items():
+                components[id_] = {
+                    'kind': kind,
+                    'type': body.get('type', 'unknown'),
+                    'inputs': list(body.get('inputs') or []),
+                }
+        return cls(components, **kwargs)
+
+    @classmethod
+    def synthetic(cls, size, fanout=2, seed=0, **kwargs):
+        """Layered DAG with ~10% sources, ~10% sinks and transforms in between."""
+        rng = random.Random(seed)
+        n_sources = max(1, size // 10)
+        n_sinks = max(1, size // 10)
+        n_transforms = max(0, size - n_sources - n_sinks)
+        components = {}
+        previous = []
+        for i in range(n_sources):
+            id_ = f"source_{i}"
+            components[id_] = {'kind': 'sources', 'type': 'demo_logs', 'inputs': []}
+            previous.append(id_)
+        transforms = []
+        for i in range(n_transforms):
+            id_ = f"transform_{i}"
+            pool = previous + transforms[-fanout * 4:]
+            inputs = rng.sample(pool, min(len(pool), rng.randint(1, fanout)))
+            components[id_] = {'kind': 'transforms', 'type': 'remap', 'inputs': inputs}
+            transforms.append(id_)
+        upstream = transforms or previous
+        for i in range(n_sinks):
+            id_ = f"sink_{i}"
+            inputs = rng.sample(upstream, min(len(upstream), rng.randint(1, fanout)))
+            components[id_] = {'kind': 'sinks', 'type': 'blackhole', 'inputs': inputs}
+        return cls(components, **kwargs)
+
+    def _compute_throughputs(self):
+        """Steady-state (received, sent) events/sec per component."""
+        received = {id_: 0.0 for id_ in self.components}
+        sent = {}
+        order = self._topological_order()
+        for id_ in order:
+            comp = self.components[id_]
+            if comp['kind'] == 'sources':
+                received[id_] = self.rate
+            sent[id_] = received[id_] * self.stalled.get(id_, 1.0)
+            for out in self.outgoing[id_]:
+                received[out] += sent[id_]
+        return {id_: (received[id_], sent[id_]) for id_ in self.components}
+
+    def _topological_order(self):
+        indegree = {id_: 0 for id_ in self.components}
+        for id_, comp in self.components.items():
+            for input_id in comp['inputs']:
+                if input_id in self.components:
+                    indegree[id_] += 1
+        ready = [id_ for id_, d in indegree.items() if d == 0]
+        order = []
+        while ready:
+            id_ = ready.pop()
+            order.append(id_)
+            for out in self.outgoing[id_]:
+                indegree[out] -= 1
+                if indegree[out] == 0:
+                    ready.append(out)
+        return order
+
+    def throughput(self, id_):
+        return self._throughputs[id_]
+
+    def totals(self, id_):
+        elapsed = time.time() - self.started
+        received, sent = self._throughputs[id_]
+        return received * elapsed, sent * elapsed
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _string_filter_matches(value, f):
+    checks = {
+        'equals': lambda v, x: v == x,
+        'notEquals': lambda v, x: v != x,
+        'contains': lambda v, x: x in v,
+        'notContains': lambda v, x: x not in v,
+        'startsWith': lambda v, x: v.startswith(x),
+        'endsWith': lambda v, x: v.endswith(x),
+    }
+    return all(checks[op](value, arg) for op, arg in f.items() if arg is not None)
+
+
+def _filter_matches(comp_id, comp_type, f):
+    if not f:
+        return True
+    if not all(_string_filter_matches(comp_id, sf) for sf in f.get('componentId') or []):
+        return False
+    if not all(_string_filter_matches(comp_type, sf) for sf in f.get('componentType') or []):
+        return False
+    if f.get('or'):
+        return any(_filter_matches(comp_id, comp_type, o) for o in f['or'])
+    return True
+
+
+def _cursor(index):
+    return base64.b64encode(str(index).encode()).decode()
+
+
+def _paginate(items, after=None, first=None, **_):
+    start = int(base64.b64decode(after).decode()) + 1 if after else 0
+    end = len(items) if first is None else min(len(items), start + first)
+    page = items[start:end]
+    return {
+        'nodes': page,
+        'pageInfo': {
+            'hasNextPage': end < len(items),
+            'hasPreviousPage': start > 0,
+            'startCursor': _cursor(start) if page else None,
+            'endCursor': _cursor(end - 1) if page else None,
+        },
+        'totalCount': len(items),
+    }
+
+
+class MockResolvers:
+    """Turns a MockTopology into the plain dicts graphql-core resolves against."""
+
+    def __init__(self, topology):
+        self.topology = topology
+
+    def node(self, id_):
+        comp = self.topology.components[id_]
+        kind = comp['kind']
+        node = {'componentId': id_, 'componentType': comp['type']}
+        received, sent = self.topology.totals(id_)
+        ts = _now()
+        received_events = {'timestamp': ts, 'receivedEventsTotal': received}
+        sent_events = {'timestamp': ts, 'sentEventsTotal': sent}
+        downstream = self.topology.outgoing[id_]
+        if kind in ('sources', 'transforms'):
+            node['outputs'] = [{'outputId': '_default', 'sentEventsTotal': sent_events}]
+            node['transforms'] = lambda info: [self.node(o) for o in downstream
+                                               if self.topology.components[o]['kind'] == 'transforms']
+            node['sinks'] = lambda info: [self.node(o) for o in downstream
+                                          if self.topology.components[o]['kind'] == 'sinks']
+        if kind in ('transforms', 'sinks'):
+            upstream = [i for i in comp['inputs'] if i in self.topology.components]
+            node['sources'] = lambda info: [self.node(i) for i in upstream
+                                            if self.topology.components[i]['kind'] == 'sources']
+        if kind == 'sources':
+            node['outputTypes'] = ['LOG']
+            node['metrics'] = {
+                '__typename': 'GenericSourceMetrics',
+                'receivedBytesTotal': {'timestamp': ts, 'receivedBytesTotal': received * 100},
+                'receivedEventsTotal': received_events,
+                'sentEventsTotal': sent_events,
+            }
+        elif kind == 'transforms':
+            node['metrics'] = {
+                '__typename': 'GenericTransformMetrics',
+                'receivedEventsTotal': received_events,
+                'sentEventsTotal': sent_events,
+            }
+        else:
+            upstream = [i for i in comp['inputs'] if i in self.topology.components]
+            node['transforms'] = lambda info: [self.node(i) for i in upstream
+                                               if self.topology.components[i]['kind'] == 'transforms']
+            node['metrics'] = {
+                '__typename': 'GenericSinkMetrics',
+                'receivedEventsTotal': received_events,
+                'sentBytesTotal': {'timestamp': ts, 'sentBytesTotal': sent * 100},
+                'sentEventsTotal': sent_events,
+            }
+        return node
+
+    def connection(self, kind):
+        def resolve(info, filter=None, **page_args):
+            ids = [id_ for id_ in self.topology.by_kind[kind]
+                   if _filter_matches(id_, self.topology.components[id_]['type'], filter)]
+            page = _paginate(ids, **page_args)
+            page['nodes'] = [self.node(id_) for id_ in page['nodes']]
+            return page
+        return resolve
+
+    def host_metrics(self, info):
+        return {
+            'memory': {'totalBytes': 8e9, 'freeBytes': 4e9, 'availableBytes': 5e9, 'activeBytes': 2e9,
+                       'buffersBytes': 1e8, 'cachedBytes': 1e9, 'sharedBytes': 1e7, 'usedBytes': 3e9,
+                       'inactiveBytes': 1e9, 'wiredBytes': None},
+            'swap': {'freeBytes': 1e9, 'totalBytes': 1e9, 'usedBytes': 0.0,
+                     'swappedInBytesTotal': 0.0, 'swappedOutBytesTotal': 0.0},
+            'cpu': {'cpuSecondsTotal': time.process_time()},
+            'loadAverage': {'load1': 0.1, 'load5': 0.1, 'load15': 0.1},
+            'network': {'receiveBytesTotal': 0.0, 'receiveErrsTotal': 0.0, 'receivePacketsTotal': 0.0,
+                        'transmitBytesTotal': 0.0, 'transmitErrsTotal': 0.0,
+                        'transmitPacketsDropTotal': 0.0, 'transmitPacketsTotal': 0.0},
+            'filesystem': {'freeBytes': 1e10, 'totalBytes': 2e10, 'usedBytes': 1e10},
+            'disk': {'readBytesTotal': 0.0, 'readsCompletedTotal': 0.0,
+                     'writtenBytesTotal': 0.0, 'writesCompletedTotal': 0.0},
+            'tcp': {'tcpConnsTotal': 1.0, 'tcpTxQueuedBytesTotal': 0.0, 'tcpRxQueuedBytesTotal': 0.0},
+        }
+
+    def meta(self, info):
+        return {'versionString': self.topology.version, 'hostname': self.topology.hostname}
+
+    def root(self):
+        return {
+            'sources': self.connection('sources'),
+            'transforms': self.connection('transforms'),
+            'sinks': self.connection('sinks'),
+            'hostMetrics': self.host_metrics,
+            'meta': self.meta,
+        }
+
+    def make_event(self, id_, seq):
+        comp = self.topology.components[id_]
+        message = f"event {seq} from {id_}"
+        record = {'message': message, 'timestamp': _now(), 'seq': seq}
+        encoded = json.dumps(record)
+        return {
+            '__typename': 'Log',
+            'componentId': id_,
+            'componentType': comp['type'],
+            'componentKind': KIND_NAMES[comp['kind']],
+            'message': message,
+            'timestamp': record['timestamp'],
+            'string': lambda info, encoding: encoded,
+            'json': lambda info, field: record.get(field),
+        }
+
+    async def output_events(self, root, info, outputsPatterns, inputsPatterns=None, limit=100, interval=500):
+        patterns = list(outputsPatterns) + list(inputsPatterns or [])
+        matched = [id_ for id_ in self.topology.components
+                   if any(fnmatch.fnmatchcase(id_, p) for p in patterns)]
+        for pattern in patterns:
+            if not any(fnmatch.fnmatchcase(id_, pattern) for id_ in self.topology.components):
+                yield [{'__typename': 'EventNotification',
+                        'message': f"[tap] Pattern '{pattern}' failed to match: will retry on configuration reload"}]
+        if not matched:
+            return
+        seq = itertools.count()
+        carry = 0.0
+        while True:
+            await asyncio.sleep(interval / 1000)
+            per_component = sum(self.topology.throughput(id_)[1] or self.topology.rate for id_ in matched)
+            carry += per_component * interval / 1000
+            n, carry = int(carry), carry - int(carry)
+            n = min(n, limit)
+            if n:
+                batch = [self.make_event(matched[i % len(matched)], next(seq)) for i in range(n)]
+                yield batch
+
+    def throughputs(self, index):
+        async def generate(root, info, interval=1000):
+            while True:
+                await asyncio.sleep(interval / 1000)
+                yield [{'componentId': id_, 'throughput': int(self.topology.throughput(id_)[index % 2] * (100 if index >= 2 else 1) * interval / 1000)}
+                       for id_ in self.topology.components]
+        return generate
+
+
+def build_schema(resolvers):
+    schema = graphql.build_schema(SCHEMA_SDL)
+    subscriptions = {
+        'outputEventsByComponentIdPatterns': resolvers.output_events,
+        'componentReceivedEventsThroughputs': resolvers.throughputs(0),
+        'componentSentEventsThroughputs': resolvers.throughputs(1),
+        'componentReceivedBytesThroughputs': resolvers.throughputs(2),
+        'componentSentBytesThroughputs': resolvers.throughputs(3),
+    }
+    for name, generate in subscriptions.items():
+        field = schema.subscription_type.fields[name]
+        field.subscribe = generate
+        field.resolve = lambda event, info, **kwargs: event
+    return schema
+
+
+class MockVectorServer:
+    """graphql-ws endpoint backed by a MockTopology."""
+
+    def __init__(self, topology, host='127.0.0.1', port=8686, latency=0.0):
+        self.resolvers = MockResolvers(topology)
+        self.schema = build_schema(self.resolvers)
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.connections = 0
+        self.queries = 0
+        self.loop = None
+        self.thread = None
+        self.stopped = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/graphql"
+
+    async def handle(self, ws):
+        self.connections += 1
+        operations = {}
+        try:
+            async for message in ws:
+                msg = json.loads(message)
+                msg_type = msg.get('type')
+                if msg_type == 'connection_init':
+                    await ws.send(json.dumps({'type': 'connection_ack'}))
+                elif msg_type == 'start':
+                    self.queries += 1
+                    operations[msg['id']] = asyncio.create_task(self.run_operation(ws, msg['id'], msg.get('payload') or {}))
+                elif msg_type == 'stop':
+                    task = operations.pop(msg.get('id'), None)
+                    if task is not None:
+                        task.cancel()
+                        await ws.send(json.dumps({'id': msg['id'], 'type': 'complete'}))
+                elif msg_type == 'connection_terminate':
+                    break
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for task in operations.values():
+                task.cancel()
+
+    async def run_operation(self, ws, op_id, payload):
+        document = graphql.parse(payload.get('query', ''))
+        variables = payload.get('variables') or {}
+        is_subscription = any(
+            getattr(d, 'operation', None) == graphql.OperationType.SUBSCRIPTION for d in document.definitions
+        )
+        try:
+            if is_subscription:
+                stream = graphql.subscribe(self.schema, document, variable_values=variables)
+                if inspect.isawaitable(stream):  # graphql-core < 3.3
+                    stream = await stream
+                if isinstance(stream, graphql.ExecutionResult):
+                    await self.send_result(ws, op_id, stream)
+                else:
+                    async for result in stream:
+                        await self.send_result(ws, op_id, result)
+            else:
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                result = graphql.execute(self.schema, document, root_value=self.resolvers.root(), variable_values=variables)
+                await self.send_result(ws, op_id, result)
+            await ws.send(json.dumps({'id': op_id, 'type': 'complete'}))
+        except websockets.ConnectionClosed:
+            pass
+        except graphql.GraphQLError as e:
+            await ws.send(json.dumps({'id': op_id, 'type': 'error', 'payload': e.formatted}))
+
+    async def send_result(self, ws, op_id, result):
+        payload = {'data': result.data}
+        if result.errors:
+            payload['errors'] = [e.formatted for e in result.errors]
+        await ws.send(json.dumps({'id': op_id, 'type': 'data', 'payload': payload}))
+
+    async def serve(self, ready=None):
+        async with websockets.serve(self.handle, self.host, self.port, subprotocols=['graphql-ws']) as server:
+            if self.port == 0:
+                self.port = next(iter(server.sockets)).getsockname()[1]
+            self.stopped = asyncio.Event()
+            if ready is not None:
+                ready.set()
+            await self.stopped.wait()
+
+    def start(self, timeout=10.0):
+        """Serve from a daemon thread and return the URL once listening."""
+        ready = threading.Event()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self.serve(ready),), daemon=True)
+        self.thread.start()
+        if not ready.wait(timeout):
+            raise Exception(f"Mock server did not start within {timeout}s")
+        return self.url
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.loop.call_soon_threadsafe(self.stopped.set)
+        self.thread.join()
+        self.loop.close()
+        self.thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for Vector's GraphQL API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8686)
+    parser.add_argument('--config', help='Vector config file to take the topology from')
+    parser.add_argument('--synthetic', type=int, metavar='N', help='Generate a topology with N components')
+    parser.add_argument('--fanout', type=int, default=2, help='Max inputs per synthetic component')
+    parser.add_argument('--rate', type=float, default=100.0, help='Events/sec entering every source')
+    parser.add_argument('--stall', action='append', default=[], metavar='ID=FRACTION',
+                        help='Make a component forward only FRACTION of what it receives')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every query')
+    parser.add_argument('--hostname', default='vector-mock')
+    args = parser.parse_args()
+
+    stalled = {}
+    for spec in args.stall:
+        id_, _, fraction = spec.partition('=')
+        stalled[id_] = float(fraction or 0.0)
+    options = {'rate': args.rate, 'stalled': stalled, 'hostname': args.hostname}
+    if args.synthetic:
+        topology = MockTopology.synthetic(args.synthetic, fanout=args.fanout, **options)
+    else:
+        topology = MockTopology.from_vector_config(args.config or 'vector_config.yaml', **options)
+
+    server = MockVectorServer(topology, host=args.host, port=args.port, latency=args.latency)
+    print(f"Serving {len(topology.components)} components on {server.url}")
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
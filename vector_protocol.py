@@ -0,0 +1,245 @@
+"""The graphql-ws pieces vector_script.py and vector_async.py share.
+
+The tap subscription and its variables, and the JSON codecs frames are
+decoded with. Kept apart so that both import it, and not each other.
+"""
+import json
+import textwrap
+
+DEFAULT_ACK_TIMEOUT = 10.0
+
+
+def _selection(fields, depth):
+    return textwrap.indent(fields.strip(), '  ' * depth)
+
+
+# Vector's own defaults for the tap: every `interval` ms it sends at most
+# `limit` events sampled from what the matched components emitted.
+TAP_INTERVAL = 500
+TAP_LIMIT = 100
+
+
+def subscription_variables(patterns, interval=None, limit=None):
+    """Variables for SUBSCRIPTION_QUERY; None leaves Vector's default."""
+    variables = {"outputsPatterns": patterns}
+    if interval is not None:
+        variables["interval"] = interval
+    if limit is not None:
+        variables["limit"] = limit
+    return variables
+
+
+# Selections each event type can return, in the order they are requested.
+# Keys are what --fields takes; string/json make Vector serialize the event
+# again, so they are the expensive ones.
+EVENT_FIELDS = {
+    'Log': {
+        'componentId': 'componentId',
+        'componentType': 'componentType',
+        'componentKind': 'componentKind',
+        'message': 'message',
+        'timestamp': 'timestamp',
+        'string': 'string(encoding: JSON)',
+        'json': 'json(field: "message")',
+    },
+    'Metric': {
+        'componentId': 'componentId',
+        'componentType': 'componentType',
+        'componentKind': 'componentKind',
+        'timestamp': 'timestamp',
+        'name': 'name',
+        'namespace': 'namespace',
+        'kind': 'kind',
+        'valueType': 'valueType',
+        'value': 'value',
+        'tags': 'tags {\n  key\n  value\n}',
+        'string': 'string(encoding: JSON)',
+    },
+    'EventNotification': {
+        'message': 'message',
+    },
+    'Trace': {
+        'componentId': 'componentId',
+        'componentType': 'componentType',
+        'componentKind': 'componentKind',
+        'string': 'string(encoding: JSON)',
+        'json': 'json(field: "trace")',
+    },
+}
+
+FIELD_PROFILES = {
+    # Enough to see what flows where, with the event content once.
+    'minimal': ('componentId', 'timestamp', 'message', 'name', 'kind', 'value'),
+    # The whole event, serialized once, plus where it came from.
+    'json-only': ('componentId', 'componentType', 'componentKind', 'string'),
+    'full': None,
+}
+
+
+def build_subscription_query(fields=None):
+    """The outputEventsByComponentIdPatterns subscription selecting only fields.
+
+    fields is a FIELD_PROFILES name or an iterable of EVENT_FIELDS keys; None
+    selects everything. EventNotification always keeps its message so that
+    patterns matching nothing are still reported.
+    """
+    if isinstance(fields, str):
+        if fields not in FIELD_PROFILES:
+            raise ValueError(f"Unknown field profile '{fields}' (choose from {', '.join(FIELD_PROFILES)})")
+        fields = FIELD_PROFILES[fields]
+    if fields is not None:
+        fields = set(fields)
+        known = {name for selections in EVENT_FIELDS.values() for name in selections}
+        unknown = sorted(fields - known)
+        if unknown:
+            raise ValueError(f"Unknown event field(s): {', '.join(unknown)}")
+
+    fragments = []
+    for type_name, selections in EVENT_FIELDS.items():
+        chosen = "\n".join(selection for name, selection in selections.items()
+                            if fields is None or name in fields or type_name == 'EventNotification')
+        if chosen:
+            fragments.append(f"... on {type_name} {{\n{_selection(chosen, 1)}\n}}")
+    body = _selection("\n".join(fragments + ['__typename']), 2)
+    return f"""
+subscription OutputEventsByComponentIdPatterns($outputsPatterns: [String!]!, $interval: Int! = {TAP_INTERVAL}, $limit: Int! = {TAP_LIMIT}) {{
+  outputEventsByComponentIdPatterns(outputsPatterns: $outputsPatterns, interval: $interval, limit: $limit) {{
+{body}
+  }}
+}}
+"""
+
+
+SUBSCRIPTION_QUERY = build_subscription_query()
+
+
+class JsonCodec:
+    """JSON for the message hot path, on the stdlib json module.
+
+    Subclasses swap in faster libraries. loads_frame(message, raw_events=True)
+    returns a graphql-ws frame whose tapped events are left as compact JSON
+    text, for writers that only copy them out; the stdlib and orjson have to
+    decode and re-encode them for that, msgspec can slice them out as-is.
+    """
+    name = 'json'
+    errors = (json.JSONDecodeError,)
+    # Whether raw_events comes without a decode/re-encode round trip.
+    slices_raw_events = False
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def dumps(self, obj):
+        """Compact JSON text."""
+        return json.dumps(obj, separators=(',', ':'))
+
+    def loads_frame(self, message, raw_events=False):
+        frame = self.loads(message)
+        if raw_events:
+            data = (frame.get('payload') or {}).get('data') or {}
+            events = data.get('outputEventsByComponentIdPatterns')
+            if isinstance(events, list):
+                data['outputEventsByComponentIdPatterns'] = [self.dumps(event) for event in events]
+        return frame
+
+
+class OrjsonCodec(JsonCodec):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self.orjson = orjson
+        self.errors = (orjson.JSONDecodeError,)
+
+    def loads(self, data):
+        return self.orjson.loads(data)
+
+    def dumps(self, obj):
+        return self.orjson.dumps(obj).decode()
+
+
+class MsgspecCodec(JsonCodec):
+    name = 'msgspec'
+    slices_raw_events = True
+
+    def __init__(self):
+        import msgspec
+
+        class Data(msgspec.Struct):
+            outputEventsByComponentIdPatterns: list[msgspec.Raw] | None = None
+
+        class DataPayload(msgspec.Struct):
+            data: Data | None = None
+            errors: list | None = None
+
+        class Frame(msgspec.Struct):
+            type: str
+            id: str | None = None
+            payload: msgspec.Raw = msgspec.Raw()
+
+        self.msgspec = msgspec
+        self.errors = (msgspec.DecodeError,)
+        self.decoder = msgspec.json.Decoder()
+        self.encoder = msgspec.json.Encoder()
+        self.frame_decoder = msgspec.json.Decoder(Frame)
+        self.payload_decoder = msgspec.json.Decoder(DataPayload)
+
+    def loads(self, data):
+        return self.decoder.decode(data)
+
+    def dumps(self, obj):
+        return self.encoder.encode(obj).decode()
+
+    def loads_frame(self, message, raw_events=False):
+        if not raw_events:
+            return self.loads(message)
+        frame = self.frame_decoder.decode(message)
+        result = {'type': frame.type, 'id': frame.id}
+        if not frame.payload:
+            return result
+        if frame.type != 'data':
+            result['payload'] = self.loads(frame.payload)
+            return result
+        try:
+            payload = self.payload_decoder.decode(frame.payload)
+        except self.msgspec.ValidationError:
+            payload = None
+        if payload is None or payload.data is None or payload.data.outputEventsByComponentIdPatterns is None:
+            # Not a tap frame (a query result); decode it normally.
+            result['payload'] = self.loads(frame.payload)
+            return result
+        events = []
+        for event in payload.data.outputEventsByComponentIdPatterns:
+            event = bytes(event).decode()
+            # Vector sends compact JSON; anything else is re-encoded so
+            # each event stays on one line.
+            events.append(event if '\n' not in event else self.dumps(self.loads(event)))
+        result['payload'] = {'data': {'outputEventsByComponentIdPatterns': events}}
+        if payload.errors is not None:
+            result['payload']['errors'] = payload.errors
+        return result
+
+
+CODECS = {
+    'msgspec': MsgspecCodec,
+    'orjson': OrjsonCodec,
+    'json': JsonCodec,
+}
+
+
+def get_codec(name='auto'):
+    """The named codec, or for 'auto' the first of CODECS that is installed."""
+    if name != 'auto':
+        try:
+            return CODECS[name]()
+        except ImportError as e:
+            raise Exception(f"JSON codec '{name}' is not available: {e}") from e
+    for codec in CODECS.values():
+        try:
+            return codec()
+        except ImportError:
+            pass
+    return JsonCodec()
+
+
+DEFAULT_CODEC = get_codec()
@@ -1,33 +1,66 @@
+import asyncio
+import hashlib
 import json
+import os
+import random
+import shutil
+import signal
+import sys
 import threading
-from datetime import datetime
-import websocket  # websocket-client library
-from collections import deque, defaultdict
+import time
+from concurrent.futures import FIRST_COMPLETED, CancelledError, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from collections import defaultdict, deque
 import argparse
+import fnmatch
 
-QUERY = """
-query GetAllConfigInfo {
-  sources {
-    nodes {
-      componentId
-      componentType
-      outputTypes
-      outputs {
-        outputId
-        sentEventsTotal {
-          timestamp
-          sentEventsTotal
-        }
-      }
-      transforms {
-        componentId
-        componentType
-      }
-      sinks {
-        componentId
-        componentType
-      }
-      metrics {
+from vector_async import AsyncVectorSession, AsyncVectorSubscriber
+from vector_protocol import (CODECS, DEFAULT_ACK_TIMEOUT, DEFAULT_CODEC, EVENT_FIELDS, FIELD_PROFILES, SUBSCRIPTION_QUERY,
+                             TAP_INTERVAL, _selection, build_subscription_query, get_codec,
+                             subscription_variables)
+
+SOURCE_TOPOLOGY_FIELDS = """
+componentId
+componentType
+outputTypes
+outputs {
+  outputId
+}
+transforms {
+  componentId
+  componentType
+}
+sinks {
+  componentId
+  componentType
+}
+"""
+
+SOURCE_METRICS_FIELDS = """
+outputs {
+  outputId
+  sentEventsTotal {
+    timestamp
+    sentEventsTotal
+  }
+}
+metrics {
+  receivedBytesTotal {
+    timestamp
+    receivedBytesTotal
+  }
+  receivedEventsTotal {
+    timestamp
+    receivedEventsTotal
+  }
+  sentEventsTotal {
+    timestamp
+    sentEventsTotal
+  }
+  ... on FileSourceMetrics {
+    files {
+      nodes {
+        name
         receivedBytesTotal {
           timestamp
           receivedBytesTotal
@@ -40,211 +73,262 @@ query GetAllConfigInfo {
           timestamp
           sentEventsTotal
         }
-        ... on FileSourceMetrics {
-          files {
-            nodes {
-              name
-              receivedBytesTotal {
-                timestamp
-                receivedBytesTotal
-              }
-              receivedEventsTotal {
-                timestamp
-                receivedEventsTotal
-              }
-              sentEventsTotal {
-                timestamp
-                sentEventsTotal
-              }
-            }
-            pageInfo {
-              hasNextPage
-              hasPreviousPage
-              startCursor
-              endCursor
-            }
-            totalCount
-          }
-        }
-        ... on GenericSourceMetrics {
-          receivedBytesTotal {
-            timestamp
-            receivedBytesTotal
-          }
-          receivedEventsTotal {
-            timestamp
-            receivedEventsTotal
-          }
-          sentEventsTotal {
-            timestamp
-            sentEventsTotal
-          }
-        }
       }
-    }
-    pageInfo {
-      hasNextPage
-      hasPreviousPage
-      startCursor
-      endCursor
-    }
-    totalCount
-  }
-  transforms {
-    nodes {
-      componentId
-      componentType
-      outputs {
-        outputId
-        sentEventsTotal {
-          timestamp
-          sentEventsTotal
-        }
-      }
-      sources {
-        componentId
-        componentType
-      }
-      transforms {
-        componentId
-        componentType
-      }
-      sinks {
-        componentId
-        componentType
-      }
-      metrics {
-        receivedEventsTotal {
-          timestamp
-          receivedEventsTotal
-        }
-        sentEventsTotal {
-          timestamp
-          sentEventsTotal
-        }
-        ... on GenericTransformMetrics {
-          receivedEventsTotal {
-            timestamp
-            receivedEventsTotal
-          }
-          sentEventsTotal {
-            timestamp
-            sentEventsTotal
-          }
-        }
-      }
-    }
-    pageInfo {
-      hasNextPage
-      hasPreviousPage
-      startCursor
-      endCursor
-    }
-    totalCount
-  }
-  sinks {
-    nodes {
-      componentId
-      componentType
-      sources {
-        componentId
-        componentType
-      }
-      transforms {
-        componentId
-        componentType
-      }
-      metrics {
-        receivedEventsTotal {
-          timestamp
-          receivedEventsTotal
-        }
-        sentBytesTotal {
-          timestamp
-          sentBytesTotal
-        }
-        sentEventsTotal {
-          timestamp
-          sentEventsTotal
-        }
-        ... on GenericSinkMetrics {
-          receivedEventsTotal {
-            timestamp
-            receivedEventsTotal
-          }
-          sentBytesTotal {
-            timestamp
-            sentBytesTotal
-          }
-          sentEventsTotal {
-            timestamp
-            sentEventsTotal
-          }
-        }
+      pageInfo {
+        hasNextPage
+        hasPreviousPage
+        startCursor
+        endCursor
       }
+      totalCount
     }
-    pageInfo {
-      hasNextPage
-      hasPreviousPage
-      startCursor
-      endCursor
-    }
-    totalCount
   }
-  hostMetrics {
-    memory {
-      totalBytes
-      freeBytes
-      availableBytes
-      activeBytes
-      buffersBytes
-      cachedBytes
-      sharedBytes
-      usedBytes
-      inactiveBytes
-      wiredBytes
+  ... on GenericSourceMetrics {
+    receivedBytesTotal {
+      timestamp
+      receivedBytesTotal
     }
-    swap {
-      freeBytes
-      totalBytes
-      usedBytes
-      swappedInBytesTotal
-      swappedOutBytesTotal
+    receivedEventsTotal {
+      timestamp
+      receivedEventsTotal
     }
-    cpu {
-      cpuSecondsTotal
+    sentEventsTotal {
+      timestamp
+      sentEventsTotal
     }
-    loadAverage {
-      load1
-      load5
-      load15
+  }
+}
+"""
+
+SOURCE_FIELDS = SOURCE_TOPOLOGY_FIELDS + SOURCE_METRICS_FIELDS.lstrip()
+
+TRANSFORM_TOPOLOGY_FIELDS = """
+componentId
+componentType
+outputs {
+  outputId
+}
+sources {
+  componentId
+  componentType
+}
+transforms {
+  componentId
+  componentType
+}
+sinks {
+  componentId
+  componentType
+}
+"""
+
+TRANSFORM_METRICS_FIELDS = """
+outputs {
+  outputId
+  sentEventsTotal {
+    timestamp
+    sentEventsTotal
+  }
+}
+metrics {
+  receivedEventsTotal {
+    timestamp
+    receivedEventsTotal
+  }
+  sentEventsTotal {
+    timestamp
+    sentEventsTotal
+  }
+  ... on GenericTransformMetrics {
+    receivedEventsTotal {
+      timestamp
+      receivedEventsTotal
     }
-    network {
-      receiveBytesTotal
-      receiveErrsTotal
-      receivePacketsTotal
-      transmitBytesTotal
-      transmitErrsTotal
-      transmitPacketsDropTotal
-      transmitPacketsTotal
+    sentEventsTotal {
+      timestamp
+      sentEventsTotal
     }
-    filesystem {
-      freeBytes
-      totalBytes
-      usedBytes
+  }
+}
+"""
+
+TRANSFORM_FIELDS = TRANSFORM_TOPOLOGY_FIELDS + TRANSFORM_METRICS_FIELDS.lstrip()
+
+SINK_TOPOLOGY_FIELDS = """
+componentId
+componentType
+sources {
+  componentId
+  componentType
+}
+transforms {
+  componentId
+  componentType
+}
+"""
+
+SINK_METRICS_FIELDS = """
+metrics {
+  receivedEventsTotal {
+    timestamp
+    receivedEventsTotal
+  }
+  sentBytesTotal {
+    timestamp
+    sentBytesTotal
+  }
+  sentEventsTotal {
+    timestamp
+    sentEventsTotal
+  }
+  ... on GenericSinkMetrics {
+    receivedEventsTotal {
+      timestamp
+      receivedEventsTotal
     }
-    disk {
-      readBytesTotal
-      readsCompletedTotal
-      writtenBytesTotal
-      writesCompletedTotal
+    sentBytesTotal {
+      timestamp
+      sentBytesTotal
     }
-    tcp {
-      tcpConnsTotal
-      tcpTxQueuedBytesTotal
-      tcpRxQueuedBytesTotal
+    sentEventsTotal {
+      timestamp
+      sentEventsTotal
     }
   }
+}
+"""
+
+SINK_FIELDS = SINK_TOPOLOGY_FIELDS + SINK_METRICS_FIELDS.lstrip()
+
+PAGE_INFO_FIELDS = """
+pageInfo {
+  hasNextPage
+  hasPreviousPage
+  startCursor
+  endCursor
+}
+totalCount
+"""
+
+HOST_METRICS_FIELDS = """
+memory {
+  totalBytes
+  freeBytes
+  availableBytes
+  activeBytes
+  buffersBytes
+  cachedBytes
+  sharedBytes
+  usedBytes
+  inactiveBytes
+  wiredBytes
+}
+swap {
+  freeBytes
+  totalBytes
+  usedBytes
+  swappedInBytesTotal
+  swappedOutBytesTotal
+}
+cpu {
+  cpuSecondsTotal
+}
+loadAverage {
+  load1
+  load5
+  load15
+}
+network {
+  receiveBytesTotal
+  receiveErrsTotal
+  receivePacketsTotal
+  transmitBytesTotal
+  transmitErrsTotal
+  transmitPacketsDropTotal
+  transmitPacketsTotal
+}
+filesystem {
+  freeBytes
+  totalBytes
+  usedBytes
+}
+disk {
+  readBytesTotal
+  readsCompletedTotal
+  writtenBytesTotal
+  writesCompletedTotal
+}
+tcp {
+  tcpConnsTotal
+  tcpTxQueuedBytesTotal
+  tcpRxQueuedBytesTotal
+}
+"""
+
+META_FIELDS = """
+versionString
+hostname
+"""
+
+
+QUERY = f"""
+query GetAllConfigInfo {{
+  sources {{
+    nodes {{
+{_selection(SOURCE_FIELDS, 3)}
+    }}
+{_selection(PAGE_INFO_FIELDS, 2)}
+  }}
+  transforms {{
+    nodes {{
+{_selection(TRANSFORM_FIELDS, 3)}
+    }}
+{_selection(PAGE_INFO_FIELDS, 2)}
+  }}
+  sinks {{
+    nodes {{
+{_selection(SINK_FIELDS, 3)}
+    }}
+{_selection(PAGE_INFO_FIELDS, 2)}
+  }}
+  hostMetrics {{
+{_selection(HOST_METRICS_FIELDS, 2)}
+  }}
+  meta {{
+{_selection(META_FIELDS, 2)}
+  }}
+}}
+"""
+
+# The GraphQL filter argument on each kind has its own input type.
+COMPONENT_KINDS = (
+    ('sources', 'SourcesFilter', SOURCE_TOPOLOGY_FIELDS, SOURCE_METRICS_FIELDS),
+    ('transforms', 'TransformsFilter', TRANSFORM_TOPOLOGY_FIELDS, TRANSFORM_METRICS_FIELDS),
+    ('sinks', 'SinksFilter', SINK_TOPOLOGY_FIELDS, SINK_METRICS_FIELDS),
+)
+
+# Cheap enough to send before every command: tells whether a cached topology
+# still matches the running Vector.
+PROBE_QUERY = """
+query Probe {
+  meta {
+    versionString
+    hostname
+  }
+  sources {
+    totalCount
+  }
+  transforms {
+    totalCount
+  }
+  sinks {
+    totalCount
+  }
+}
+"""
+
+META_QUERY = """
+query Meta {
   meta {
     versionString
     hostname
@@ -252,353 +336,2032 @@ query GetAllConfigInfo {
 }
 """
 
+# What the transforms feeding a transform are found from: a transform's node
+# only lists the transforms it feeds.
+TRANSFORM_EDGE_FIELDS = """
+componentId
+componentType
+transforms {
+  componentId
+}
+"""
+
+# Above this many components, metrics are paged through unfiltered instead of
+# naming every component in the filter.
+METRICS_FILTER_LIMIT = 200
+
+
+def build_component_query(component_id, metrics=True):
+    """Build a query for a single component.
+
+    The component is looked up in every kind with a componentId filter, so
+    only its own node (and metrics, unless metrics is False) come back.
+    """
+    parts = []
+    for kind, _, topology_fields, metrics_fields in COMPONENT_KINDS:
+        fields = topology_fields + metrics_fields.lstrip() if metrics else topology_fields
+        parts.append(f"""  {kind}(filter: {{componentId: [{{equals: $componentId}}]}}) {{
+    nodes {{
+{_selection(fields, 3)}
+    }}
+  }}""")
+    body = '\n'.join(parts)
+    query = f"""
+query GetComponentInfo($componentId: String!) {{
+{body}
+}}
+"""
+    return query, {"componentId": component_id}
+
+
+def build_page_query(kind, fields, filter_type=None):
+    """Build a query for one page of a component connection.
+
+    Takes $first and $after (and $filter when filter_type is given) and
+    selects the connection under the ``kind`` key.
+    """
+    params = "$first: Int!, $after: String"
+    args = "first: $first, after: $after"
+    if filter_type:
+        params += f", $filter: {filter_type}"
+        args += ", filter: $filter"
+    return f"""
+query {kind.capitalize()}Page({params}) {{
+  {kind}({args}) {{
+    nodes {{
+{_selection(fields, 3)}
+    }}
+    pageInfo {{
+      hasNextPage
+      endCursor
+    }}
+    totalCount
+  }}
+}}
+"""
+
+
+DEFAULT_PAGE_SIZE = 500
+
+
+def latency_breakdown(timings):
+    """Turn perf_counter stamps into a {phase: seconds} dict, in phase order.
+
+    Connect phases only appear when the operation had to open the socket.
+    """
+    phases = [
+        ('connect', 'connect_start', 'socket_open'),
+        ('ack', 'socket_open', 'ack'),
+        ('first_byte', 'sent', 'first_data'),
+        ('receive', 'first_data', 'complete'),
+    ]
+    breakdown = {}
+    for phase, start, end in phases:
+        if start in timings and end in timings:
+            breakdown[phase] = timings[end] - timings[start]
+    return breakdown
+
+
+def print_timings(breakdown, out=None):
+    out = out or sys.stderr
+    total = 0.0
+    for phase, seconds in breakdown.items():
+        total += seconds
+        print(f"  {phase:<18} {seconds * 1000:9.2f} ms", file=out)
+    print(f"  {'total':<18} {total * 1000:9.2f} ms", file=out)
+
+
+class VectorSession:
+    """A long-lived graphql-ws connection that multiplexes many operations.
+
+    A blocking front for vector_async.AsyncVectorSession (which takes the
+    same options), run on an event loop in a thread of its own. The socket
+    is opened lazily on the first operation and reopened transparently if it
+    dropped in the meantime; after close(), operations raise instead. Every
+    operation gets its own id and a ``concurrent.futures.Future`` holding its
+    result. Callbacks run on the loop's thread.
+    """
+
+    def __init__(self, ws_url, ack_timeout=DEFAULT_ACK_TIMEOUT, codec=None, **options):
+        self.ws_url = ws_url
+        self.options = dict(options, ack_timeout=ack_timeout, codec=codec or DEFAULT_CODEC)
+        self.codec = self.options['codec']
+        self.lock = threading.Lock()
+        self.session = None
+        self.loop = None
+        self.thread = None
+        self.closed = False
+
+    @property
+    def timings(self):
+        return self.session.timings if self.session is not None else {}
+
+    @property
+    def decode_seconds(self):
+        """Loop time spent decoding frames, for --timings."""
+        return self.session.decode_seconds if self.session is not None else 0.0
+
+    def is_connected(self):
+        return self.session is not None and self.session.is_connected()
+
+    def _run(self, coroutine):
+        """Run coroutine on the loop and wait for its result; from the loop's
+        own thread, only schedule it."""
+        with self.lock:
+            if self.closed:
+                raise Exception(f"Session to {self.ws_url} is closed")
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self.session = AsyncVectorSession(self.ws_url, **self.options)
+                self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+                self.thread.start()
+            future = asyncio.run_coroutine_threadsafe(coroutine(self.session), self.loop)
+        if threading.current_thread() is self.thread:
+            return future
+        try:
+            return future.result()
+        except CancelledError:
+            raise Exception("session closed") from None
+
+    def connect(self):
+        """Open the socket and wait for connection_ack; returns True if a new connection was made."""
+        return self._run(lambda session: session.connect())
+
+    def close(self):
+        with self.lock:
+            loop, thread, session = self.loop, self.thread, self.session
+            self.loop = self.thread = None
+            self.closed = True
+        if loop is None:
+            return
+
+        async def shutdown():
+            # Whatever still waits, e.g. a connect() for its ack, gives up now.
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            await session.close()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    def submit(self, query, variables=None, on_data=None):
+        """Start a query on the shared socket and return a Future for its data.
+
+        For subscriptions, on_data(data) is called from the loop's thread
+        with every payload instead, and the Future only settles when the
+        server completes the operation or the connection drops.
+        """
+        future = Future()
+
+        def settle(done):
+            if done.exception() is not None:
+                future.set_exception(done.exception())
+            else:
+                future.set_result(done.result())
+
+        async def start(session):
+            op = await session.start(query, variables, on_data)
+            future.op_id = op.id
+            future.timings = op.timings
+            op.future.add_done_callback(settle)
+
+        self._run(start)
+        return future
+
+    def execute(self, query, variables=None, timeout=None):
+        return self.submit(query, variables).result(timeout)
+
+    def stop(self, future):
+        """Stop the subscription behind a Future returned by submit()."""
+        if self.loop is not None and not self.closed:
+            self._run(lambda session: session.stop(future.op_id))
+
+
 class VectorClient:
-    def __init__(self, ws_url):
+    def __init__(self, ws_url, session=None, ack_timeout=DEFAULT_ACK_TIMEOUT, codec=None):
         self.ws_url = ws_url
+        self.session = session or VectorSession(ws_url, ack_timeout=ack_timeout, codec=codec)
+        self.last_timings = {}
 
     def execute_query(self, query, variables=None):
-        self.result = None
-        self.error = None
-        self.event = threading.Event()
+        future = self.session.submit(query, variables)
+        result = future.result()
+        self.last_timings = latency_breakdown(future.timings)
+        return result
 
-        def on_message(ws, message):
-            try:
-                data = json.loads(message)
-                msg_type = data.get('type')
-                if msg_type == 'connection_ack':
-                    return
-                elif msg_type == 'data':
-                    payload = data.get('payload', {})
-                    if 'errors' in payload:
-                        self.error = payload['errors']
-                    else:
-                        self.result = payload.get('data')
-                elif msg_type == 'complete':
-                    self.event.set()
-                elif msg_type == 'ka':
-                    pass
-                else:
-                    print(f"Unhandled message type: {msg_type}")
-            except json.JSONDecodeError:
-                self.error = f"Invalid JSON message: {message}"
-            except Exception as e:
-                self.error = f"Error processing message: {e}"
-
-        def on_error(ws, error):
-            self.error = f"WebSocket error: {error}"
-            self.event.set()
-
-        def on_close(ws, close_status_code, close_msg):
-            pass  # Event will be set on complete or error
-
-        def on_open(ws):
-            init_payload = json.dumps({
-                "type": "connection_init",
-                "payload": {}
-            })
-            ws.send(init_payload)
-
-            def send_query():
-                sub_payload = json.dumps({
-                    "id": "1",
-                    "type": "start",
-                    "payload": {
-                        "query": query,
-                        "variables": variables or {}
-                    }
-                })
-                ws.send(sub_payload)
-
-            threading.Timer(0.5, send_query).start()
-
-        ws_app = websocket.WebSocketApp(
-            self.ws_url,
-            on_message=on_message,
-            on_error=on_error,
-            on_close=on_close,
-            on_open=on_open,
-            subprotocols=["graphql-ws"]
+    def submit(self, query, variables=None):
+        return self.session.submit(query, variables)
+
+    def fetch_pages(self, page_requests, on_page, page_size=DEFAULT_PAGE_SIZE):
+        """Follow the cursors of several connection queries concurrently.
+
+        page_requests is a list of (kind, query, variables) built with
+        build_page_query. on_page(kind, nodes) is called from the calling
+        thread as soon as each page arrives, and the next page of that kind is
+        requested before the current one is handed over.
+        """
+        pending = {}
+        first_future = None
+
+        def request_page(kind, query, variables, after=None):
+            future = self.session.submit(query, {**variables, "first": page_size, "after": after})
+            pending[future] = (kind, query, variables)
+            return future
+
+        for kind, query, variables in page_requests:
+            future = request_page(kind, query, variables)
+            first_future = first_future or future
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, query, variables = pending.pop(future)
+                connection = future.result()[kind]
+                page_info = connection['pageInfo']
+                if page_info['hasNextPage'] and page_info['endCursor']:
+                    request_page(kind, query, variables, page_info['endCursor'])
+                on_page(kind, connection['nodes'])
+
+        if first_future is not None:
+            self.last_timings = latency_breakdown(first_future.timings)
+            self.last_timings.pop('first_byte', None)
+            self.last_timings.pop('receive', None)
+            self.last_timings['pages'] = time.perf_counter() - first_future.timings['sent']
+
+    def fetch_topology(self, on_page, page_size=DEFAULT_PAGE_SIZE):
+        """Page through the ids, types and edges of every component, without metrics."""
+        self.fetch_pages(
+            [(kind, build_page_query(kind, topology_fields), {})
+             for kind, _, topology_fields, _ in COMPONENT_KINDS],
+            on_page,
+            page_size=page_size
         )
 
-        def run_ws():
-            ws_app.run_forever()
+    def fetch_metrics(self, ids_by_kind, page_size=DEFAULT_PAGE_SIZE):
+        """Fresh metrics for the given component ids, as {componentId: fields}."""
+        metrics = {}
+        page_requests = []
+        for kind, filter_type, _, metrics_fields in COMPONENT_KINDS:
+            ids = ids_by_kind.get(kind)
+            if not ids:
+                continue
+            fields = "componentId\n" + metrics_fields.lstrip()
+            if len(ids) <= METRICS_FILTER_LIMIT:
+                variables = {"filter": {"or": [{"componentId": [{"equals": id_}]} for id_ in sorted(ids)]}}
+                page_requests.append((kind, build_page_query(kind, fields, filter_type), variables))
+            else:
+                page_requests.append((kind, build_page_query(kind, fields), {}))
 
-        thread = threading.Thread(target=run_ws)
-        thread.start()
-        self.event.wait()
-        ws_app.close()
-        thread.join()
+        def collect(kind, nodes):
+            for node in nodes:
+                if node['componentId'] in ids_by_kind[kind]:
+                    metrics[node['componentId']] = node
+
+        self.fetch_pages(page_requests, collect, page_size=page_size)
+        return metrics
+
+    def close(self):
+        self.session.close()
+
+
+def default_cache_dir():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'vector_script')
+
+
+class TopologyCache:
+    """Component ids, types and edges of Vector instances, kept on disk.
+
+    There is one file per endpoint. An entry is only used while the instance
+    reports the same versionString, hostname and per-kind component counts as
+    when it was stored; anything else (or --refresh) refetches it.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or default_cache_dir()
+
+    def path(self, ws_url):
+        digest = hashlib.sha1(ws_url.encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f"topology-{digest}.json")
+
+    @staticmethod
+    def fingerprint(probe):
+        return {
+            "versionString": probe['meta']['versionString'],
+            "hostname": probe['meta']['hostname'],
+            "counts": {kind: probe[kind]['totalCount'] for kind, *_ in COMPONENT_KINDS},
+        }
+
+    def load(self, ws_url, probe):
+        """Cached nodes by kind, or None when missing or stale."""
+        try:
+            with open(self.path(ws_url)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('endpoint') != ws_url or entry.get('fingerprint') != self.fingerprint(probe):
+            return None
+        return entry['components']
+
+    def store(self, ws_url, probe, components):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(ws_url)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                "endpoint": ws_url,
+                "fingerprint": self.fingerprint(probe),
+                "stored": time.time(),
+                "components": components,
+            }, f)
+        os.replace(tmp_path, path)
+
+    def invalidate(self, ws_url=None):
+        """Drop the entry for ws_url, or every entry; returns how many were removed."""
+        if ws_url is not None:
+            paths = [self.path(ws_url)]
+        elif os.path.isdir(self.directory):
+            paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                     if name.startswith('topology-') and name.endswith('.json')]
+        else:
+            paths = []
+        removed = 0
+        for path in paths:
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+DEFAULT_FLUSH_BYTES = 64 * 1024
+DEFAULT_FLUSH_INTERVAL = 0.2
+
+
+class PrettyEventWriter:
+    """The original subscribe output: one indented ``{ "event": ... }`` print per event."""
+    passthrough = False
+
+    def __init__(self, out=None):
+        self.out = out or sys.stdout
+        self.status = self.out
+
+    def write(self, events, node=None, encoded=False):
+        for event in events:
+            if node is None:
+                print("{ \"event\":", json.dumps(event, indent=2), "}", file=self.out)  # Pretty-print the event
+            else:
+                print(f'{{ "node": {json.dumps(node)}, "event": {json.dumps(event, indent=2)} }}', file=self.out)
+
+    def close(self):
+        self.out.flush()
+
+
+class NdjsonEventWriter:
+    """Compact NDJSON, one event per line, written in large chunks.
+
+    Lines are buffered and written out once ``flush_bytes`` have piled up or
+    ``flush_interval`` seconds have passed, whichever comes first, so a
+    quiet tap still shows events promptly. Status messages go to stderr to
+    keep stdout parseable. Events may be handed over already encoded
+    (``encoded=True``), in which case they are copied out untouched.
+    """
+    passthrough = True
+
+    def __init__(self, out=None, flush_bytes=DEFAULT_FLUSH_BYTES, flush_interval=DEFAULT_FLUSH_INTERVAL, codec=None):
+        self.out = out or sys.stdout
+        self.status = sys.stderr
+        self.codec = codec or DEFAULT_CODEC
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.buffer = []
+        self.buffered = 0
+        self.closed = threading.Event()
+        self.flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self.flusher.start()
+
+    def write(self, events, node=None, encoded=False):
+        if not encoded:
+            events = [self.codec.dumps(event) for event in events]
+        if node is None:
+            chunk = "\n".join(events) + "\n"
+        else:
+            prefix = '{"node":' + json.dumps(node) + ',"event":'
+            chunk = "".join([prefix + event + "}\n" for event in events])
+        with self.lock:
+            self.buffer.append(chunk)
+            self.buffered += len(chunk)
+            if self.buffered >= self.flush_bytes:
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if self.buffer:
+            self.out.write("".join(self.buffer))
+            self.buffer = []
+            self.buffered = 0
+        self.out.flush()
+
+    def _flush_periodically(self):
+        while not self.closed.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        self.closed.set()
+        self.flush()
 
-        if self.error:
-            raise Exception(self.error)
-        return self.result
+
+class ReservoirSampler:
+    """Uniform sample of at most ``size`` events per ``window`` seconds.
+
+    offer() keeps a reservoir (Algorithm R) of the events seen in the current
+    window and returns it once the window has passed, or [] before that.
+    Windows only close when offer() is called, so keep-alives should call
+    it with no events.
+    """
+
+    def __init__(self, size, window, rng=None):
+        self.size = size
+        self.window = window
+        self.rng = rng or random.Random()
+        self.sample = []
+        self.seen = 0
+        self.window_start = time.monotonic()
+
+    def offer(self, events):
+        for event in events:
+            self.seen += 1
+            if len(self.sample) < self.size:
+                self.sample.append(event)
+            else:
+                slot = self.rng.randrange(self.seen)
+                if slot < self.size:
+                    self.sample[slot] = event
+        if time.monotonic() - self.window_start < self.window:
+            return []
+        return self.drain()
+
+    def drain(self):
+        """The current window's sample; starts a new window."""
+        sample = self.sample
+        self.sample = []
+        self.seen = 0
+        self.window_start = time.monotonic()
+        return sample
+
+
+DEFAULT_BUFFER_EVENTS = 10000
+OVERFLOW_POLICIES = ('block', 'drop-oldest', 'drop-newest')
+
+
+class EventRing:
+    """Bounded FIFO of events between the socket reader and the writer.
+
+    When ``capacity`` events are waiting, put() applies ``policy``: 'block'
+    waits for the writer to catch up (stalling socket reads), 'drop-oldest'
+    evicts the longest-waiting events, 'drop-newest' discards the incoming
+    ones. ``dropped`` counts what was thrown away.
+    """
+
+    def __init__(self, capacity=DEFAULT_BUFFER_EVENTS, policy='block'):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{policy}'")
+        self.capacity = capacity
+        self.policy = policy
+        self.events = deque(maxlen=capacity if policy == 'drop-oldest' else None)
+        self.cond = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def __len__(self):
+        return len(self.events)
+
+    def put(self, events):
+        with self.cond:
+            if self.closed:
+                self.dropped += len(events)
+                return
+            if self.policy == 'drop-oldest':
+                # The deque's maxlen does the evicting.
+                self.dropped += max(len(self.events) + len(events) - self.capacity, 0)
+                self.events.extend(events)
+            elif self.policy == 'drop-newest':
+                room = max(self.capacity - len(self.events), 0)
+                self.dropped += max(len(events) - room, 0)
+                self.events.extend(events[:room])
+            else:
+                start = 0
+                while start < len(events):
+                    while len(self.events) >= self.capacity and not self.closed:
+                        self.cond.wait()
+                    if self.closed:
+                        self.dropped += len(events) - start
+                        return
+                    room = self.capacity - len(self.events)
+                    self.events.extend(events[start:start + room])
+                    start += room
+                    self.cond.notify_all()
+            self.cond.notify_all()
+
+    def get(self, max_events=1000):
+        """Up to max_events events, waiting for at least one; None once closed and empty."""
+        with self.cond:
+            while not self.events and not self.closed:
+                self.cond.wait()
+            if not self.events:
+                return None
+            popleft = self.events.popleft
+            batch = [popleft() for _ in range(min(max_events, len(self.events)))]
+            self.cond.notify_all()
+            return batch
+
+    def close(self):
+        """Stop accepting events; get() drains what is left, then returns None."""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+DEFAULT_RECONNECT_ATTEMPTS = 10
+DEFAULT_RECONNECT_DELAY = 0.5
+DEFAULT_RECONNECT_MAX_DELAY = 30.0
+
+
+def backoff_delay(attempt, base=DEFAULT_RECONNECT_DELAY, max_delay=DEFAULT_RECONNECT_MAX_DELAY, rng=random):
+    """Full-jitter exponential backoff: uniform in [0, min(max_delay, base * 2**attempt)]."""
+    return rng.uniform(0, min(max_delay, base * 2 ** attempt))
 
 
 class VectorEventSubscriber:
-    def __init__(self, ws_url, patterns, limit):
+    """Tap output events of components matching patterns.
+
+    ``interval`` and ``sample_limit`` are passed to Vector, which then sends
+    at most sample_limit events per interval ms. Without sample_limit, Vector
+    is asked for no more than ``limit`` per interval, since more would be
+    dropped here anyway. ``sampler`` (a ReservoirSampler) thins the stream
+    further on this side.
+
+    The tap runs on a VectorSession, so on_data() is called from its loop.
+    With a ``buffer`` (an EventRing), it only queues the decoded events and
+    a writer thread formats and writes them, so a slow stdout does not stall
+    socket reads. ``limit`` (None: no limit) counts events taken off the
+    socket, so with a dropping policy fewer may be written; stats() has the
+    received, written and dropped counts. ``metrics`` (a
+    vector_metrics.TapMetrics) is told how long each frame took to decode
+    and each batch to write.
+    ``where`` (see vector_filter.compile_filter) drops events right after
+    decoding, before sampling and the limit, which count matches only.
+
+    With ``daemon`` (the socket of a running vector_daemon.TapDaemon), the
+    tap goes over the daemon's warm connection instead of a new one, falling
+    back to a direct connection once the daemon is gone. Frames the daemon
+    dropped because this tap fell behind show in stats().
+
+    Once connected, a dropped connection (e.g. Vector reloading) is retried
+    up to ``reconnect_attempts`` times in a row with jittered exponential
+    backoff, re-sending connection_init and start; counts and the limit
+    carry over. Each outage is appended to ``gaps``. A first connection
+    that fails is not retried.
+    """
+
+    def __init__(self, ws_url, patterns, limit, ack_timeout=DEFAULT_ACK_TIMEOUT, writer=None, query=SUBSCRIPTION_QUERY,
+                 interval=None, sample_limit=None, sampler=None, codec=None, buffer=None, metrics=None, where=None,
+                 reconnect_attempts=0, reconnect_delay=DEFAULT_RECONNECT_DELAY,
+                 reconnect_max_delay=DEFAULT_RECONNECT_MAX_DELAY, daemon=None):
         self.ws_url = ws_url
+        self.daemon = daemon
         self.patterns = patterns
+        self.query = query
+        self.interval = interval
+        if sample_limit is None and limit is not None and where is None:
+            # With a filter, only some of what Vector samples will count.
+            sample_limit = limit
+        self.sample_limit = sample_limit
+        self.sampler = sampler
         self.limit = limit
+        self.ack_timeout = ack_timeout
+        self.writer = writer or PrettyEventWriter()
+        self.codec = codec or DEFAULT_CODEC
+        self.where = where
+        # Writers that only copy events out get them still encoded, unless a
+        # filter would have to decode them again anyway.
+        self.passthrough = self.writer.passthrough and (where is None or self.codec.slices_raw_events)
+        self.buffer = buffer
+        self.metrics = metrics
+        self.writer_thread = None
         self.event_count = 0
+        self.received = 0
+        self.matched = 0
+        self.written = 0
+        self.reached_limit = False
         self.lock = threading.Lock()
-        self.subscription_id = None
+        self.session = None
+        self.future = None
+        self.error = None
+        self.timings = {}
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_delay = reconnect_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.reconnects = 0
+        self.gaps = []
+        self.daemon_dropped = 0
+        self.acked = False
+        self.completed = False
+        self.connected_at = None
+        self.received_at_connect = 0
+        self.disconnected_at = None
+        self.missed_rate = None
 
-    def on_message(self, ws, message):
-        """Callback for incoming WebSocket messages."""
+    def on_data(self, data):
+        """Called with every data payload of the tap."""
         try:
-            data = json.loads(message)
-            # print(f"Received raw message: {json.dumps(data, indent=2)}")  # Uncomment for debug
+            self.timings.setdefault('first_data', time.perf_counter())
+            if data and 'outputEventsByComponentIdPatterns' in data:
+                events = data['outputEventsByComponentIdPatterns']
+                if isinstance(events, list):
+                    self.received += len(events)
+                    if self.where is not None:
+                        events = self._filter(events)
+                    if self.sampler is not None:
+                        events = self.sampler.offer(events)
+                    self._write_limited(events)
+                else:
+                    print(f"Unexpected events format: {events}", file=self.writer.status)
+        except Exception as e:
+            print(f"Error processing message: {e}", file=self.writer.status)
+
+    def on_control(self, data):
+        """Called with frames that are not for the tap itself."""
+        msg_type = data.get('type')
+        if msg_type == 'ka':
+            if self.sampler is not None:
+                self._write_limited(self.sampler.offer([]))
+        elif msg_type == 'dropped':
+            # Sent by vector_daemon when this tap fell behind its relay.
+            self.daemon_dropped += (data.get('payload') or {}).get('frames', 0)
+        else:
+            print(f"Unhandled message type: {msg_type}", file=self.writer.status)
 
-            msg_type = data.get('type')
-            if msg_type == 'connection_ack':
-                print("Connection acknowledged by server.")
+    def _filter(self, events):
+        where = self.where
+        if self.passthrough:
+            loads = self.codec.loads
+            events = [event for event in events if where(loads(event))]
+        else:
+            events = [event for event in events if where(event)]
+        self.matched += len(events)
+        return events
+
+    def _write_limited(self, events):
+        # Claim this batch's share of the limit in one go.
+        with self.lock:
+            if self.limit is not None:
+                events = events[:max(self.limit - self.event_count, 0)]
+            self.event_count += len(events)
+            reached_limit = self.limit is not None and self.event_count >= self.limit
+        if not events:
+            return
+        if self.buffer is not None:
+            self.buffer.put(events)
+        else:
+            self._write(events)
+        if reached_limit and not self.reached_limit:
+            self.reached_limit = True
+            if self.buffer is None:
+                print(f"\nReached limit of {self.limit} events. Closing connection.", file=self.writer.status)
+            self.unsubscribe()
+
+    def _write(self, events):
+        if self.metrics is not None:
+            started = time.perf_counter()
+            self.writer.write(events, encoded=self.passthrough)
+            self.metrics.observe_write(time.perf_counter() - started)
+        else:
+            self.writer.write(events, encoded=self.passthrough)
+        self.written += len(events)
+
+    def _drain(self):
+        while True:
+            events = self.buffer.get()
+            if events is None:
                 return
-            elif msg_type == 'data':
-                payload = data.get('payload', {})
-                if 'errors' in payload:
-                    print(f"GraphQL Error: {payload['errors']}")
-                    return
-                if 'data' in payload and 'outputEventsByComponentIdPatterns' in payload['data']:
-                    events = payload['data']['outputEventsByComponentIdPatterns']
-                    if isinstance(events, list):
-                        for event in events:
-                            print("{ \"event\":", json.dumps(event, indent=2), "}")  # Pretty-print the event
-                            with self.lock:
-                                self.event_count += 1
-                                if self.event_count >= self.limit:
-                                    print(f"\nReached limit of {self.limit} events. Closing connection.")
-                                    self.unsubscribe(ws)
-                                    ws.close()
-                                    return
-                    else:
-                        print(f"Unexpected events format: {events}")
-            elif msg_type == 'ka':
-                pass
-            elif msg_type == 'complete':
-                print("Subscription complete.")
-            else:
-                print(f"Unhandled message type: {msg_type}")
-        except json.JSONDecodeError:
-            print(f"Invalid JSON message: {message}")
+            self._write(events)
+
+    def _connected(self):
+        now = time.time()
+        if self.disconnected_at is not None:
+            seconds = now - self.disconnected_at
+            missed = None if self.missed_rate is None else round(self.missed_rate * seconds)
+            gap = {
+                "disconnected": datetime.fromtimestamp(self.disconnected_at, timezone.utc).isoformat(),
+                "reconnected": datetime.fromtimestamp(now, timezone.utc).isoformat(),
+                "seconds": round(seconds, 3),
+                "events_missed_estimate": missed,
+            }
+            self.gaps.append(gap)
+            self.reconnects += 1
+            self.error = None
+            if self.metrics is not None:
+                self.metrics.observe_gap(seconds)
+            mark_gap = getattr(self.writer, 'mark_gap', None)
+            if mark_gap is not None:
+                mark_gap(gap)
+            estimate = "" if missed is None else f", about {missed} events missed"
+            print(f"Reconnected after a {seconds:.1f} s gap{estimate}.", file=self.writer.status)
+            self.disconnected_at = None
+        self.connected_at = now
+        self.received_at_connect = self.received
+
+    def _disconnected(self):
+        if self.connected_at is None:
+            return
+        now = time.time()
+        # Tap events are sampled and unnumbered, so what was missed can only
+        # be estimated from the rate received before the drop.
+        elapsed = now - self.connected_at
+        if elapsed >= 1.0:
+            self.missed_rate = (self.received - self.received_at_connect) / elapsed
+        self.disconnected_at = now
+        self.connected_at = None
+
+    def stats(self):
+        stats = {"received": self.received}
+        if self.where is not None:
+            stats["matched"] = self.matched
+        stats["written"] = self.written
+        if self.buffer is not None:
+            stats.update({"dropped": self.buffer.dropped, "buffered": len(self.buffer), "policy": self.buffer.policy})
+        if self.daemon_dropped:
+            stats["daemon_dropped_frames"] = self.daemon_dropped
+        if self.reconnects:
+            stats.update({"reconnects": self.reconnects,
+                          "gap_seconds": round(sum(gap['seconds'] for gap in self.gaps), 3)})
+        return stats
+
+    def print_stats(self, out=None):
+        out = out or sys.stderr
+        print("Events: " + ", ".join(f"{name} {value}" for name, value in self.stats().items()), file=out)
+
+    def unsubscribe(self):
+        """Stop the tap; subscribe() then returns."""
+        session, future = self.session, self.future
+        if session is not None and future is not None:
+            session.stop(future)
+
+    def _run(self):
+        """One connection's worth of subscribe()."""
+        if self.daemon is not None:
+            from vector_daemon import daemon_available
+            if not daemon_available(self.daemon):
+                print(f"No daemon on {self.daemon}; connecting directly.", file=self.writer.status)
+                self.daemon = None
+        session = VectorSession(self.ws_url, ack_timeout=self.ack_timeout, codec=self.codec, raw_events=self.passthrough,
+                                metrics=self.metrics, on_control=self.on_control, daemon=self.daemon)
+        try:
+            print(f"Sent connection_init at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}...", file=self.writer.status)
+            try:
+                session.connect()
+            except Exception as e:
+                self.error = str(e)
+                print(f"Connection failed: {self.error}", file=self.writer.status)
+                return
+            self.acked = True
+            for key in ('socket_open', 'ack'):
+                self.timings.setdefault(key, session.timings[key])
+            print("Connection acknowledged by server.", file=self.writer.status)
+            self._connected()
+            variables = subscription_variables(self.patterns, self.interval, self.sample_limit)
+            self.session = session
+            self.future = session.submit(self.query, variables, on_data=self.on_data)
+            self.timings.setdefault('sent', self.future.timings['sent'])
+            print(f"Subscription sent for components matching patterns: {', '.join(self.patterns)}...", file=self.writer.status)
+            try:
+                self.future.result()
+                if not self.reached_limit:
+                    self.completed = True
+                    print("Subscription complete.", file=self.writer.status)
+            except Exception as e:
+                if session.is_connected():
+                    # A failed subscription is final; a dropped connection may be retried.
+                    self.error = f"Subscription error: {e}"
+                    self.completed = True
+                else:
+                    self.error = str(e)
+                print(self.error, file=self.writer.status)
+        finally:
+            self.session = None
+            session.close()
+
+    def _should_reconnect(self, failures):
+        if self.reached_limit or self.completed or self.reconnect_attempts <= 0:
+            return False
+        if self.disconnected_at is None:
+            return False  # never got a connection to begin with
+        if failures > self.reconnect_attempts:
+            self.error = f"Gave up reconnecting after {self.reconnect_attempts} attempts"
+            print(self.error, file=self.writer.status)
+            return False
+        return True
+
+    def subscribe(self):
+        self.timings = {'connect_start': time.perf_counter()}
+        if self.buffer is not None:
+            self.writer_thread = threading.Thread(target=self._drain, daemon=True)
+            self.writer_thread.start()
+        try:
+            failures = 0
+            while True:
+                self.acked = False
+                self._run()
+                self._disconnected()
+                failures = 1 if self.acked else failures + 1
+                if not self._should_reconnect(failures):
+                    break
+                delay = backoff_delay(failures - 1, self.reconnect_delay, self.reconnect_max_delay)
+                print(f"Connection lost; reconnecting in {delay:.1f} s "
+                      f"(attempt {failures}/{self.reconnect_attempts})...", file=self.writer.status)
+                time.sleep(delay)
+        finally:
+            if self.sampler is not None:
+                # Whatever the last, partial window sampled.
+                self._write_limited(self.sampler.drain())
+            if self.buffer is not None:
+                self.buffer.close()
+                self.writer_thread.join()
+                if self.reached_limit:
+                    print(f"\nReached limit of {self.limit} events. Closing connection.", file=self.writer.status)
+            self.writer.close()
+
+def load_topology(client, cache, probe, on_page, page_size=DEFAULT_PAGE_SIZE, refresh=False):
+    """Feed every component's topology node to on_page(kind, nodes).
+
+    Uses the cached topology when it still matches probe, otherwise pages it
+    in from Vector and stores it. Returns True when the cache was used.
+    """
+    if cache is not None and not refresh:
+        components = cache.load(client.ws_url, probe)
+        if components is not None:
+            for kind, nodes in components.items():
+                on_page(kind, nodes)
+            return True
+
+    fetched = defaultdict(list)
+
+    def collect(kind, nodes):
+        fetched[kind].extend(nodes)
+        on_page(kind, nodes)
+
+    client.fetch_topology(collect, page_size=page_size)
+    if cache is not None:
+        cache.store(client.ws_url, probe, dict(fetched))
+    return False
+
+
+def _timed(func, timings, key):
+    """func, adding the seconds each call takes to timings[key]."""
+    def timed(*args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            timings[key] = timings.get(key, 0.0) + time.perf_counter() - started
+    return timed
+
+
+def load_graph(client, cache, probe, required_ids=(), page_size=DEFAULT_PAGE_SIZE, refresh=False, timings=None):
+    """Build a TopologyGraph via load_topology; returns (graph, from_cache).
+
+    Counts can match after a rename, so when a cached topology lacks one of
+    required_ids it is refetched once before the caller reports it missing.
+    With a ``timings`` dict, the time spent adding nodes is added to its
+    'graph' entry.
+    """
+    while True:
+        graph = TopologyGraph()
+        on_page = graph.add_nodes if timings is None else _timed(graph.add_nodes, timings, 'graph')
+        cached = load_topology(client, cache, probe, on_page, page_size=page_size, refresh=refresh)
+        if not cached or all(id_ in graph for id_ in required_ids):
+            return graph, cached
+        refresh = True
+
+
+def load_component_graph(client, data, page_size=DEFAULT_PAGE_SIZE, timings=None):
+    """Build a TopologyGraph around one component from its build_component_query data.
+
+    It holds what get-info prints for that component and nothing more: the
+    node lists its own edges, except for the transforms feeding a transform,
+    which are taken from an edge list of every transform. The graph is empty
+    when no kind has the component.
+    """
+    graph = TopologyGraph()
+    for kind, *_ in COMPONENT_KINDS:
+        nodes = data[kind]['nodes']
+        if not nodes:
+            continue
+        if kind == 'transforms':
+            on_page = graph.add_nodes if timings is None else _timed(graph.add_nodes, timings, 'graph')
+            client.fetch_pages([(kind, build_page_query(kind, TRANSFORM_EDGE_FIELDS), {})], on_page, page_size=page_size)
+        graph.add_component(kind, nodes[0])
+        break
+    return graph
+
+
+def is_glob(pattern):
+    return any(c in pattern for c in '*?[')
+
+
+def resolve_components(graph, patterns):
+    """Expand ids and glob patterns against graph.
+
+    Returns (ids, unmatched): ids in pattern order without duplicates, and
+    the patterns that matched nothing.
+    """
+    all_ids = None
+    ids = {}
+    unmatched = []
+    for pattern in patterns:
+        if is_glob(pattern):
+            if all_ids is None:
+                all_ids = sorted(graph.component_ids())
+            matched = [id_ for id_ in all_ids if fnmatch.fnmatchcase(id_, pattern)]
+        else:
+            matched = [pattern] if pattern in graph else []
+        if not matched:
+            unmatched.append(pattern)
+        for id_ in matched:
+            ids.setdefault(id_, None)
+    return list(ids), unmatched
+
+
+def read_batch_names(names, path):
+    """Component names/patterns from argv plus a file ('-' for stdin).
+
+    Blank lines and lines starting with '#' are skipped. With neither names
+    nor a file, stdin is read.
+    """
+    names = list(names)
+    if path is None and not names:
+        path = '-'
+    if path is not None:
+        f = sys.stdin if path == '-' else open(path)
+        try:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    names.append(line)
+        finally:
+            if f is not sys.stdin:
+                f.close()
+    return names
+
+
+class ComponentLookup:
+    """What get-info, get-chain and batch print, as gathered by lookup_components."""
+
+    def __init__(self, probe, ids, unmatched, infos, chains, phases):
+        self.probe = probe
+        self.ids = ids
+        self.unmatched = unmatched
+        self.infos = infos
+        self.chains = chains
+        self.phases = phases
+
+    @property
+    def hostname(self):
+        return self.probe['meta']['hostname']
+
+    def info(self, component_id):
+        return self.infos[component_id]
+
+    def chain(self, component_id):
+        return {c: self.infos[c] for c in self.chains[component_id]}
+
+
+def lookup_components(client, cache, mode, names, page_size=DEFAULT_PAGE_SIZE, refresh=False, metrics=True,
+                      graphs=None):
+    """Probe, load the topology and overlay fresh metrics for names.
+
+    mode is 'get-info' or 'get-chain'; names may contain glob patterns.
+    The returned phases add up to the wall time: 'parse' (frame decoding on
+    the socket thread) and 'graph' (building the TopologyGraph) are taken out
+    of the topology and metrics phases they happened in.
+
+    ``graphs`` is a dict kept across calls (the daemon's) holding the last
+    TopologyGraph per endpoint, reused while the probe still matches it.
+    The graph is never modified, so it can be shared between calls.
+
+    get-info of a single component that is not in a fresh graph or cache is
+    answered from its own node (load_component_graph) instead of paging in
+    the whole topology; globs and get-chain need all of it.
+    """
+    phases = {}
+    session = client.session
+    required_ids = [n for n in names if not is_glob(n)]
+    probe_future = client.submit(PROBE_QUERY)
+    single = mode == 'get-info' and len(names) == 1 and required_ids
+    target_future = None
+    if single and metrics:
+        # Runs alongside the probe on the same socket.
+        target_future = client.submit(*build_component_query(names[0]))
+    probe = probe_future.result()
+    phases.update({k: v for k, v in latency_breakdown(probe_future.timings).items() if k in ('connect', 'ack', 'first_byte')})
+    phases['probe'] = probe_future.timings['complete'] - probe_future.timings['first_data']
+
+    build = {}
+    decoded = session.decode_seconds
+    topology_started = time.perf_counter()
+    fingerprint = TopologyCache.fingerprint(probe)
+    graph, built_for = (None, None) if graphs is None or refresh else graphs.get(client.ws_url, (None, None))
+    if graph is not None and built_for == fingerprint and all(id_ in graph for id_ in required_ids):
+        cached = True
+    elif single:
+        components = None if cache is None or refresh else cache.load(client.ws_url, probe)
+        graph = TopologyGraph()
+        for kind, nodes in (components or {}).items():
+            _timed(graph.add_nodes, build, 'graph')(kind, nodes)
+        cached = names[0] in graph
+        if cached and graphs is not None:
+            graphs[client.ws_url] = (graph, fingerprint)
+        elif not cached:
+            if target_future is None:
+                target_future = client.submit(*build_component_query(names[0], metrics=False))
+            graph = load_component_graph(client, target_future.result(), page_size=page_size, timings=build)
+    else:
+        graph, cached = load_graph(client, cache, probe, required_ids, page_size=page_size, refresh=refresh, timings=build)
+        if graphs is not None:
+            graphs[client.ws_url] = (graph, fingerprint)
+    parse = session.decode_seconds - decoded
+    phases['topology (cached)' if cached else 'topology'] = max(
+        time.perf_counter() - topology_started - parse - build.get('graph', 0.0), 0.0)
+
+    ids, unmatched = resolve_components(graph, names)
+    if mode == 'get-info':
+        chains = None
+        shown_ids = ids
+    else:  # get-chain
+        chains = {id_: sorted(c for c in graph.connected(id_) if c in graph) for id_ in ids}
+        shown_ids = sorted({c for chain in chains.values() for c in chain})
+
+    fresh = {}
+    if metrics and shown_ids:
+        decoded = session.decode_seconds
+        metrics_started = time.perf_counter()
+        if target_future is not None:
+            data = target_future.result()
+            fresh = {n['componentId']: n for kind, *_ in COMPONENT_KINDS for n in data[kind]['nodes']}
+        else:
+            fresh = client.fetch_metrics(graph.ids_by_kind(shown_ids), page_size=page_size)
+        metrics_parse = session.decode_seconds - decoded
+        parse += metrics_parse
+        phases['metrics'] = max(time.perf_counter() - metrics_started - metrics_parse, 0.0)
+
+    phases['parse'] = parse
+    graph_started = time.perf_counter()
+    infos = {id_: graph.component_info(id_, fresh.get(id_)) for id_ in shown_ids}
+    phases['graph'] = build.get('graph', 0.0) + time.perf_counter() - graph_started
+    return ComponentLookup(probe, ids, unmatched, infos, chains, phases)
+
+
+DEFAULT_FLEET_WORKERS = 8
+DEFAULT_NODE_TIMEOUT = 30.0
+
+
+def read_inventory(path):
+    """Vector endpoints, one per line: a ws:// URL or host:port."""
+    endpoints = []
+    with open(path) as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            if '://' not in line:
+                line = f"ws://{line}/graphql"
+            endpoints.append(line)
+    return endpoints
+
+
+def fleet_map(endpoints, work, workers=DEFAULT_FLEET_WORKERS, timeout=DEFAULT_NODE_TIMEOUT, ack_timeout=DEFAULT_ACK_TIMEOUT,
+              codec=None):
+    """Run work(client) against every endpoint on a bounded thread pool.
+
+    Each node gets its own VectorClient, closed after ``timeout`` seconds,
+    which fails whatever it is still waiting for. Returns a list of
+    (endpoint, result, error) in inventory order.
+    """
+    def run(endpoint):
+        client = VectorClient(endpoint, ack_timeout=ack_timeout, codec=codec)
+        timed_out = threading.Event()
+
+        def expire():
+            timed_out.set()
+            client.close()
+
+        timer = threading.Timer(timeout, expire)
+        timer.daemon = True
+        timer.start()
+        try:
+            return work(client)
         except Exception as e:
-            print(f"Error processing message: {e}")
-
-    def on_error(self, ws, error):
-        print(f"WebSocket error: {error}")
-
-    def on_close(self, ws, close_status_code, close_msg):
-        print(f"WebSocket connection closed (code: {close_status_code}, msg: {close_msg}).")
-
-    def on_open(self, ws):
-        init_payload = json.dumps({
-            "type": "connection_init",
-            "payload": {}
-        })
-        ws.send(init_payload)
-        print(f"Sent connection_init at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}...")
-
-        def send_subscription():
-            subscription_query = """
-            subscription OutputEventsByComponentIdPatterns($outputsPatterns: [String!]!) {
-  outputEventsByComponentIdPatterns(outputsPatterns: $outputsPatterns) {
-    ... on Log {
-      componentId
-      componentType
-      componentKind
-      message
-      timestamp
-      string(encoding: JSON)
-      json(field: "message")
-    }
-    ... on Metric {
-      componentId
-      componentType
-      componentKind
-      timestamp
-      name
-      namespace
-      kind
-      valueType
-      value
-      tags {
-        key
-        value
-      }
-      string(encoding: JSON)
-    }
-    ... on EventNotification {
-      message
-    }
-    ... on Trace {
-      componentId
-      componentType
-      componentKind
-      string(encoding: JSON)
-      json(field: "trace")
-    }
-    __typename
-  }
+            if timed_out.is_set():
+                raise Exception(f"timed out after {timeout}s") from e
+            raise
+        finally:
+            timer.cancel()
+            client.close()
+
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [(endpoint, pool.submit(run, endpoint)) for endpoint in endpoints]
+        for endpoint, future in futures:
+            try:
+                results.append((endpoint, future.result(), None))
+            except Exception as e:
+                results.append((endpoint, None, str(e)))
+    return results
+
+
+def fleet_subscribe(endpoints, patterns, limit, workers=DEFAULT_FLEET_WORKERS, timeout=DEFAULT_NODE_TIMEOUT,
+                    ack_timeout=DEFAULT_ACK_TIMEOUT, writer=None, query=SUBSCRIPTION_QUERY, interval=None,
+                    sample_limit=None, where=None, codec=None, reservoir=None, window=10.0):
+    """Tap the same patterns on every endpoint at once, on one event loop.
+
+    Every printed event is tagged with the node's meta.hostname. ``limit``
+    and ``reservoir`` (a ReservoirSampler of that size per ``window``) apply
+    per node; ``timeout`` bounds connecting and the hostname lookup.
+    Returns the endpoints that failed, with their errors.
+    """
+    writer = writer or PrettyEventWriter()
+    failures = []
+
+    async def tap(endpoint, connect_slots):
+        session = AsyncVectorSession(endpoint, ack_timeout=ack_timeout, codec=codec)
+        sampler = ReservoirSampler(reservoir, window) if reservoir else None
+        try:
+            async with connect_slots:
+                probe = await asyncio.wait_for(session.execute(META_QUERY), timeout)
+            hostname = probe['meta']['hostname']
+            async for event in AsyncVectorSubscriber(session, patterns, limit=limit, query=query, interval=interval,
+                                                   sample_limit=sample_limit, where=where, sampler=sampler).events():
+                writer.write([event], node=hostname)
+        except Exception as e:
+            failures.append((endpoint, str(e) or type(e).__name__))
+        finally:
+            await session.close()
+
+    async def run():
+        # Connecting is what needs bounding; established taps are cheap.
+        connect_slots = asyncio.Semaphore(workers)
+        await asyncio.gather(*(tap(endpoint, connect_slots) for endpoint in endpoints))
+
+    try:
+        asyncio.run(run())
+    finally:
+        writer.close()
+    return failures
+
+
+class TopologyGraph:
+    """Components of a Vector topology and the edges between them.
+
+    Built incrementally in linear time: add_nodes can be handed straight to
+    fetch_pages/load_topology. Component ids are interned and mapped to dense
+    indices, and adjacency is kept as index sets in both directions, so
+    neighbour lookups and closures never rescan the node list.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.index = {}
+        self.kinds = []
+        self.nodes = []
+        self.downstream_of = []
+        self.upstream_of = []
+
+    def _intern(self, component_id):
+        idx = self.index.get(component_id)
+        if idx is None:
+            component_id = sys.intern(component_id)
+            idx = len(self.ids)
+            self.index[component_id] = idx
+            self.ids.append(component_id)
+            self.kinds.append(None)
+            self.nodes.append(None)
+            self.downstream_of.append(set())
+            self.upstream_of.append(set())
+        return idx
+
+    def add_nodes(self, kind, nodes):
+        """Add a page of nodes of one kind ('sources', 'transforms' or 'sinks')."""
+        for node in nodes:
+            idx = self._intern(node['componentId'])
+            self.kinds[idx] = kind
+            self.nodes[idx] = node
+            # Sinks only list their upstream side, which the other kinds
+            # already describe from theirs.
+            if kind == 'sinks':
+                continue
+            for out_key in ('transforms', 'sinks'):
+                for out_comp in node.get(out_key) or ():
+                    out_idx = self._intern(out_comp['componentId'])
+                    self.downstream_of[idx].add(out_idx)
+                    self.upstream_of[out_idx].add(idx)
+
+    def add_component(self, kind, node):
+        """Add a single node together with the edges it lists from its
+        downstream end (a transform's sources, a sink's sources and
+        transforms), which add_nodes leaves to the other kinds' pages."""
+        self.add_nodes(kind, [node])
+        idx = self.index[node['componentId']]
+        in_keys = {'transforms': ('sources',), 'sinks': ('sources', 'transforms')}.get(kind, ())
+        for in_key in in_keys:
+            for in_comp in node.get(in_key) or ():
+                in_idx = self._intern(in_comp['componentId'])
+                self.upstream_of[idx].add(in_idx)
+                self.downstream_of[in_idx].add(idx)
+
+    def __contains__(self, component_id):
+        idx = self.index.get(component_id)
+        return idx is not None and self.nodes[idx] is not None
+
+    def __len__(self):
+        return sum(1 for node in self.nodes if node is not None)
+
+    def kind(self, component_id):
+        return self.kinds[self.index[component_id]]
+
+    def node(self, component_id):
+        return self.nodes[self.index[component_id]]
+
+    def update_node(self, component_id, fields):
+        """Overlay fields (e.g. fresh metrics) on a component's node."""
+        idx = self.index[component_id]
+        self.nodes[idx] = {**self.nodes[idx], **fields}
+
+    def component_ids(self, kind=None):
+        return [id_ for id_, k, node in zip(self.ids, self.kinds, self.nodes)
+                if node is not None and (kind is None or k == kind)]
+
+    def inputs(self, component_id):
+        return sorted(self.ids[i] for i in self.upstream_of[self.index[component_id]])
+
+    def outputs(self, component_id):
+        return sorted(self.ids[i] for i in self.downstream_of[self.index[component_id]])
+
+    def neighbours(self, component_id):
+        idx = self.index[component_id]
+        return sorted(self.ids[i] for i in self.upstream_of[idx] | self.downstream_of[idx])
+
+    def _closure(self, start, adjacency):
+        seen = {start}
+        stack = [start]
+        while stack:
+            for neigh in adjacency[stack.pop()]:
+                if neigh not in seen:
+                    seen.add(neigh)
+                    stack.append(neigh)
+        return seen
+
+    def upstream(self, component_id):
+        """Ids of component_id and everything that feeds it, directly or not."""
+        return {self.ids[i] for i in self._closure(self.index[component_id], self.upstream_of)}
+
+    def downstream(self, component_id):
+        """Ids of component_id and everything it feeds, directly or not."""
+        return {self.ids[i] for i in self._closure(self.index[component_id], self.downstream_of)}
+
+    def connected(self, component_id):
+        """The chain get-chain prints: the upstream and downstream closures."""
+        idx = self.index[component_id]
+        indices = self._closure(idx, self.upstream_of) | self._closure(idx, self.downstream_of)
+        return {self.ids[i] for i in indices}
+
+    def ids_by_kind(self, component_ids):
+        by_kind = defaultdict(set)
+        for id_ in component_ids:
+            by_kind[self.kind(id_)].add(id_)
+        return dict(by_kind)
+
+    def transforms_view(self, component_id):
+        """Upstream transforms merged with the node's own downstream ones, sorted."""
+        idx = self.index[component_id]
+        refs = {
+            (self.ids[i], self.nodes[i]['componentType'])
+            for i in self.upstream_of[idx] if self.kinds[i] == 'transforms'
+        }
+        refs.update((t['componentId'], t['componentType']) for t in self.nodes[idx].get('transforms') or ())
+        return [{"componentId": id_, "componentType": type_} for id_, type_ in sorted(refs)]
+
+    def component_info(self, component_id, overlay=None):
+        """The dict get-info prints for a component, with overlay (e.g. fresh metrics) merged into its node."""
+        info = {**self.node(component_id), **overlay} if overlay else self.node(component_id).copy()
+        info['inputs'] = self.inputs(component_id)
+        info['outputs'] = self.outputs(component_id)
+        if self.kind(component_id) == 'transforms':
+            info['transforms'] = self.transforms_view(component_id)
+        return info
+
+
+class CounterRates:
+    """Per-second rates from successive samples of cumulative counters.
+
+    observe() returns None for the first sample of a key, when the
+    timestamp has not moved (Vector has not refreshed the metric yet) and
+    when the counter went backwards, i.e. the component was restarted.
+    """
+
+    def __init__(self):
+        self.last = {}
+
+    def observe(self, key, timestamp, value):
+        seconds = datetime.fromisoformat(timestamp).timestamp()
+        previous = self.last.get(key)
+        if previous is not None and seconds <= previous[0]:
+            return None
+        self.last[key] = (seconds, value)
+        if previous is None or value < previous[1]:
+            return None
+        return round((value - previous[1]) / (seconds - previous[0]), 3)
+
+
+DEFAULT_HEALTH_INTERVAL = 2.0
+DEFAULT_HEALTH_TOLERANCE = 0.1
+
+
+class ChainHealth:
+    """Rates and bottleneck for a chain from repeated metrics snapshots.
+
+    Feed observe() the {componentId: node} dicts from VectorClient.fetch_metrics.
+    From the second snapshot on it returns a report with each component's
+    received and sent events/sec and each hop's rate. Two things are
+    flagged when off by more than ``tolerance``:
+
+    - drop: a component sends fewer events than it receives (also expected
+      from filter/route style transforms);
+    - backlog: a component receives fewer events than its inputs send it,
+      so the buffer in front of it is growing.
+
+    The bottleneck is the flag losing the most events/sec.
+    """
+
+    def __init__(self, graph, component_ids, tolerance=DEFAULT_HEALTH_TOLERANCE):
+        self.graph = graph
+        self.order = self._topological_order(set(component_ids))
+        self.tolerance = tolerance
+        self.rates = CounterRates()
+
+    def _topological_order(self, ids):
+        pending = {id_: len([i for i in self.graph.inputs(id_) if i in ids]) for id_ in ids}
+        ready = sorted(id_ for id_, n in pending.items() if n == 0)
+        order = []
+        while ready:
+            id_ = ready.pop(0)
+            order.append(id_)
+            for output in self.graph.outputs(id_):
+                if output in pending:
+                    pending[output] -= 1
+                    if pending[output] == 0:
+                        ready.append(output)
+        # Cycles cannot happen in a valid config; keep whatever is left anyway.
+        return order + sorted(ids - set(order))
+
+    def _rate(self, id_, node, metric):
+        counter = ((node or {}).get('metrics') or {}).get(metric)
+        if not counter or counter.get('timestamp') is None:
+            return None
+        return self.rates.observe((id_, metric), counter['timestamp'], counter[metric])
+
+    def observe(self, metrics):
+        components = {}
+        for id_ in self.order:
+            node = metrics.get(id_)
+            components[id_] = {
+                "kind": self.graph.kind(id_)[:-1],
+                "received_rate": self._rate(id_, node, 'receivedEventsTotal'),
+                "sent_rate": self._rate(id_, node, 'sentEventsTotal'),
+            }
+        if all(c["received_rate"] is None and c["sent_rate"] is None for c in components.values()):
+            return None
+
+        hops = []
+        flags = []
+        for id_ in self.order:
+            component = components[id_]
+            received, sent = component["received_rate"], component["sent_rate"]
+            component["backlog_growth"] = None if received is None or sent is None else received - sent
+            if component["kind"] == 'transform' and received and sent is not None \
+                    and sent < received * (1 - self.tolerance):
+                flags.append({"type": "drop", "componentId": id_, "loss_rate": received - sent})
+
+            inputs = [i for i in self.graph.inputs(id_) if i in components]
+            for input_id in inputs:
+                hops.append({"from": input_id, "to": id_, "rate": components[input_id]["sent_rate"]})
+            # Every input's output is delivered to each of its consumers.
+            expected = [components[i]["sent_rate"] for i in inputs]
+            if inputs and None not in expected and received is not None:
+                expected = sum(expected)
+                if received < expected * (1 - self.tolerance):
+                    flags.append({"type": "backlog", "componentId": id_, "inputs": inputs,
+                                  "loss_rate": expected - received})
+
+        bottleneck = None
+        if flags:
+            position = {id_: n for n, id_ in enumerate(self.order)}
+            bottleneck = max(flags, key=lambda f: (f["loss_rate"], -position[f["componentId"]]))
+        return {"components": components, "hops": hops, "flags": flags, "bottleneck": bottleneck}
+
+
+# Vector reports throughput as the change per `interval` ms; rates are per second.
+THROUGHPUT_SUBSCRIPTIONS = {
+    'events_in': 'componentReceivedEventsThroughputs',
+    'events_out': 'componentSentEventsThroughputs',
+    'bytes_in': 'componentReceivedBytesThroughputs',
+    'bytes_out': 'componentSentBytesThroughputs',
 }
-            """
-            variables = {"outputsPatterns": self.patterns}
-            sub_payload = json.dumps({
-                "id": "1",
-                "type": "start",
-                "payload": {
-                    "query": subscription_query,
-                    "variables": variables
-                }
-            })
-            ws.send(sub_payload)
-            self.subscription_id = "1"
-            print(f"Subscription sent for components matching patterns: {', '.join(self.patterns)}...")
-
-        threading.Timer(0.5, send_subscription).start()
-
-    def unsubscribe(self, ws):
-        if self.subscription_id and ws:
-            ws.send(json.dumps({
-                "id": self.subscription_id,
-                "type": "stop"
-            }))
+DEFAULT_TOP_INTERVAL = 1000
 
-    def subscribe(self):
-        ws_app = websocket.WebSocketApp(
-            self.ws_url,
-            on_message=self.on_message,
-            on_error=self.on_error,
-            on_close=self.on_close,
-            on_open=self.on_open,
-            subprotocols=["graphql-ws"]
-        )
-        ws_app.run_forever()
-
-def get_connected(all_by_id, outgoing, start):
-    reverse = defaultdict(list)
-    for fr, tos in outgoing.items():
-        for to in tos:
-            reverse[to].append(fr)
-
-    def bfs(start, graph):
-        q = deque([start])
-        vis = set()
-        while q:
-            cur = q.popleft()
-            if cur in vis:
+
+def build_throughput_subscription(field):
+    return f"""
+subscription {field[0].upper()}{field[1:]}($interval: Int!) {{
+  {field}(interval: $interval) {{
+    componentId
+    throughput
+  }}
+}}
+"""
+
+
+def format_rate(value, unit=''):
+    if value is None:
+        return '-'
+    for prefix in ('', 'k', 'M', 'G'):
+        if abs(value) < 1000 or prefix == 'G':
+            break
+        value /= 1000
+    return f"{value:.1f}{prefix}{unit}" if prefix or value % 1 else f"{value:.0f}{unit}"
+
+
+class ThroughputTable:
+    """Per-component events/sec and bytes/sec, kept current by the
+    throughput subscriptions.
+
+    update() is fed each subscription's payload as it arrives and only
+    touches the components in it; render() draws whatever is known at that
+    moment. Kind and type come from ``graph`` when one is given.
+    """
+
+    COLUMNS = tuple(THROUGHPUT_SUBSCRIPTIONS)
+    HEADERS = {'events_in': 'EVENTS IN/s', 'events_out': 'EVENTS OUT/s', 'bytes_in': 'BYTES IN/s', 'bytes_out': 'BYTES OUT/s'}
+
+    def __init__(self, interval=DEFAULT_TOP_INTERVAL, graph=None, patterns=None):
+        self.interval = interval
+        self.graph = graph
+        self.patterns = patterns
+        self.lock = threading.Lock()
+        self.rates = {}
+        self.updated = None
+
+    def update(self, column, nodes):
+        scale = 1000 / self.interval
+        with self.lock:
+            for node in nodes:
+                id_ = node['componentId']
+                if self.patterns and not any(fnmatch.fnmatchcase(id_, p) for p in self.patterns):
+                    continue
+                self.rates.setdefault(id_, {})[column] = node['throughput'] * scale
+            self.updated = time.monotonic()
+
+    def rows(self, sort='events_out'):
+        with self.lock:
+            rows = [(id_, dict(rates)) for id_, rates in self.rates.items()]
+        rows.sort(key=lambda row: (-(row[1].get(sort) or 0), row[0]))
+        return rows
+
+    def render(self, sort='events_out', max_rows=None, title=''):
+        rows = self.rows(sort)
+        if max_rows is not None:
+            rows = rows[:max_rows]
+        id_width = max([len('COMPONENT')] + [len(id_) for id_, _ in rows])
+        lines = []
+        if title:
+            age = '' if self.updated is None else f"  updated {time.monotonic() - self.updated:.1f}s ago"
+            lines.append(f"{title}{age}  (sorted by {sort})")
+        header = f"{'COMPONENT':<{id_width}}  {'KIND':<9}  {'TYPE':<14}"
+        lines.append(header + "".join(f"  {self.HEADERS[c]:>12}" for c in self.COLUMNS))
+        for id_, rates in rows:
+            if self.graph is not None and id_ in self.graph:
+                kind = self.graph.kind(id_)[:-1]
+                component_type = self.graph.node(id_).get('componentType', '')
+            else:
+                kind = component_type = '?'
+            line = f"{id_:<{id_width}}  {kind:<9}  {component_type:<14}"
+            for column in self.COLUMNS:
+                unit = 'B' if column.startswith('bytes') else ''
+                line += f"  {format_rate(rates.get(column), unit):>12}"
+            lines.append(line)
+        return "\n".join(lines) + "\n"
+
+
+def watch_throughput(session, table, sort='events_out', iterations=None, max_rows=None, title='', out=None):
+    """Subscribe table to every throughput feed and redraw it each interval.
+
+    On a terminal the table is redrawn in place; otherwise each refresh is
+    printed after the previous one. Returns after ``iterations`` refreshes
+    (None: until interrupted); raises if a subscription fails.
+    """
+    out = out or sys.stdout
+    in_place = out.isatty()
+    futures = []
+    for column, field in THROUGHPUT_SUBSCRIPTIONS.items():
+        def on_data(data, column=column, field=field):
+            table.update(column, (data or {}).get(field) or [])
+        futures.append(session.submit(build_throughput_subscription(field), {"interval": table.interval}, on_data=on_data))
+    try:
+        refreshes = 0
+        waited = 0
+        while iterations is None or refreshes < iterations:
+            time.sleep(table.interval / 1000)
+            for future in futures:
+                if future.done():
+                    future.result()
+                    raise Exception("Throughput subscription ended")
+            waited += 1
+            if table.updated is None and waited < 3:
+                # Don't open with an empty table just because the first
+                # report is a moment late.
                 continue
-            vis.add(cur)
-            for neigh in graph[cur]:
-                q.append(neigh)
-        return vis
+            rows = max_rows
+            if rows is None and in_place:
+                rows = max(shutil.get_terminal_size().lines - 3, 1)
+            frame = table.render(sort, rows, title)
+            out.write("\x1b[H\x1b[J" + frame if in_place else frame + "\n")
+            out.flush()
+            refreshes += 1
+    finally:
+        for future in futures:
+            session.stop(future)
 
-    upstream = bfs(start, reverse)
-    downstream = bfs(start, outgoing)
-    connected = upstream.union(downstream)
-    return connected
 
 if __name__ == "__main__":
     # Configuration
     VECTOR_WS_URL = "ws://127.0.0.1:8686/graphql"
 
     parser = argparse.ArgumentParser(description="Vector Event Subscriber and Config Retriever")
+    parser.add_argument('--url', default=VECTOR_WS_URL, help=f'Vector GraphQL WebSocket endpoint (default: {VECTOR_WS_URL})')
+    parser.add_argument('--inventory', help='File listing Vector endpoints (URL or host:port per line); runs the command against all of them')
+    parser.add_argument('--workers', type=int, default=DEFAULT_FLEET_WORKERS, help='Nodes queried at once in fleet mode')
+    parser.add_argument('--node-timeout', type=float, default=DEFAULT_NODE_TIMEOUT, help='Seconds allowed per node in fleet mode')
+    parser.add_argument('--ack-timeout', type=float, default=DEFAULT_ACK_TIMEOUT, help='Seconds to wait for connection_ack before giving up')
+    parser.add_argument('--timings', action='store_true', help='Print a latency breakdown to stderr')
+    parser.add_argument('--codec', choices=['auto'] + list(CODECS), default='auto', help='JSON library for the message hot path (auto: fastest installed)')
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE, help='Components requested per page')
+    parser.add_argument('--daemon-socket', default=None, help='Unix socket of the daemon (default: $XDG_RUNTIME_DIR/vector_script.sock)')
+    parser.add_argument('--no-daemon', action='store_true', help='Connect to Vector directly even if a daemon is running (--ack-timeout only applies to direct connections)')
     subparsers = parser.add_subparsers(dest='command', required=True)
 
-    subscribe_parser = subparsers.add_parser('subscribe', help='Subscribe to events from components')
-    subscribe_parser.add_argument('--patterns', nargs='+', default=["my_http_source", "replace_via", "my_console_sink"], help='Component patterns/IDs')
+    def tap_options():
+        """Options of the tap commands. A new parser per command: parents share their
+        actions, so set_defaults on one command would change the others."""
+        options = argparse.ArgumentParser(add_help=False)
+        options.add_argument('--patterns', nargs='+', default=["my_http_source", "replace_via", "my_console_sink"], help='Component patterns/IDs')
+        options.add_argument('--interval', type=int, default=None, help=f'Milliseconds between batches Vector sends (Vector default: {TAP_INTERVAL})')
+        options.add_argument('--sample-limit', type=int, default=None, help='Events Vector samples per interval (default: --limit; aggregate: 50000)')
+        options.add_argument('--reservoir', type=int, default=None, help='Also sample client-side: keep a uniform sample of this many events per --window')
+        options.add_argument('--window', type=float, default=10.0, help='Seconds per --reservoir sample')
+        options.add_argument('--buffer', type=int, default=DEFAULT_BUFFER_EVENTS, help='Events queued between socket reader and writer (0: write inline)')
+        options.add_argument('--overflow', choices=OVERFLOW_POLICIES, default='block', help='What to do when the buffer is full')
+        options.add_argument('--reconnect-attempts', type=int, default=DEFAULT_RECONNECT_ATTEMPTS, help='Reconnect attempts in a row after the connection drops (0: exit)')
+        options.add_argument('--reconnect-delay', type=float, default=DEFAULT_RECONNECT_DELAY, help='Base of the jittered exponential backoff, in seconds')
+        options.add_argument('--reconnect-max-delay', type=float, default=DEFAULT_RECONNECT_MAX_DELAY, help='Longest wait between reconnect attempts, in seconds')
+        options.add_argument('--metrics-port', type=int, help='Serve Prometheus self-metrics on this local port (/metrics)')
+        options.add_argument('--metrics-file', help="Rewrite Prometheus self-metrics to this file every 10 s (e.g. node_exporter's textfile collector)")
+        options.add_argument('--where', action='append', help='Only keep events matching this filter, e.g. \'.level == "error"\' (repeat to AND; see vector_filter.py)')
+        options.add_argument('--fields', default='full', help=f"Event fields to request: a profile ({', '.join(FIELD_PROFILES)}) or a comma-separated list, e.g. componentId,message (aggregate default: only what it reads)")
+        return options
+
+    subscribe_parser = subparsers.add_parser('subscribe', parents=[tap_options()], help='Subscribe to events from components')
     subscribe_parser.add_argument('--limit', type=int, default=10, help='Event limit')
+    subscribe_parser.add_argument('--format', choices=['pretty', 'ndjson'], default='pretty', help='pretty: indented JSON per event; ndjson: compact lines, buffered, status on stderr')
+    subscribe_parser.add_argument('--flush-interval', type=float, default=DEFAULT_FLUSH_INTERVAL, help='ndjson: seconds between flushes of buffered events')
+    subscribe_parser.add_argument('--flush-bytes', type=int, default=DEFAULT_FLUSH_BYTES, help='ndjson: flush once this many bytes are buffered')
+
+    aggregate_parser = subparsers.add_parser('aggregate', parents=[tap_options()], help='Print rolling summaries (counts, top values, sizes, metric ranges) instead of events')
+    aggregate_parser.add_argument('--every', type=float, default=10.0, help='Seconds between summaries')
+    aggregate_parser.add_argument('--top', nargs='+', default=['message'], help='Fields to list the most frequent values of, written as in --where (e.g. message tags.host .status)')
+    aggregate_parser.add_argument('--k', type=int, default=10, help='Values listed per --top field')
+    aggregate_parser.add_argument('--capacity', type=int, default=1000, help='Values tracked per --top field, and (node, component, kind, type) rows counted; more: more accurate counts')
+    aggregate_parser.add_argument('--reset', action='store_true', help='Make each summary cover only the last --every seconds')
+    aggregate_parser.add_argument('--format', choices=['text', 'json'], default='text', help='json: one summary object per line')
+    aggregate_parser.add_argument('--limit', type=int, default=None, help='Stop after this many events (default: until interrupted)')
+    # Only the fields it reads, and up to 100k events/sec at Vector's default interval.
+    aggregate_parser.set_defaults(fields=None, sample_limit=50000)
 
-    info_parser = subparsers.add_parser('get-info', help='Get info for a specific component')
+    topology_options = argparse.ArgumentParser(add_help=False)
+    topology_options.add_argument('--no-metrics', action='store_true', help='Only print topology, skip fetching fresh metrics')
+    topology_options.add_argument('--refresh', action='store_true', help='Ignore and rewrite the cached topology')
+    topology_options.add_argument('--no-cache', action='store_true', help='Neither read nor write the topology cache')
+    topology_options.add_argument('--cache-dir', default=None, help='Topology cache directory (default: $XDG_CACHE_HOME/vector_script)')
+
+    info_parser = subparsers.add_parser('get-info', parents=[topology_options], help='Get info for a specific component')
     info_parser.add_argument('name', help='Component name/ID')
 
-    chain_parser = subparsers.add_parser('get-chain', help='Get chain info for a component and its connected inputs/outputs')
+    chain_parser = subparsers.add_parser('get-chain', parents=[topology_options], help='Get chain info for a component and its connected inputs/outputs')
     chain_parser.add_argument('name', help='Component name/ID')
 
+    batch_parser = subparsers.add_parser('batch', parents=[topology_options], help='Run get-info/get-chain for many components, printing JSON Lines')
+    batch_parser.add_argument('mode', choices=['get-info', 'get-chain'], help='What to print for each component')
+    batch_parser.add_argument('names', nargs='*', help='Component names/IDs or glob patterns (e.g. "http_*")')
+    batch_parser.add_argument('--file', help="Read names/patterns from a file, one per line ('-' for stdin)")
+
+    record_parser = subparsers.add_parser('record', parents=[tap_options()], help='Record tapped events into rotating compressed capture segments')
+    record_parser.add_argument('--output', required=True, help='Capture directory')
+    record_parser.add_argument('--prefix', default='capture', help='Segment file name prefix')
+    record_parser.add_argument('--limit', type=int, default=None, help='Stop after this many events (default: until interrupted)')
+    record_parser.add_argument('--compression', default='auto', help='zstd, gzip, lzma or none (auto: zstd if installed, else gzip)')
+    record_parser.add_argument('--segment-bytes', type=int, default=64 * 1024 * 1024, help='Start a new segment past this size')
+    record_parser.add_argument('--segment-seconds', type=float, default=300.0, help='Start a new segment after this many seconds')
+
+    capture_options = argparse.ArgumentParser(add_help=False)
+    capture_options.add_argument('capture', nargs='+', help='Capture directories and/or segment files')
+    capture_options.add_argument('--component', nargs='+', help='Only events from these component IDs or glob patterns')
+    capture_options.add_argument('--since', help='Only events received at or after this time (ISO 8601, or HH:MM[:SS] on the capture\'s first day)')
+    capture_options.add_argument('--until', help='Only events received at or before this time')
+    capture_options.add_argument('--type', nargs='+', dest='types', choices=list(EVENT_FIELDS), help='Only events of these __typenames')
+
+    subparsers.add_parser('extract', parents=[capture_options], help='Print the captured events matching the filters as NDJSON')
+    replay_parser = subparsers.add_parser('replay', parents=[capture_options], help='Replay captured events as NDJSON, paced as they were received')
+    replay_parser.add_argument('--speed', type=float, default=1.0, help='Multiple of real time (0: as fast as possible)')
+
+    health_parser = subparsers.add_parser('chain-health', help="Sample a component's chain and locate where throughput drops or backlog grows")
+    health_parser.add_argument('name', help='Component name/ID')
+    health_parser.add_argument('--interval', type=float, default=DEFAULT_HEALTH_INTERVAL, help='Seconds between counter samples')
+    health_parser.add_argument('--samples', type=int, default=1, help='Reports to print; more than one prints JSON Lines')
+    health_parser.add_argument('--tolerance', type=float, default=DEFAULT_HEALTH_TOLERANCE, help='Relative rate difference to flag')
+    health_parser.add_argument('--no-cache', action='store_true', help='Neither read nor write the topology cache')
+    health_parser.add_argument('--cache-dir', default=None, help='Topology cache directory (default: $XDG_CACHE_HOME/vector_script)')
+
+    top_parser = subparsers.add_parser('top', help='Live per-component events/sec and bytes/sec, refreshed in place')
+    top_parser.add_argument('--interval', type=int, default=DEFAULT_TOP_INTERVAL, help='Milliseconds between updates')
+    top_parser.add_argument('--sort', choices=ThroughputTable.COLUMNS, default='events_out', help='Column to sort by (descending)')
+    top_parser.add_argument('--patterns', nargs='+', help='Only show components matching these glob patterns')
+    top_parser.add_argument('--rows', type=int, help='Rows to show (default: fit the terminal)')
+    top_parser.add_argument('--iterations', type=int, help='Exit after this many refreshes')
+    top_parser.add_argument('--no-cache', action='store_true', help='Neither read nor write the topology cache')
+    top_parser.add_argument('--cache-dir', default=None, help='Topology cache directory (default: $XDG_CACHE_HOME/vector_script)')
+
+    daemon_parser = subparsers.add_parser('daemon', help='Keep connections and topologies warm for later calls, on a Unix socket')
+    daemon_parser.add_argument('--status', action='store_true', help="Print the running daemon's endpoints and counts")
+    daemon_parser.add_argument('--stop', action='store_true', help='Stop the running daemon')
+    daemon_parser.add_argument('--no-cache', action='store_true', help='Neither read nor write the topology cache')
+    daemon_parser.add_argument('--cache-dir', default=None, help='Topology cache directory (default: $XDG_CACHE_HOME/vector_script)')
+
+    clear_cache_parser = subparsers.add_parser('clear-cache', help='Remove cached topologies')
+    clear_cache_parser.add_argument('--cache-dir', default=None, help='Topology cache directory (default: $XDG_CACHE_HOME/vector_script)')
+
     args = parser.parse_args()
+    try:
+        codec = get_codec(args.codec)
+    except Exception as e:
+        parser.error(str(e))
+
+    def event_filter():
+        if not getattr(args, 'where', None):
+            return None
+        from vector_filter import compile_filter
+        try:
+            return compile_filter(args.where)
+        except ValueError as e:
+            parser.error(str(e))
+
+    def subscription_query(where=None, needed=()):
+        needed = (set(needed) | (where.fields if where is not None else set())) - {'__typename'}
+        if args.fields is None:
+            fields = needed
+        elif args.fields in FIELD_PROFILES:
+            fields = FIELD_PROFILES[args.fields]
+        else:
+            fields = [f.strip() for f in args.fields.split(',') if f.strip()]
+        if fields is not None and needed:
+            # The filter and aggregate have to see the fields they read.
+            fields = set(fields) | needed
+        try:
+            return build_subscription_query(fields)
+        except ValueError as e:
+            parser.error(str(e))
 
-    if args.command == 'subscribe':
-        subscriber = VectorEventSubscriber(VECTOR_WS_URL, args.patterns, args.limit)
+    def event_aggregator():
+        from vector_aggregate import EventAggregator
+        from vector_filter import compile_field
+        try:
+            top = {name: compile_field(name) for name in args.top}
+        except ValueError as e:
+            parser.error(str(e))
+        aggregator = EventAggregator(top, k=args.k, capacity=args.capacity, every=args.every, reset=args.reset,
+                                     output_format=args.format)
+        needed = {'componentId', 'componentKind', 'message', 'name', 'namespace', 'value'}
+        return aggregator, needed.union(*(get.fields for get in top.values()))
+
+    def daemon_socket():
+        """The running daemon's socket, or None to connect directly."""
+        if args.no_daemon or args.inventory:
+            return None
+        from vector_daemon import daemon_available, default_socket_path
+        path = args.daemon_socket or default_socket_path()
+        return path if daemon_available(path) else None
+
+    def event_writer():
+        if args.format == 'ndjson':
+            return NdjsonEventWriter(flush_bytes=args.flush_bytes, flush_interval=args.flush_interval, codec=codec)
+        return PrettyEventWriter()
+
+    if args.command == 'clear-cache':
+        removed = TopologyCache(args.cache_dir).invalidate()
+        print(f"Removed {removed} cached topolog{'y' if removed == 1 else 'ies'}.")
+    elif args.command == 'daemon':
+        from vector_daemon import DaemonConnection, TapDaemon, default_socket_path
+        path = args.daemon_socket or default_socket_path()
+        if args.status or args.stop:
+            try:
+                connection = DaemonConnection(path, None)
+                print(json.dumps(connection.request({"type": "shutdown" if args.stop else "status"}), indent=2))
+                connection.close()
+            except OSError:
+                print(f"No daemon is listening on {path}.", file=sys.stderr)
+                exit(1)
+        else:
+            daemon = TapDaemon(path, ack_timeout=args.ack_timeout, codec=codec, page_size=args.page_size,
+                               cache=None if args.no_cache else TopologyCache(args.cache_dir))
+            signal.signal(signal.SIGTERM, signal.default_int_handler)
+            try:
+                daemon.listen()
+                for url in read_inventory(args.inventory) if args.inventory else [args.url]:
+                    try:
+                        daemon.warm(url)
+                    except Exception as e:
+                        print(f"{url}: {e}", file=sys.stderr)
+                print(f"Listening on {path}", file=sys.stderr)
+                daemon.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            except Exception as e:
+                print(f"Error: {e}", file=sys.stderr)
+                exit(1)
+            finally:
+                daemon.close()
+    elif args.command in ('extract', 'replay'):
+        from vector_capture import CaptureReader, parse_time, replay
+        try:
+            with CaptureReader(args.capture) as reader:
+                since = parse_time(args.since, reader.first_time)
+                until = parse_time(args.until, reader.first_time)
+                events = reader.read(components=args.component, since=since, until=until, typenames=args.types)
+                replay(events, speed=args.speed if args.command == 'replay' else 0)
+        except KeyboardInterrupt:
+            pass
+        except BrokenPipeError:
+            sys.stderr.close()
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+    elif args.inventory and args.command in ('top', 'chain-health', 'record'):
+        parser.error(f"{args.command} watches a single Vector; use --url instead of --inventory")
+    elif args.inventory and (getattr(args, 'metrics_port', None) is not None or getattr(args, 'metrics_file', None)):
+        parser.error("--metrics-port/--metrics-file need a single Vector; use --url instead of --inventory")
+    elif args.inventory and args.command in ('subscribe', 'aggregate') and (
+            (args.buffer, args.overflow) != (DEFAULT_BUFFER_EVENTS, 'block')
+            or (args.reconnect_attempts, args.reconnect_delay, args.reconnect_max_delay)
+            != (DEFAULT_RECONNECT_ATTEMPTS, DEFAULT_RECONNECT_DELAY, DEFAULT_RECONNECT_MAX_DELAY)):
+        # Fleet taps write from the event loop and end with their node.
+        parser.error("--buffer/--overflow and --reconnect-* need a single Vector; use --url instead of --inventory")
+    elif args.inventory:
+        endpoints = read_inventory(args.inventory)
+        if args.command in ('subscribe', 'aggregate'):
+            try:
+                where = event_filter()
+                writer, needed = event_aggregator() if args.command == 'aggregate' else (event_writer(), ())
+                failures = fleet_subscribe(endpoints, args.patterns, args.limit, workers=args.workers,
+                                           timeout=args.node_timeout, ack_timeout=args.ack_timeout,
+                                           writer=writer, query=subscription_query(where, needed),
+                                           interval=args.interval, sample_limit=args.sample_limit, where=where,
+                                           codec=codec, reservoir=args.reservoir, window=args.window)
+            except KeyboardInterrupt:
+                print("\nInterrupted by user.")
+                failures = []
+            for endpoint, error in failures:
+                print(f"{endpoint}: {error}", file=sys.stderr)
+            if failures:
+                exit(1)
+        else:
+            cache = None if args.no_cache else TopologyCache(args.cache_dir)
+            if args.command == 'batch':
+                mode, names = args.mode, read_batch_names(args.names, args.file)
+            else:
+                mode, names = args.command, [args.name]
+            results = fleet_map(
+                endpoints,
+                lambda client: lookup_components(client, cache, mode, names, page_size=args.page_size,
+                                                 refresh=args.refresh, metrics=not args.no_metrics),
+                workers=args.workers,
+                timeout=args.node_timeout,
+                ack_timeout=args.ack_timeout,
+                codec=codec
+            )
+            failed = False
+            merged = {}
+            for endpoint, lookup, error in results:
+                if error is not None:
+                    failed = True
+                    if args.command == 'batch':
+                        print(json.dumps({"endpoint": endpoint, "error": error}))
+                    else:
+                        merged[endpoint] = {"endpoint": endpoint, "error": error}
+                    continue
+                if lookup.unmatched:
+                    failed = True
+                node = lookup.hostname or endpoint
+                if node in merged:
+                    node = f"{node} ({endpoint})"
+                if args.command == 'batch':
+                    for id_ in lookup.ids:
+                        line = {"node": node, "endpoint": endpoint}
+                        if mode == 'get-info':
+                            line.update(lookup.info(id_))
+                        else:
+                            line.update({"componentId": id_, "chain": lookup.chain(id_)})
+                        print(json.dumps(line))
+                    for pattern in lookup.unmatched:
+                        print(json.dumps({"node": node, "endpoint": endpoint, "pattern": pattern, "error": "not found"}))
+                elif args.name not in lookup.ids:
+                    failed = True
+                    merged[node] = {"endpoint": endpoint, "error": f"Component '{args.name}' not found."}
+                elif mode == 'get-info':
+                    merged[node] = {"endpoint": endpoint, "info": lookup.info(args.name)}
+                else:
+                    merged[node] = {"endpoint": endpoint, "chain": lookup.chain(args.name)}
+            if args.command != 'batch':
+                print(json.dumps(merged, indent=2))
+            if failed:
+                exit(1)
+    elif args.command == 'chain-health':
+        client = VectorClient(args.url, ack_timeout=args.ack_timeout, codec=codec)
+        cache = None if args.no_cache else TopologyCache(args.cache_dir)
+        try:
+            probe = client.execute_query(PROBE_QUERY)
+            graph, _ = load_graph(client, cache, probe, [args.name], page_size=args.page_size)
+            if args.name not in graph:
+                print(f"Component '{args.name}' not found.")
+                exit(1)
+            chain = graph.ids_by_kind(graph.connected(args.name) & set(graph.component_ids()))
+            health = ChainHealth(graph, [id_ for ids in chain.values() for id_ in ids], args.tolerance)
+            health.observe(client.fetch_metrics(chain, page_size=args.page_size))
+            reports = 0
+            while reports < args.samples:
+                time.sleep(args.interval)
+                report = health.observe(client.fetch_metrics(chain, page_size=args.page_size))
+                if report is None:
+                    continue
+                print(json.dumps(report, indent=None if args.samples > 1 else 2), flush=True)
+                reports += 1
+        except KeyboardInterrupt:
+            pass
+        except Exception as e:
+            print(f"Error: {e}")
+            exit(1)
+        finally:
+            client.close()
+    elif args.command == 'top':
+        client = VectorClient(args.url, ack_timeout=args.ack_timeout, codec=codec)
+        cache = None if args.no_cache else TopologyCache(args.cache_dir)
+        try:
+            # Only for kinds and types; rates come from the subscriptions.
+            probe = client.execute_query(PROBE_QUERY)
+            graph, _ = load_graph(client, cache, probe, page_size=args.page_size)
+            table = ThroughputTable(args.interval, graph, args.patterns)
+            title = f"vector top  {probe['meta']['hostname']}  {args.url}"
+            watch_throughput(client.session, table, sort=args.sort, iterations=args.iterations,
+                             max_rows=args.rows, title=title)
+        except KeyboardInterrupt:
+            pass
+        except Exception as e:
+            print(f"Error: {e}")
+            exit(1)
+        finally:
+            client.close()
+    elif args.command in ('subscribe', 'record', 'aggregate'):
+        sampler = ReservoirSampler(args.reservoir, args.window) if args.reservoir else None
+        buffer = EventRing(args.buffer, args.overflow) if args.buffer > 0 else None
+        needed = ()
+        if args.command == 'record':
+            from vector_capture import CaptureWriter
+            try:
+                writer = CaptureWriter(args.output, args.url, args.patterns, prefix=args.prefix,
+                                       compression=args.compression, segment_bytes=args.segment_bytes,
+                                       segment_seconds=args.segment_seconds, codec=codec)
+            except Exception as e:
+                parser.error(str(e))
+        elif args.command == 'aggregate':
+            writer, needed = event_aggregator()
+        else:
+            writer = event_writer()
+        where = event_filter()
+        metrics = None
+        exporters = []
+        if args.metrics_port is not None or args.metrics_file:
+            from vector_metrics import MetricsFile, MetricsServer, TapMetrics
+            metrics = TapMetrics({"endpoint": args.url, "patterns": ",".join(args.patterns)})
+        subscriber = VectorEventSubscriber(args.url, args.patterns, args.limit, ack_timeout=args.ack_timeout,
+                                           writer=writer, query=subscription_query(where, needed),
+                                           interval=args.interval, sample_limit=args.sample_limit, sampler=sampler,
+                                           codec=codec, buffer=buffer, metrics=metrics, where=where,
+                                           reconnect_attempts=args.reconnect_attempts, reconnect_delay=args.reconnect_delay,
+                                           reconnect_max_delay=args.reconnect_max_delay,
+                                           daemon=daemon_socket() if args.command != 'record' else None)
+        if metrics is not None:
+            def render_metrics():
+                return metrics.render(subscriber.stats())
+            try:
+                if args.metrics_port is not None:
+                    exporters.append(MetricsServer(render_metrics, args.metrics_port))
+                if args.metrics_file:
+                    exporters.append(MetricsFile(render_metrics, args.metrics_file))
+            except OSError as e:
+                parser.error(f"Cannot export metrics: {e}")
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: subscriber.print_stats())
+        # Stop on SIGTERM the way Ctrl-C does, so the last segment is closed.
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
         try:
             subscriber.subscribe()
         except KeyboardInterrupt:
-            print("\nInterrupted by user.")
-            subscriber.unsubscribe(None)
+            print("\nInterrupted by user.", file=subscriber.writer.status)
+            subscriber.unsubscribe()
         except Exception as e:
-            print(f"Connection failed: {e}")
+            print(f"Connection failed: {e}", file=subscriber.writer.status)
+        subscriber.print_stats()
+        for exporter in exporters:
+            exporter.close()
+        if args.timings:
+            print_timings(latency_breakdown(subscriber.timings))
+        if subscriber.error:
+            exit(1)
     else:
+        client = None
+        cache = None if args.no_cache else TopologyCache(args.cache_dir)
         try:
-            client = VectorClient(VECTOR_WS_URL)
-            data = client.execute_query(QUERY)
-
-            sources_nodes = data['sources']['nodes']
-            transforms_nodes = data['transforms']['nodes']
-            sinks_nodes = data['sinks']['nodes']
-
-            sources_by_id = {n['componentId']: n for n in sources_nodes}
-            transforms_by_id = {n['componentId']: n for n in transforms_nodes}
-            sinks_by_id = {n['componentId']: n for n in sinks_nodes}
-            all_by_id = {**sources_by_id, **transforms_by_id, **sinks_by_id}
-
-            # Build outgoing graph (upstream -> downstream)
-            outgoing = defaultdict(list)
-            for nodes in [sources_nodes, transforms_nodes]:
-                for node in nodes:
-                    for out_key in ['transforms', 'sinks']:
-                        if out_key in node:
-                            for out_comp in node[out_key]:
-                                if out_comp['componentId'] not in outgoing[node['componentId']]:
-                                    outgoing[node['componentId']].append(out_comp['componentId'])
-
-            name = args.name
-            if name not in all_by_id:
-                print(f"Component '{name}' not found.")
-                exit(1)
+            if args.command == 'batch':
+                mode, names = args.mode, read_batch_names(args.names, args.file)
+            else:
+                mode, names = args.command, [args.name]
+            lookup = None
+            daemon = daemon_socket()
+            if daemon is not None:
+                from vector_daemon import daemon_lookup
+                try:
+                    lookup = daemon_lookup(daemon, args.url, mode, names, page_size=args.page_size,
+                                           refresh=args.refresh, metrics=not args.no_metrics,
+                                           cache=not args.no_cache, cache_dir=args.cache_dir)
+                except OSError:
+                    pass  # it went away since; connect directly
+            if lookup is None:
+                client = VectorClient(args.url, ack_timeout=args.ack_timeout, codec=codec)
+                lookup = lookup_components(client, cache, mode, names, page_size=args.page_size,
+                                           refresh=args.refresh, metrics=not args.no_metrics)
 
-            # Build reverse for inputs
-            reverse = defaultdict(list)
-            for fr, tos in outgoing.items():
-                for to in tos:
-                    if fr not in reverse[to]:
-                        reverse[to].append(fr)
-
-            if args.command == 'get-info':
-                info = all_by_id[name].copy()
-                info['inputs'] = sorted(reverse.get(name, []))
-                info['outputs'] = sorted(outgoing.get(name, []))
-                if name in transforms_by_id:
-                    input_transform_ids = [id_ for id_ in info['inputs'] if id_ in transforms_by_id]
-                    input_transforms = [
-                        {
-                            "componentId": id_,
-                            "componentType": all_by_id[id_]['componentType']
-                        } for id_ in input_transform_ids
-                    ]
-                    output_transforms = info.get('transforms', [])
-                    all_transforms = input_transforms + output_transforms
-                    all_transforms = sorted(set(tuple(sorted(d.items())) for d in all_transforms))
-                    all_transforms = [dict(t) for t in all_transforms]
-                    info['transforms'] = all_transforms
-                print(json.dumps(info, indent=2))
-            else:  # get-chain
-                connected_ids = get_connected(all_by_id, outgoing, name)
-                chain_info = {}
-                for id_ in sorted(connected_ids):
-                    info = all_by_id[id_].copy()
-                    info['inputs'] = sorted(reverse.get(id_, []))
-                    info['outputs'] = sorted(outgoing.get(id_, []))
-                    if id_ in transforms_by_id:
-                        input_transform_ids = [id__ for id__ in info['inputs'] if id__ in transforms_by_id]
-                        input_transforms = [
-                            {
-                                "componentId": id__,
-                                "componentType": all_by_id[id__]['componentType']
-                            } for id__ in input_transform_ids
-                        ]
-                        output_transforms = info.get('transforms', [])
-                        all_transforms = input_transforms + output_transforms
-                        all_transforms = sorted(set(tuple(sorted(d.items())) for d in all_transforms))
-                        all_transforms = [dict(t) for t in all_transforms]
-                        info['transforms'] = all_transforms
-                    chain_info[id_] = info
-                print(json.dumps(chain_info, indent=2))
+            render_started = time.perf_counter()
+            if args.command == 'batch':
+                # JSON Lines: one object per component, then one per unmatched pattern.
+                out = sys.stdout
+                for id_ in lookup.ids:
+                    if mode == 'get-info':
+                        out.write(json.dumps(lookup.info(id_)) + "\n")
+                    else:
+                        out.write(json.dumps({"componentId": id_, "chain": lookup.chain(id_)}) + "\n")
+                for pattern in lookup.unmatched:
+                    out.write(json.dumps({"pattern": pattern, "error": "not found"}) + "\n")
+                out.flush()
+            elif args.name not in lookup.ids:
+                print(f"Component '{args.name}' not found.")
+                exit(1)
+            elif mode == 'get-info':
+                print(json.dumps(lookup.info(args.name), indent=2))
+            else:
+                print(json.dumps(lookup.chain(args.name), indent=2))
+            lookup.phases['render'] = time.perf_counter() - render_started
+            if args.timings:
+                print_timings(lookup.phases)
+            if lookup.unmatched:
+                exit(1)
         except Exception as e:
             print(f"Error: {e}")
+        finally:
+            if client is not None:
+                client.close()